@@ -0,0 +1,482 @@
+"""
+Dashboard Summary Tables
+========================
+Builds the Agg* tables of sql/warehouse_init/aggregates.sql from the loaded facts,
+one table per dashboard report grain:
+
+- AggLoanMonthly            : loans by year / month                  (Report 1)
+- AggNetCashDistrict        : net cash by account district / region  (Report 2)
+- AggPaymentsYearCard       : loan payments by year / card type      (Report 3)
+- AggLoanStatusRegion       : loan status counts by client region    (Report 4)
+- AggTransOperationDistrict : operation counts by client district    (Report 5)
+
+Each table stores additive measures only (counts and sums); averages are derived
+as sum / count when the dashboard reads them. build_aggregates() rebuilds the
+tables from all facts; maintain_aggregates() folds in only the fact rows whose key
+is above the AggWatermark high key, merging their counts and sums into the stored
+groups with INSERT ... ON DUPLICATE KEY UPDATE. Tables grouped by dimension
+attributes are recomputed instead when the run changed existing rows of those
+dimensions (a district moved to another region regroups facts already merged). Both run in one transaction
+together with the watermark update, so readers of the live tables see either the
+old or the new contents and a delta is never applied twice. In shadow loads the
+tables are published together with the star schema.
+
+reconcile_aggregates() recomputes every grain from the base facts and reports
+the groups whose counts or sums differ, confirming that maintained aggregates
+are exact. Run this file directly to maintain or reconcile the live warehouse.
+"""
+
+import logging
+import time
+from datetime import datetime
+
+from encoding import schema_version
+from denormalize import facts_denormalized
+
+logger = logging.getLogger(__name__)
+
+AGGREGATES_SQL_PATH = 'sql/warehouse_init/aggregates.sql'
+
+# Relative tolerance for sums of DOUBLE columns, which depend on summation order
+FLOAT_TOLERANCE = 1e-9
+
+# Control table of the highest fact key each summary table reflects
+WATERMARK_TABLE = 'AggWatermark'
+
+# Fact table -> surrogate key that orders its deltas (warehouse keys are the source ids)
+FACT_KEYS = {'FactTrans': 'trans_id', 'FactLoan': 'loan_id'}
+
+# Summary table -> fact whose deltas it absorbs (None: recomputed), key columns,
+# measure columns and the base-fact query at its grain ({where} bounds the fact rows);
+# query_v2 is the same grain over the dictionary-encoded schema (see encoding.py), and
+# query_denormalized(_v2) groups the facts by their copied dimension columns without
+# joins, then joins the district and region names to the grouped rows (see denormalize.py)
+AGGREGATES = {
+    'AggLoanMonthly': {
+        'fact': ('FactLoan', 'fl.loan_id'),
+        'keys': ('year', 'month'),
+        'measures': ('loan_count', 'amount_sum'),
+        'query': """
+            SELECT d.year, d.month, COUNT(*), SUM(fl.amount)
+            FROM FactLoan fl
+            JOIN DimDate d ON fl.date_id = d.date_id
+            {where}
+            GROUP BY d.year, d.month
+        """,
+        'query_denormalized': """
+            SELECT fl.date_year, fl.date_month, COUNT(*), SUM(fl.amount)
+            FROM FactLoan fl
+            {where}
+            GROUP BY fl.date_year, fl.date_month
+        """,
+    },
+    'AggNetCashDistrict': {
+        'fact': ('FactTrans', 'ft.trans_id'),
+        'keys': ('district_id',),
+        'measures': ('trans_count', 'amount_sum'),
+        'attributes': ('district_name', 'region'),
+        'query': """
+            SELECT dist.district_id, COUNT(*), SUM(ft.amount), dist.district_name, dist.region
+            FROM FactTrans ft
+            JOIN DimClientAccount ca ON ft.clientAcc_id = ca.clientAcc_id
+            JOIN DimDistrict dist ON ca.distAcc_id = dist.district_id
+            {where}
+            GROUP BY dist.district_id, dist.district_name, dist.region
+        """,
+        'query_v2': """
+            SELECT dist.district_id, COUNT(*), SUM(ft.amount), dist.district_name, NULLIF(r.region, '')
+            FROM FactTrans ft
+            JOIN DimClientAccount ca ON ft.clientAcc_id = ca.clientAcc_id
+            JOIN DimDistrict dist ON ca.distAcc_id = dist.district_id
+            LEFT JOIN DimRegion r ON dist.region_id = r.region_id
+            {where}
+            GROUP BY dist.district_id, dist.district_name, r.region
+        """,
+        'query_denormalized': """
+            SELECT dist.district_id, g.trans_count, g.amount_sum, dist.district_name, NULLIF(r.region, '')
+            FROM (SELECT ft.distAcc_id, ft.regionAcc_id, COUNT(*) AS trans_count, SUM(ft.amount) AS amount_sum
+                  FROM FactTrans ft
+                  {where}
+                  GROUP BY ft.distAcc_id, ft.regionAcc_id) g
+            JOIN DimDistrict dist ON g.distAcc_id = dist.district_id
+            LEFT JOIN DimRegion r ON g.regionAcc_id = r.region_id
+        """,
+    },
+    'AggPaymentsYearCard': {
+        # Not additive over loan deltas alone (new cards pair with existing loans): recomputed
+        'fact': None,
+        'keys': ('year', 'card_type'),
+        'measures': ('loan_card_pairs', 'payments_sum'),
+        'query': """
+            SELECT dd.year, COALESCE(dc.type, ''), COUNT(*), SUM(fl.payments)
+            FROM DimDate dd
+            JOIN FactLoan fl ON dd.date_id = fl.date_id
+            JOIN DimCard dc ON dd.date_id = dc.date_id
+            {where}
+            GROUP BY dd.year, COALESCE(dc.type, '')
+        """,
+        'query_v2': """
+            SELECT dd.year, COALESCE(ct.card_type, ''), COUNT(*), SUM(fl.payments)
+            FROM DimDate dd
+            JOIN FactLoan fl ON dd.date_id = fl.date_id
+            JOIN DimCard dc ON dd.date_id = dc.date_id
+            LEFT JOIN DimCardType ct ON dc.card_type_id = ct.card_type_id
+            {where}
+            GROUP BY dd.year, COALESCE(ct.card_type, '')
+        """,
+    },
+    'AggLoanStatusRegion': {
+        'fact': ('FactLoan', 'fl.loan_id'),
+        'keys': ('region', 'status'),
+        'measures': ('loan_count', 'amount_sum'),
+        'query': """
+            SELECT COALESCE(dd.region, ''), fl.status, COUNT(*), SUM(fl.amount)
+            FROM FactLoan fl
+            JOIN DimClientAccount dca ON fl.clientAcc_id = dca.clientAcc_id
+            JOIN DimDistrict dd ON dca.distCli_id = dd.district_id
+            {where}
+            GROUP BY COALESCE(dd.region, ''), fl.status
+        """,
+        'query_v2': """
+            SELECT COALESCE(r.region, ''), fl.status, COUNT(*), SUM(fl.amount)
+            FROM FactLoan fl
+            JOIN DimClientAccount dca ON fl.clientAcc_id = dca.clientAcc_id
+            JOIN DimDistrict dd ON dca.distCli_id = dd.district_id
+            LEFT JOIN DimRegion r ON dd.region_id = r.region_id
+            {where}
+            GROUP BY COALESCE(r.region, ''), fl.status
+        """,
+        'query_denormalized': """
+            SELECT COALESCE(r.region, ''), g.status, SUM(g.loan_count), SUM(g.amount_sum)
+            FROM (SELECT fl.regionCli_id, fl.status, COUNT(*) AS loan_count, SUM(fl.amount) AS amount_sum
+                  FROM FactLoan fl
+                  {where}
+                  GROUP BY fl.regionCli_id, fl.status) g
+            JOIN DimRegion r ON g.regionCli_id = r.region_id
+            GROUP BY COALESCE(r.region, ''), g.status
+        """,
+    },
+    'AggTransOperationDistrict': {
+        'fact': ('FactTrans', 'ft.trans_id'),
+        'keys': ('district_id', 'operation'),
+        'measures': ('trans_count', 'amount_sum'),
+        'attributes': ('district_name', 'region'),
+        'query': """
+            SELECT dd.district_id, COALESCE(ft.operation, ''), COUNT(*), SUM(ft.amount),
+                   dd.district_name, dd.region
+            FROM FactTrans ft
+            JOIN DimClientAccount dca ON ft.clientAcc_id = dca.clientAcc_id
+            JOIN DimDistrict dd ON dca.distCli_id = dd.district_id
+            {where}
+            GROUP BY dd.district_id, COALESCE(ft.operation, ''), dd.district_name, dd.region
+        """,
+        'query_v2': """
+            SELECT dd.district_id, COALESCE(tj.operation, ''), COUNT(*), SUM(ft.amount),
+                   dd.district_name, NULLIF(r.region, '')
+            FROM FactTrans ft
+            JOIN DimClientAccount dca ON ft.clientAcc_id = dca.clientAcc_id
+            JOIN DimDistrict dd ON dca.distCli_id = dd.district_id
+            LEFT JOIN TransTypeJunk tj ON ft.trans_type_id = tj.trans_type_id
+            LEFT JOIN DimRegion r ON dd.region_id = r.region_id
+            {where}
+            GROUP BY dd.district_id, COALESCE(tj.operation, ''), dd.district_name, r.region
+        """,
+        'query_denormalized': """
+            SELECT dd.district_id, g.operation, g.trans_count, g.amount_sum, dd.district_name, dd.region
+            FROM (SELECT ft.distCli_id, COALESCE(ft.operation, '') AS operation,
+                         COUNT(*) AS trans_count, SUM(ft.amount) AS amount_sum
+                  FROM FactTrans ft
+                  {where}
+                  GROUP BY ft.distCli_id, COALESCE(ft.operation, '')) g
+            JOIN DimDistrict dd ON g.distCli_id = dd.district_id
+        """,
+        'query_denormalized_v2': """
+            SELECT dd.district_id, COALESCE(tj.operation, ''), SUM(g.trans_count), SUM(g.amount_sum),
+                   dd.district_name, NULLIF(r.region, '')
+            FROM (SELECT ft.distCli_id, ft.trans_type_id, COUNT(*) AS trans_count, SUM(ft.amount) AS amount_sum
+                  FROM FactTrans ft
+                  {where}
+                  GROUP BY ft.distCli_id, ft.trans_type_id) g
+            JOIN DimDistrict dd ON g.distCli_id = dd.district_id
+            LEFT JOIN TransTypeJunk tj ON g.trans_type_id = tj.trans_type_id
+            LEFT JOIN DimRegion r ON dd.region_id = r.region_id
+            GROUP BY dd.district_id, COALESCE(tj.operation, ''), dd.district_name, r.region
+        """,
+    },
+}
+
+
+# Dimension -> summary tables grouped by its attributes, recomputed by maintain_aggregates()
+# when existing rows of the dimension changed
+DIMENSION_AGGREGATES = {
+    'DimDistrict': ('AggNetCashDistrict', 'AggLoanStatusRegion', 'AggTransOperationDistrict'),
+    'DimClientAccount': ('AggNetCashDistrict', 'AggLoanStatusRegion', 'AggTransOperationDistrict'),
+    'DimCard': ('AggPaymentsYearCard',),
+}
+
+# Every table created by aggregates.sql (dropped and published as a set)
+AGGREGATE_TABLES = tuple(AGGREGATES) + (WATERMARK_TABLE,)
+
+
+def aggregate_query(cursor, table):
+    """Base-fact query of a summary table for the schema version and fact layout of the cursor's warehouse"""
+    spec = AGGREGATES[table]
+    variants = ['query_v2', 'query'] if schema_version(cursor) == 2 else ['query']
+    if facts_denormalized(cursor):
+        variants = [variant.replace('query', 'query_denormalized') for variant in variants] + variants
+    return spec[next(variant for variant in variants if variant in spec)]
+
+
+def aggregate_columns(table):
+    """Column order of a summary table's query: keys, measures, then descriptive attributes"""
+    spec = AGGREGATES[table]
+    return spec['keys'] + spec['measures'] + spec.get('attributes', ())
+
+
+def _strip_comment_lines(statement):
+    """A statement without the -- comment lines that head it in the SQL file"""
+    lines = statement.splitlines()
+    while lines and (not lines[0].strip() or lines[0].lstrip().startswith('--')):
+        lines.pop(0)
+    return "\n".join(lines).strip()
+
+
+def create_aggregate_tables(warehouse_conn, sql_file_path=AGGREGATES_SQL_PATH):
+    """Create the summary tables from aggregates.sql if they do not exist yet"""
+    with open(sql_file_path, 'r') as file:
+        sql_content = file.read()
+
+    statements = [_strip_comment_lines(stmt) for stmt in sql_content.split(';')]
+    with warehouse_conn.cursor() as cursor:
+        for statement in statements:
+            # USE and the status SELECT are skipped: the connection already targets
+            # the schema being built (live or shadow)
+            if statement.upper().startswith('CREATE'):
+                cursor.execute(statement)
+    warehouse_conn.commit()
+
+
+def drop_aggregate_tables(warehouse_conn):
+    with warehouse_conn.cursor() as cursor:
+        for table in AGGREGATE_TABLES:
+            cursor.execute(f"DROP TABLE IF EXISTS {table}")
+    warehouse_conn.commit()
+
+
+def _fact_high_keys(cursor):
+    """Current highest key of every fact table (0 when empty)"""
+    high_keys = {}
+    for fact, key in FACT_KEYS.items():
+        cursor.execute(f"SELECT COALESCE(MAX({key}), 0) FROM {fact}")
+        high_keys[fact] = int(cursor.fetchone()[0])
+    return high_keys
+
+
+def _read_watermarks(cursor):
+    """Fact high keys the summary tables reflect; locked until the caller's commit"""
+    cursor.execute(f"SELECT fact_table, high_key FROM {WATERMARK_TABLE} FOR UPDATE")
+    return {fact: int(high_key) for fact, high_key in cursor.fetchall()}
+
+
+def _save_watermarks(cursor, high_keys):
+    now = datetime.now()
+    cursor.executemany(f"""
+        INSERT INTO {WATERMARK_TABLE} (fact_table, high_key, updated_at)
+        VALUES (%s, %s, %s)
+        ON DUPLICATE KEY UPDATE high_key = VALUES(high_key), updated_at = VALUES(updated_at)
+    """, [(fact, high_key, now) for fact, high_key in high_keys.items()])
+
+
+def _rebuild_table(cursor, table, high_keys):
+    """Replace a summary table's rows with its grain over all facts up to high_keys"""
+    spec = AGGREGATES[table]
+    conditions, params = [], []
+    if spec['fact']:
+        fact, key_column = spec['fact']
+        conditions.append(f"{key_column} <= %s")
+        params.append(high_keys[fact])
+    where = ("WHERE " + " AND ".join(conditions)) if conditions else ""
+    cursor.execute(f"DELETE FROM {table}")
+    cursor.execute(f"INSERT INTO {table} ({', '.join(aggregate_columns(table))}) "
+                   f"{aggregate_query(cursor, table).format(where=where)}", params)
+    return cursor.rowcount
+
+
+def _merge_delta(cursor, table, low, high):
+    """
+    Fold the fact rows with low < key <= high into a summary table: counts and sums
+    are added to existing groups, new groups are inserted, attributes are refreshed.
+    The grouped delta is a derived table so the update clause only sees target columns.
+    """
+    spec = AGGREGATES[table]
+    _, key_column = spec['fact']
+    columns = aggregate_columns(table)
+    updates = [f"{table}.{column} = {table}.{column} + VALUES({column})" for column in spec['measures']]
+    updates += [f"{table}.{column} = VALUES({column})" for column in spec.get('attributes', ())]
+    delta_query = aggregate_query(cursor, table).format(where=f"WHERE {key_column} > %s AND {key_column} <= %s")
+    cursor.execute(f"""
+        INSERT INTO {table} ({', '.join(columns)})
+        SELECT * FROM ({delta_query}) AS delta
+        ON DUPLICATE KEY UPDATE {', '.join(updates)}
+    """, (low, high))
+    return cursor.rowcount
+
+
+def build_aggregates(warehouse_conn, timings=None):
+    """
+    Rebuild every summary table from the base facts in a single transaction.
+    Returns {table: rows} and records each table's build time in timings.
+    """
+    logger.info("Building dashboard summary tables...")
+    timings = timings if timings is not None else {}
+    counts = {}
+
+    try:
+        create_aggregate_tables(warehouse_conn)
+        warehouse_conn.begin()
+        with warehouse_conn.cursor() as cursor:
+            _read_watermarks(cursor)
+            high_keys = _fact_high_keys(cursor)
+            for table in AGGREGATES:
+                start = time.perf_counter()
+                counts[table] = _rebuild_table(cursor, table, high_keys)
+                timings[f"aggregates:{table}"] = time.perf_counter() - start
+                logger.info(f"{table}: {counts[table]:,} rows in {timings[f'aggregates:{table}']:.2f}s")
+            _save_watermarks(cursor, high_keys)
+        warehouse_conn.commit()
+        logger.info(f"Summary tables built successfully up to {high_keys}")
+        return counts
+
+    except Exception as e:
+        logger.error(f"Error building summary tables: {e}")
+        warehouse_conn.rollback()
+        raise
+
+
+def maintain_aggregates(warehouse_conn, timings=None, changed_dimensions=()):
+    """
+    Apply the fact rows loaded since the last build or maintenance to the summary
+    tables in a single transaction; tables grouped by one of changed_dimensions are
+    recomputed in full. Falls back to build_aggregates() when the tables have no
+    watermark yet. Returns {table: affected rows}.
+    """
+    create_aggregate_tables(warehouse_conn)
+    with warehouse_conn.cursor() as cursor:
+        cursor.execute(f"SELECT fact_table FROM {WATERMARK_TABLE}")
+        if {row[0] for row in cursor.fetchall()} != set(FACT_KEYS):
+            logger.warning("Summary tables have no fact watermark - rebuilding them in full")
+            return build_aggregates(warehouse_conn, timings)
+
+    logger.info("Merging fact deltas into the dashboard summary tables...")
+    timings = timings if timings is not None else {}
+    counts = {}
+    recomputed = {table for dimension in changed_dimensions for table in DIMENSION_AGGREGATES.get(dimension, ())}
+
+    try:
+        warehouse_conn.begin()
+        with warehouse_conn.cursor() as cursor:
+            low_keys = _read_watermarks(cursor)
+            high_keys = _fact_high_keys(cursor)
+            for table, spec in AGGREGATES.items():
+                start = time.perf_counter()
+                if spec['fact'] is None or table in recomputed:
+                    counts[table] = _rebuild_table(cursor, table, high_keys)
+                    action = "recomputed" if spec['fact'] is None else "recomputed after dimension changes"
+                else:
+                    fact = spec['fact'][0]
+                    counts[table] = _merge_delta(cursor, table, low_keys[fact], high_keys[fact])
+                    action = f"merged {fact} keys ({low_keys[fact]}, {high_keys[fact]}]"
+                timings[f"aggregates:{table}"] = time.perf_counter() - start
+                logger.info(f"{table}: {action}, {counts[table]:,} rows affected "
+                            f"in {timings[f'aggregates:{table}']:.2f}s")
+            _save_watermarks(cursor, high_keys)
+        warehouse_conn.commit()
+        logger.info("Summary tables maintained successfully")
+        return counts
+
+    except Exception as e:
+        logger.error(f"Error maintaining summary tables: {e}")
+        warehouse_conn.rollback()
+        raise
+
+
+def _measures_match(stored, expected):
+    if stored is None or expected is None:
+        return stored == expected
+    if isinstance(stored, float) or isinstance(expected, float):
+        return abs(float(stored) - float(expected)) <= FLOAT_TOLERANCE * max(1.0, abs(float(expected)))
+    return int(stored) == int(expected)
+
+
+def _keyed_rows(cursor, key_count, measure_count):
+    return {tuple(row[:key_count]): tuple(row[key_count:key_count + measure_count]) for row in cursor.fetchall()}
+
+
+def reconcile_table(warehouse_conn, table):
+    """
+    Compare a summary table with its grain recomputed from the base facts.
+    Returns a list of mismatch descriptions (empty when the table is exact).
+    """
+    spec = AGGREGATES[table]
+    keys, measures = spec['keys'], spec['measures']
+    with warehouse_conn.cursor() as cursor:
+        cursor.execute(f"SELECT {', '.join(keys + measures)} FROM {table}")
+        stored = _keyed_rows(cursor, len(keys), len(measures))
+        cursor.execute(aggregate_query(cursor, table).format(where=''))
+        expected = _keyed_rows(cursor, len(keys), len(measures))
+
+    mismatches = []
+    for key in sorted(set(stored) | set(expected), key=str):
+        if key not in stored:
+            mismatches.append(f"{table}{key}: missing, base facts give {expected[key]}")
+        elif key not in expected:
+            mismatches.append(f"{table}{key}: {stored[key]} stored, no base fact rows")
+        elif not all(map(_measures_match, stored[key], expected[key])):
+            mismatches.append(f"{table}{key}: {stored[key]} stored, base facts give {expected[key]}")
+    return mismatches
+
+
+def reconcile_aggregates(warehouse_conn, raise_on_mismatch=True):
+    """
+    Reconcile every summary table against the base facts.
+    Returns {table: [mismatch, ...]}; raises ValueError on any mismatch unless told not to.
+    """
+    logger.info("Reconciling summary tables with the base facts...")
+    results = {}
+    for table in AGGREGATES:
+        results[table] = reconcile_table(warehouse_conn, table)
+        status = "OK" if not results[table] else f"{len(results[table])} mismatched groups"
+        logger.info(f"{table}: {status}")
+        for mismatch in results[table][:10]:
+            logger.warning(f"  {mismatch}")
+
+    failed = [table for table, mismatches in results.items() if mismatches]
+    if failed and raise_on_mismatch:
+        raise ValueError(f"Summary table reconciliation failed: {', '.join(failed)}")
+    return results
+
+
+if __name__ == "__main__":
+    """Reconcile the summary tables of the live warehouse, optionally maintaining or rebuilding them first"""
+    import argparse
+    import pymysql
+    from etl_pipeline_clean import WAREHOUSE_DB_CONFIG
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Dashboard summary table reconciliation")
+    parser.add_argument('--build', action='store_true', help="Rebuild the summary tables before reconciling")
+    parser.add_argument('--maintain', action='store_true', help="Merge new fact rows before reconciling")
+    args = parser.parse_args()
+
+    config = WAREHOUSE_DB_CONFIG.copy()
+    config['ssl_disabled'] = True
+    conn = pymysql.connect(**config)
+    try:
+        if args.build:
+            build_aggregates(conn)
+        elif args.maintain:
+            maintain_aggregates(conn)
+        results = reconcile_aggregates(conn, raise_on_mismatch=False)
+    finally:
+        conn.close()
+    raise SystemExit(1 if any(results.values()) else 0)
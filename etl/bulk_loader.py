@@ -0,0 +1,292 @@
+"""
+Warehouse Bulk Load Backends
+============================
+Pluggable insert layer shared by every load_* function in etl_pipeline_clean.py.
+
+Backends:
+- executemany : pymysql executemany() with a per-row VALUES template (original behaviour)
+- multirow    : batched multi-row INSERT statements capped below max_allowed_packet
+- load_data   : LOAD DATA LOCAL INFILE fed from an in-memory CSV buffer
+
+Run this file directly to compare the rows/sec of each backend against the local warehouse.
+"""
+
+import io
+import os
+import time
+import logging
+import tempfile
+from datetime import date, datetime
+
+from encoding import encoded_columns, schema_version
+
+logger = logging.getLogger(__name__)
+
+# Headroom left below max_allowed_packet for the statement prefix and protocol overhead
+PACKET_HEADROOM_BYTES = 16 * 1024
+
+
+class BulkLoader:
+    """Base class for warehouse bulk load backends"""
+
+    name = 'base'
+
+    def __init__(self, batch_rows=5000, max_statement_bytes=4 * 1024 * 1024):
+        self.batch_rows = max(1, int(batch_rows))
+        self.max_statement_bytes = max_statement_bytes
+
+    @staticmethod
+    def _upsert_clause(columns):
+        """ON DUPLICATE KEY UPDATE suffix that overwrites every non-key column"""
+        # The first column of every warehouse table is its primary key
+        updates = ", ".join(f"{column} = VALUES({column})" for column in columns[1:])
+        return f" ON DUPLICATE KEY UPDATE {updates}"
+
+    def load(self, warehouse_conn, table, columns, rows, upsert=False):
+        """
+        Insert rows (sequence of tuples ordered like columns) into table; returns row count.
+        With upsert=True existing keys are overwritten (INSERT ... ON DUPLICATE KEY UPDATE).
+        """
+        raise NotImplementedError
+
+    def _batches(self, rows):
+        """Split rows into lists of at most batch_rows"""
+        rows = list(rows)
+        for start in range(0, len(rows), self.batch_rows):
+            yield rows[start:start + self.batch_rows]
+
+
+class ExecuteManyLoader(BulkLoader):
+    """Per-row VALUES template through cursor.executemany()"""
+
+    name = 'executemany'
+
+    def load(self, warehouse_conn, table, columns, rows, upsert=False):
+        placeholders = ", ".join(["%s"] * len(columns))
+        insert_query = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders})"
+        if upsert:
+            insert_query += self._upsert_clause(columns)
+
+        total = 0
+        with warehouse_conn.cursor() as cursor:
+            for batch in self._batches(rows):
+                cursor.executemany(insert_query, batch)
+                total += len(batch)
+        return total
+
+
+class MultiRowInsertLoader(BulkLoader):
+    """Multi-row INSERT ... VALUES (...), (...) statements sized to fit max_allowed_packet"""
+
+    name = 'multirow'
+
+    def __init__(self, batch_rows=5000, max_statement_bytes=4 * 1024 * 1024):
+        super().__init__(batch_rows, max_statement_bytes)
+        self._packet_limits = {}
+
+    def statement_limit(self, warehouse_conn):
+        """Largest statement to send: min(max_statement_bytes, max_allowed_packet - headroom)"""
+        key = id(warehouse_conn)
+        if key not in self._packet_limits:
+            with warehouse_conn.cursor() as cursor:
+                cursor.execute("SELECT @@max_allowed_packet")
+                max_allowed_packet = int(cursor.fetchone()[0])
+            limit = max_allowed_packet - PACKET_HEADROOM_BYTES
+            if self.max_statement_bytes:
+                limit = min(limit, self.max_statement_bytes)
+            self._packet_limits[key] = limit
+        return self._packet_limits[key]
+
+    def load(self, warehouse_conn, table, columns, rows, upsert=False):
+        prefix = f"INSERT INTO {table} ({', '.join(columns)}) VALUES "
+        suffix = self._upsert_clause(columns) if upsert else ""
+        limit = self.statement_limit(warehouse_conn) - len(suffix)
+        encoding = warehouse_conn.encoding
+
+        total = 0
+        with warehouse_conn.cursor() as cursor:
+            values = []
+            size = len(prefix)
+            for row in rows:
+                literal = warehouse_conn.escape(tuple(row))
+                literal_size = len(literal.encode(encoding)) + 1
+                if values and (size + literal_size > limit or len(values) >= self.batch_rows):
+                    cursor.execute(prefix + ",".join(values) + suffix)
+                    total += len(values)
+                    values = []
+                    size = len(prefix)
+                values.append(literal)
+                size += literal_size
+            if values:
+                cursor.execute(prefix + ",".join(values) + suffix)
+                total += len(values)
+        return total
+
+
+def _csv_field(value):
+    """Render one value for LOAD DATA (comma separated, backslash escaped, \\N for NULL)"""
+    if value is None:
+        return "\\N"
+    if isinstance(value, bool):
+        return "1" if value else "0"
+    if isinstance(value, float):
+        return repr(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    text = str(value)
+    return (text.replace("\\", "\\\\").replace(",", "\\,")
+                .replace("\n", "\\n").replace("\r", "\\r").replace("\t", "\\t"))
+
+
+class LoadDataLoader(BulkLoader):
+    """
+    LOAD DATA LOCAL INFILE from an in-memory CSV buffer.
+
+    Each batch is rendered into an io.StringIO buffer. pymysql only serves LOCAL
+    INFILE requests from a file path, so the finished buffer is written to a
+    temporary file in a single write and removed after the load. Requires the
+    warehouse connection to be opened with local_infile=True and the server to
+    allow local_infile.
+
+    Upserts fall back to multi-row INSERT ... ON DUPLICATE KEY UPDATE, since
+    LOAD DATA ... REPLACE deletes the old row and would break dimension foreign keys.
+    """
+
+    name = 'load_data'
+
+    def load(self, warehouse_conn, table, columns, rows, upsert=False):
+        if upsert:
+            fallback = MultiRowInsertLoader(self.batch_rows, self.max_statement_bytes)
+            return fallback.load(warehouse_conn, table, columns, rows, upsert=True)
+
+        total = 0
+        with warehouse_conn.cursor() as cursor:
+            for batch in self._batches(rows):
+                buffer = io.StringIO()
+                for row in batch:
+                    buffer.write(",".join(_csv_field(value) for value in row))
+                    buffer.write("\n")
+
+                handle = tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False, encoding='utf-8')
+                try:
+                    with handle:
+                        handle.write(buffer.getvalue())
+                    path = handle.name.replace("\\", "/")
+                    cursor.execute(f"""
+                        LOAD DATA LOCAL INFILE '{path}'
+                        INTO TABLE {table}
+                        CHARACTER SET utf8mb4
+                        FIELDS TERMINATED BY ',' ESCAPED BY '\\\\'
+                        LINES TERMINATED BY '\\n'
+                        ({', '.join(columns)})
+                    """)
+                finally:
+                    os.unlink(handle.name)
+                total += len(batch)
+        return total
+
+
+BULK_LOADERS = {
+    ExecuteManyLoader.name: ExecuteManyLoader,
+    MultiRowInsertLoader.name: MultiRowInsertLoader,
+    LoadDataLoader.name: LoadDataLoader,
+}
+
+
+def get_bulk_loader(backend='multirow', batch_rows=5000, max_statement_bytes=4 * 1024 * 1024):
+    """Create a bulk loader for the named backend"""
+    if backend not in BULK_LOADERS:
+        raise ValueError(f"Unknown bulk load backend '{backend}' (choose from {', '.join(BULK_LOADERS)})")
+    return BULK_LOADERS[backend](batch_rows=batch_rows, max_statement_bytes=max_statement_bytes)
+
+
+def create_benchmark_table(warehouse_conn, row_count):
+    """
+    Create the bulk_load_benchmark scratch table (empty, shaped like FactTrans) and
+    return the columns and synthetic rows to load into it
+    """
+    columns = ('trans_id', 'clientAcc_id', 'date_id', 'date_year', 'account', 'type', 'operation',
+               'k_symbol', 'amount', 'balance')
+    rows = [
+        (i, i % 4500 + 1, i % 2191 + 1, 1993 + i % 2191 // 366, i % 99999999,
+         'Credit' if i % 2 else 'Debit (Withdrawal)',
+         None if i % 5 == 0 else 'Withdrawal in Cash',
+         'Household' if i % 3 else '',
+         round(i * 1.37 % 50000, 2), round(i * 7.91 % 200000, 2))
+        for i in range(1, row_count + 1)
+    ]
+
+    with warehouse_conn.cursor() as cursor:
+        cursor.execute("DROP TABLE IF EXISTS bulk_load_benchmark")
+        cursor.execute("CREATE TABLE bulk_load_benchmark LIKE FactTrans")
+        # Foreign keys are not copied by CREATE TABLE ... LIKE, so only the insert path is timed
+        if schema_version(cursor) == 2:
+            # The compact schema stores a TransTypeJunk code instead of the three attributes
+            columns = encoded_columns('FactTrans', columns)
+            rows = [row[:5] + (1 + row[0] % 12,) + row[8:] for row in rows]
+    return columns, rows
+
+
+def benchmark_backends(warehouse_conn, row_count=100000, backends=None, batch_rows=5000):
+    """
+    Load the same synthetic FactTrans-shaped rows through each backend into a scratch
+    table and report rows/sec. The scratch table is dropped afterwards.
+    """
+    backends = backends or list(BULK_LOADERS)
+    results = []
+    columns, rows = create_benchmark_table(warehouse_conn, row_count)
+
+    try:
+        for backend in backends:
+            loader = get_bulk_loader(backend, batch_rows=batch_rows)
+            with warehouse_conn.cursor() as cursor:
+                cursor.execute("TRUNCATE TABLE bulk_load_benchmark")
+
+            start_time = time.perf_counter()
+            try:
+                loaded = loader.load(warehouse_conn, 'bulk_load_benchmark', columns, rows)
+                warehouse_conn.commit()
+            except Exception as e:
+                warehouse_conn.rollback()
+                print(f"{backend:<12} ERROR: {e}")
+                results.append({"backend": backend, "error": str(e)})
+                continue
+            elapsed = time.perf_counter() - start_time
+
+            result = {
+                "backend": backend,
+                "rows": loaded,
+                "seconds": elapsed,
+                "rows_per_sec": loaded / elapsed if elapsed > 0 else 0.0,
+            }
+            results.append(result)
+            print(f"{backend:<12} {loaded:>10,} rows  {elapsed:8.2f} s  {result['rows_per_sec']:>12,.0f} rows/s")
+    finally:
+        with warehouse_conn.cursor() as cursor:
+            cursor.execute("DROP TABLE IF EXISTS bulk_load_benchmark")
+
+    return results
+
+
+if __name__ == "__main__":
+    """Compare bulk load backends against the local warehouse"""
+    import argparse
+    import pymysql
+    from etl_pipeline_clean import WAREHOUSE_DB_CONFIG
+
+    parser = argparse.ArgumentParser(description="Bulk load backend benchmark")
+    parser.add_argument('--rows', type=int, default=100000, help="Rows to load per backend")
+    parser.add_argument('--batch-rows', type=int, default=5000, help="Rows per batch")
+    args = parser.parse_args()
+
+    config = WAREHOUSE_DB_CONFIG.copy()
+    config['ssl_disabled'] = True
+    config['local_infile'] = True
+    conn = pymysql.connect(**config)
+
+    print(f"BULK LOAD BENCHMARK - {args.rows:,} rows per backend")
+    print("=" * 60)
+    try:
+        benchmark_backends(conn, row_count=args.rows, batch_rows=args.batch_rows)
+    finally:
+        conn.close()
@@ -0,0 +1,141 @@
+"""
+ETL Checkpoint Log
+==================
+Records the progress of an ETL run in the etl_checkpoint control table of the
+warehouse, so a failed run can be resumed instead of rebuilt from scratch.
+
+One row per (run_id, task):
+- task 'run'                 : the run itself; state holds the options needed to resume it
+- phase / loader names       : status 'done' once the phase or loader has finished
+- fact loaders and ranges    : last_key is the highest source key committed so far
+
+Fact chunk checkpoints are written on the loader's warehouse connection before it
+commits the chunk, so the rows and their checkpoint become visible together.
+"""
+
+import json
+import logging
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+RUN_TASK = 'run'
+
+CHECKPOINT_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS {table} (
+    run_id VARCHAR(32) NOT NULL,
+    task VARCHAR(64) NOT NULL,
+    status VARCHAR(16) NOT NULL,
+    last_key BIGINT NULL,
+    rows_loaded BIGINT NOT NULL DEFAULT 0,
+    state TEXT NULL,
+    updated_at DATETIME NOT NULL,
+    PRIMARY KEY (run_id, task)
+)
+"""
+
+
+class CheckpointLog:
+    """Checkpoints of one ETL run (table is schema-qualified so shadow loads share it)"""
+
+    def __init__(self, run_id, table='etl_checkpoint'):
+        self.run_id = run_id
+        self.table = table
+
+    @staticmethod
+    def new_run_id():
+        return datetime.now().strftime('%Y%m%d%H%M%S%f')
+
+    @staticmethod
+    def ensure_table(warehouse_conn, table='etl_checkpoint'):
+        """Create the checkpoint control table if it does not exist yet"""
+        with warehouse_conn.cursor() as cursor:
+            cursor.execute(CHECKPOINT_TABLE_SQL.format(table=table))
+        warehouse_conn.commit()
+
+    @classmethod
+    def latest_unfinished(cls, warehouse_conn, table='etl_checkpoint'):
+        """(CheckpointLog, saved state) of the most recent run that did not finish, or None"""
+        cls.ensure_table(warehouse_conn, table)
+        with warehouse_conn.cursor() as cursor:
+            cursor.execute(f"""
+                SELECT run_id, state FROM {table}
+                WHERE task = %s AND status = 'running'
+                ORDER BY updated_at DESC, run_id DESC LIMIT 1
+            """, (RUN_TASK,))
+            row = cursor.fetchone()
+        if row is None:
+            return None
+        return cls(row[0], table), json.loads(row[1] or '{}')
+
+    def start_run(self, warehouse_conn, state):
+        """Register this run and discard the checkpoints of earlier runs"""
+        self.ensure_table(warehouse_conn, self.table)
+        with warehouse_conn.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {self.table} WHERE run_id <> %s", (self.run_id,))
+        self._write(warehouse_conn, RUN_TASK, 'running', state=json.dumps(state))
+        warehouse_conn.commit()
+        logger.info(f"Checkpointing ETL run {self.run_id}")
+
+    def finish_run(self, warehouse_conn):
+        self._write(warehouse_conn, RUN_TASK, 'done')
+        warehouse_conn.commit()
+
+    def _write(self, warehouse_conn, task, status, last_key=None, rows=0, state=None):
+        with warehouse_conn.cursor() as cursor:
+            cursor.execute(f"""
+                INSERT INTO {self.table} (run_id, task, status, last_key, rows_loaded, state, updated_at)
+                VALUES (%s, %s, %s, %s, %s, %s, %s)
+                ON DUPLICATE KEY UPDATE
+                    status = VALUES(status),
+                    last_key = COALESCE(VALUES(last_key), last_key),
+                    rows_loaded = rows_loaded + VALUES(rows_loaded),
+                    state = COALESCE(VALUES(state), state),
+                    updated_at = VALUES(updated_at)
+            """, (self.run_id, task, status, last_key, rows, state, datetime.now()))
+
+    # ------------------------------------------------------------------
+    # Phases and loaders
+    # ------------------------------------------------------------------
+
+    def completed(self, warehouse_conn):
+        """Names of the phases and loaders this run has finished"""
+        with warehouse_conn.cursor() as cursor:
+            cursor.execute(f"SELECT task FROM {self.table} WHERE run_id = %s AND status = 'done'",
+                           (self.run_id,))
+            return {row[0] for row in cursor.fetchall()}
+
+    def is_done(self, warehouse_conn, task):
+        return task in self.completed(warehouse_conn)
+
+    def mark_done(self, warehouse_conn, task):
+        self._write(warehouse_conn, task, 'done')
+        warehouse_conn.commit()
+
+    # ------------------------------------------------------------------
+    # Fact chunks
+    # ------------------------------------------------------------------
+
+    def last_key(self, warehouse_conn, task):
+        """Highest source key committed by task in this run, or None"""
+        with warehouse_conn.cursor() as cursor:
+            cursor.execute(f"SELECT last_key FROM {self.table} WHERE run_id = %s AND task = %s",
+                           (self.run_id, task))
+            row = cursor.fetchone()
+        return row[0] if row else None
+
+    def record_chunk(self, warehouse_conn, task, last_key, rows):
+        """Record a loaded chunk; the caller's commit makes it durable together with the rows"""
+        self._write(warehouse_conn, task, 'running', last_key=last_key, rows=rows)
+
+    def state(self, warehouse_conn, task):
+        """Saved JSON state of a task (e.g. a partition plan), or None"""
+        with warehouse_conn.cursor() as cursor:
+            cursor.execute(f"SELECT state FROM {self.table} WHERE run_id = %s AND task = %s",
+                           (self.run_id, task))
+            row = cursor.fetchone()
+        return json.loads(row[0]) if row and row[0] else None
+
+    def save_state(self, warehouse_conn, task, state):
+        self._write(warehouse_conn, task, 'running', state=json.dumps(state))
+        warehouse_conn.commit()
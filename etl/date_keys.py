@@ -0,0 +1,74 @@
+"""
+Calendar DimDate and Smart Date Keys
+====================================
+DimDate holds every day of a contiguous calendar range, generated arithmetically
+from the first and last date the source uses (a MIN/MAX per source date column,
+see the date_range extract in etl_pipeline_clean.py), and keys each day by its
+date as a YYYYMMDD integer:
+
+    date_id = year * 10000 + month * 100 + day        (1995-03-07 -> 19950307)
+
+Loaders compute a date's key from the date itself, so no date -> key lookup table
+is built, and the year and month of a key are key // 10000 and key // 100 % 100.
+Because the range is contiguous, a date inside it always has its DimDate row;
+incremental runs only add the days that extend the range.
+
+Besides the quarter / year / month / day levels, every day carries its ISO week
+(week, week_year), its ISO day of week (1 = Monday ... 7 = Sunday) and its
+year-month as a YYYYMM integer (yearmonth).
+"""
+
+from datetime import date
+
+import numpy as np
+
+# date(1970, 1, 1).toordinal(): converts day ordinals to datetime64[D] day numbers
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+
+def date_key(value):
+    """YYYYMMDD key of a date"""
+    return value.year * 10000 + value.month * 100 + value.day
+
+
+def key_year(key):
+    return key // 10000
+
+
+def key_month(key):
+    return key // 100 % 100
+
+
+def ordinals_to_keys(ordinals):
+    """Vectorized YYYYMMDD keys of an array of day ordinals"""
+    days = (np.asarray(ordinals, dtype=np.int64) - EPOCH_ORDINAL).astype('datetime64[D]')
+    months = days.astype('datetime64[M]')
+    years = months.astype('datetime64[Y]').astype(np.int64) + 1970
+    month_numbers = months.astype(np.int64) % 12 + 1
+    day_numbers = (days - months.astype('datetime64[D]')).astype(np.int64) + 1
+    return years * 10000 + month_numbers * 100 + day_numbers
+
+
+def calendar_records(first, last, skip=None):
+    """
+    DimDate records (TABLE_COLUMNS order) of every day from first to last inclusive;
+    skip is an optional (first, last) range of days that already have their rows
+    """
+    records = []
+    for ordinal in range(first.toordinal(), last.toordinal() + 1):
+        if skip and skip[0].toordinal() <= ordinal <= skip[1].toordinal():
+            continue
+        day = date.fromordinal(ordinal)
+        week_year, week, day_of_week = day.isocalendar()
+        records.append((date_key(day), day, (day.month - 1) // 3 + 1, day.year, day.month, day.day,
+                        week, week_year, day_of_week, day.year * 100 + day.month))
+    return records
+
+
+def calendar_dim_date(cursor):
+    """True when the DimDate of the cursor's schema is the calendar-generated layout"""
+    cursor.execute("""
+        SELECT COUNT(*) FROM information_schema.COLUMNS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'DimDate' AND COLUMN_NAME = 'yearmonth'
+    """)
+    return bool(cursor.fetchone()[0])
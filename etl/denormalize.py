@@ -0,0 +1,94 @@
+"""
+Denormalized Fact Columns
+=========================
+With --denormalize-facts the fact tables carry copies of the dimension attributes
+the dashboard grains group by (sql/warehouse_variants/denormalize.sql):
+
+    FactTrans   distAcc_id, distCli_id, regionAcc_id, date_month
+    FactLoan    distCli_id, regionCli_id, date_month
+
+The year is the fact's date_year. The loaders stamp the columns onto every
+transformed chunk from LookupCache arrays (clientAcc_id -> districts, district ->
+region code) and the YYYYMMDD date_id (month), so the summary table queries in
+aggregates.py and the join-free tester queries aggregate the fact table alone and
+only join the small district and region tables to the grouped rows.
+
+Region codes are DimRegion ids in both schema versions: schema v2 fills DimRegion
+while encoding DimDistrict, in schema v1 add_region_codes() fills it after each
+DimDistrict load. The copies are taken when a fact row is loaded;
+stale_fact_rows() counts rows whose districts no longer match DimClientAccount.
+"""
+
+import logging
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DENORMALIZE_SQL_PATH = 'sql/warehouse_variants/denormalize.sql'
+
+# Fact table -> denormalized columns, appended after its TABLE_COLUMNS in this order
+DENORMALIZED_COLUMNS = {
+    'FactTrans': ('distAcc_id', 'distCli_id', 'regionAcc_id', 'date_month'),
+    'FactLoan': ('distCli_id', 'regionCli_id', 'date_month'),
+}
+
+
+def facts_denormalized(cursor):
+    """True when the fact tables of the cursor's schema carry the denormalized columns"""
+    cursor.execute("""
+        SELECT COUNT(*) FROM information_schema.COLUMNS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'FactTrans' AND COLUMN_NAME = 'date_month'
+    """)
+    return bool(cursor.fetchone()[0])
+
+
+def add_region_codes(conn):
+    """Give every DimDistrict.region of a schema v1 warehouse a DimRegion code; returns codes added"""
+    with conn.cursor() as cursor:
+        # NOT EXISTS instead of INSERT IGNORE, which would use up TINYINT ids on every refresh
+        cursor.execute("""
+            INSERT INTO DimRegion (region)
+            SELECT DISTINCT COALESCE(d.region, '') FROM DimDistrict d
+            WHERE NOT EXISTS (SELECT 1 FROM DimRegion r
+                              WHERE r.value_hash = UNHEX(MD5(COALESCE(d.region, ''))))
+        """)
+        added = cursor.rowcount
+    conn.commit()
+    if added:
+        logger.info(f"DimRegion: {added} new region codes")
+    return added
+
+
+def stamp_records(table, records, lookup):
+    """
+    Append the denormalized columns of a fact table to its transformed records
+    (clientAcc_id and date_id are the second and third values of each record)
+    """
+    if not records:
+        return records
+    client_account_ids = np.fromiter((record[1] for record in records), dtype=np.int64, count=len(records))
+    date_ids = np.fromiter((record[2] for record in records), dtype=np.int64, count=len(records))
+    account_districts, client_districts = lookup.map_account_districts(client_account_ids)
+    months = lookup.map_months(date_ids)
+    if table == 'FactTrans':
+        columns = [account_districts, client_districts, lookup.map_regions(account_districts), months]
+    else:
+        columns = [client_districts, lookup.map_regions(client_districts), months]
+    stamped = zip(*[column.tolist() for column in columns])
+    return [record + values for record, values in zip(records, stamped)]
+
+
+def stale_fact_rows(cursor):
+    """{fact table: rows whose copied districts differ from their DimClientAccount row}"""
+    counts = {}
+    for table, alias in (('FactTrans', 'ft'), ('FactLoan', 'fl')):
+        mismatch = [f"{alias}.{column} <> COALESCE(ca.{column}, 0)"
+                    for column in DENORMALIZED_COLUMNS[table] if column.startswith('dist')]
+        cursor.execute(f"""
+            SELECT COUNT(*) FROM {table} {alias}
+            JOIN DimClientAccount ca ON {alias}.clientAcc_id = ca.clientAcc_id
+            WHERE {' OR '.join(mismatch)}
+        """)
+        counts[table] = cursor.fetchone()[0]
+    return counts
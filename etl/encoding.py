@@ -0,0 +1,119 @@
+"""
+Dictionary Encoding (schema v2)
+===============================
+Encoder for the compact warehouse schema of sql/warehouse_variants/setup_dw_v2.sql.
+The loaders keep producing records in the setup_dw.sql column order; before they
+are inserted, the low-cardinality text attributes are replaced by the small
+integer code of their value in a code table:
+
+    FactTrans        type, operation, k_symbol -> trans_type_id (TransTypeJunk)
+    DimDistrict      region                    -> region_id     (DimRegion)
+    DimClientAccount frequency                 -> frequency_id  (DimFrequency)
+    DimCard          type                      -> card_type_id  (DimCardType)
+
+Codes are handed out by the warehouse (AUTO_INCREMENT, unique on the attribute
+values), so loader threads and worker processes that meet the same new value
+agree on its code. New values are inserted on a separate autocommit connection,
+outside the caller's chunk transaction, and are rare after the first chunks: the
+known codes are cached per run.
+"""
+
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+SCHEMA_V2_SQL_PATH = 'sql/warehouse_variants/setup_dw_v2.sql'
+INDEXES_V2_SQL_PATH = 'sql/warehouse_variants/indexes_v2.sql'
+
+# Code table -> (code column, attribute columns)
+CODE_TABLES = {
+    'TransTypeJunk': ('trans_type_id', ('type', 'operation', 'k_symbol')),
+    'DimRegion': ('region_id', ('region',)),
+    'DimFrequency': ('frequency_id', ('frequency',)),
+    'DimCardType': ('card_type_id', ('card_type',)),
+}
+
+# Warehouse table -> (code table, first and last position of the encoded attributes in its record)
+ENCODED_TABLES = {
+    'FactTrans': ('TransTypeJunk', 5, 7),
+    'DimDistrict': ('DimRegion', 2, 2),
+    'DimClientAccount': ('DimFrequency', 6, 6),
+    'DimCard': ('DimCardType', 3, 3),
+}
+
+
+def schema_version(cursor):
+    """2 when the schema the cursor's connection uses holds the v2 code tables, else 1"""
+    cursor.execute("""
+        SELECT COUNT(*) FROM information_schema.TABLES
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'TransTypeJunk'
+    """)
+    return 2 if cursor.fetchone()[0] else 1
+
+
+def encoded_columns(table, columns):
+    """v2 column order of a table whose v1 column order is columns"""
+    if table not in ENCODED_TABLES:
+        return columns
+    code_table, first, last = ENCODED_TABLES[table]
+    return columns[:first] + (CODE_TABLES[code_table][0],) + columns[last + 1:]
+
+
+class CodeDictionary:
+    """Value -> code map of one code table"""
+
+    def __init__(self, table):
+        self.table = table
+        self.code_column, self.attributes = CODE_TABLES[table]
+        self.codes = {}
+
+    def load(self, conn):
+        with conn.cursor() as cursor:
+            cursor.execute(f"SELECT {self.code_column}, {', '.join(self.attributes)} FROM {self.table}")
+            self.codes = {tuple(row[1:]): row[0] for row in cursor.fetchall()}
+
+    def add(self, conn, values):
+        """Insert values the table does not hold yet and reload the codes"""
+        self.load(conn)
+        missing = sorted(set(values) - set(self.codes))
+        if missing:
+            placeholders = ', '.join(['%s'] * len(self.attributes))
+            with conn.cursor() as cursor:
+                # IGNORE: another loader may have inserted the same value meanwhile
+                cursor.executemany(f"INSERT IGNORE INTO {self.table} ({', '.join(self.attributes)}) "
+                                   f"VALUES ({placeholders})", missing)
+            conn.commit()
+            self.load(conn)
+            logger.info(f"{self.table}: added {len(missing)} values ({len(self.codes)} codes)")
+        unknown = set(values) - set(self.codes)
+        if unknown:
+            raise ValueError(f"{self.table} could not assign codes to {sorted(unknown)[:5]}")
+
+
+class Encoder:
+    """Encodes loader records for the v2 schema; shared by the loader threads of a run"""
+
+    def __init__(self, connect):
+        self.connect = connect
+        self.dictionaries = {table: CodeDictionary(table) for table in CODE_TABLES}
+        self._lock = threading.Lock()
+
+    def _ensure(self, dictionary, values):
+        with self._lock:
+            if values - set(dictionary.codes):
+                conn = self.connect()
+                try:
+                    dictionary.add(conn, values)
+                finally:
+                    conn.close()
+
+    def encode_rows(self, table, rows):
+        """Records of table in v1 column order -> v2 column order with the attributes encoded"""
+        code_table, first, last = ENCODED_TABLES[table]
+        dictionary = self.dictionaries[code_table]
+        keys = [tuple('' if value is None else value for value in row[first:last + 1]) for row in rows]
+        if not set(keys) <= dictionary.codes.keys():
+            self._ensure(dictionary, set(keys))
+        codes = dictionary.codes
+        return [row[:first] + (codes[key],) + row[last + 1:] for row, key in zip(rows, keys)]
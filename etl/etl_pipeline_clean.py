@@ -4,10 +4,43 @@ Financial Data Warehouse ETL Pipeline
 Refactored and optimized version for loading financial data into warehouse.
 """
 
+import os
+import sys
 import time
+import argparse
 import pymysql
+import pymysql.cursors
+import re
 import logging
-from datetime import datetime
+import shutil
+import tempfile
+import threading
+import multiprocessing
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime
+
+from bulk_loader import get_bulk_loader
+from scheduler import DAGScheduler, ETLTask
+from lookup_cache import LookupCache, to_ordinal
+from date_keys import calendar_records, calendar_dim_date
+from transform import transform_trans_chunk, transform_loan_chunk
+from checkpoint import CheckpointLog
+from stages import StagedPipeline
+from change_detection import HASHED_DIMENSIONS, HASH_COLUMN, DimensionChanges, ensure_hash_columns, hash_records
+from memory_budget import MB, MemoryBudget, ChunkSpill, PhaseMemory, in_flight_chunks, parse_size
+from reconcile import reconcile_with_source
+from aggregates import (AGGREGATE_TABLES, build_aggregates, maintain_aggregates, drop_aggregate_tables,
+                        reconcile_aggregates)
+from keyset import KeysetQuery, KeysetReader, SourceThrottle, estimate_row_bytes
+from encoding import (SCHEMA_V2_SQL_PATH, INDEXES_V2_SQL_PATH, CODE_TABLES, ENCODED_TABLES, Encoder,
+                      encoded_columns, schema_version)
+from snapshot import Snapshot, write_snapshot, resolve_snapshot
+from partitions import (PARTITIONS_SQL_PATH, PARTITIONED_FACTS, ensure_year_partitions, facts_partitioned,
+                        truncate_year_partition)
+from denormalize import (DENORMALIZE_SQL_PATH, DENORMALIZED_COLUMNS, add_region_codes, facts_denormalized,
+                         stamp_records, stale_fact_rows)
+from profiler import RunProfiler, latest_report, write_report, load_report, compare_reports
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -34,11 +67,139 @@ WAREHOUSE_DB_CONFIG = {
     'autocommit': True
 }
 
-def get_source_connection():
+# ETL run options (override per run via run_etl_pipeline(options=...))
+ETL_OPTIONS = {
+    'stream': True,                          # Server-side cursor extraction for fact tables
+    'chunk_size': 10000,                     # Rows per fetchmany() chunk
+    'max_chunk_bytes': 64 * 1024 * 1024,     # Memory ceiling for a single extracted chunk
+    'bulk_backend': 'multirow',              # executemany | multirow | load_data (see bulk_loader.py)
+    'bulk_batch_rows': 5000,                 # Rows per bulk INSERT statement / LOAD DATA batch
+    'max_statement_bytes': 4 * 1024 * 1024,  # Statement size cap (also bounded by max_allowed_packet)
+    'mode': 'full',                          # full (drop and rebuild) | incremental (watermark deltas)
+    'low_water': None,                       # Watermarks of the previous run (set by run_etl_pipeline)
+    'high_water': None,                      # Source maxima captured at the start of this run
+    'parallel': False,                       # Run loaders as a dependency DAG on a thread pool
+    'workers': 4,                            # Thread pool size (one connection pair per worker)
+    'trans_partitions': 0,                   # >1: load FactTrans as trans_id ranges in a process pool
+    'partition_method': 'quantile',          # quantile (equal row counts) | minmax (equal id spans)
+    'lookup_cache_dir': None,                # Per-run directory of memory-mapped key arrays (set by run_etl_pipeline)
+    'vectorized': False,                     # Column-wise NumPy transforms of columnar chunks (see transform.py)
+    'defer_constraints': False,              # Full loads: add FKs and indexes.sql indexes after loading
+    'shadow': False,                         # Full loads: build in a shadow schema, publish by atomic RENAME
+    'warehouse_database': None,              # Schema the loaders write to (set to the shadow schema by run_etl_pipeline)
+    'source_database': None,                 # Source schema to extract from instead of SOURCE_DB_CONFIG's (e.g. synthetic data)
+    'swap_lock_timeout': 5,                  # Seconds the publishing RENAME waits for readers before retrying
+    'swap_attempts': 5,                      # RENAME attempts before the publish gives up
+    'resume': False,                         # Continue the last unfinished run from its checkpoints
+    'checkpoint_run': None,                  # Run id in etl_checkpoint (set by run_etl_pipeline)
+    'report_dir': None,                      # Write a JSON run report (see profiler.py) into this directory
+    'compare': False,                        # Compare the run report with the previous one in report_dir
+    'pipelined': False,                      # Fact loads: extract, transform and load as concurrent stages
+    'queue_chunks': 4,                       # Chunks buffered between two pipelined stages (backpressure)
+    'reconcile_aggregates': True,            # Recompute the summary tables from the facts to confirm them
+    'verify_source': False,                  # Checksum-compare warehouse rows with the source (see reconcile.py)
+    'snapshot_dir': None,                    # Extract the source once into a Parquet snapshot here, load from it
+    'snapshot': None,                        # Snapshot directory the loaders read from instead of the source
+    'keyset': True,                          # Page source extracts: WHERE key > last ORDER BY key LIMIT chunk_size
+    'source_busy_fraction': 0.8,             # Keyset pages pause so source queries take at most this share of the time
+    'source_max_threads_running': 0,         # >0: hold keyset pages while the source has more running threads
+    'schema_version': 1,                     # 1: setup_dw.sql | 2: compact dictionary-encoded schema (see encoding.py)
+    'partition_facts': False,                # RANGE-partition FactTrans / FactLoan by date_year (see partitions.py)
+    'denormalize_facts': False,              # Copy districts, region code and month onto fact rows (see denormalize.py)
+    'max_memory': None,                      # Memory budget in bytes: adaptive chunks, spilling (see memory_budget.py)
+}
+
+SCHEMA_SQL_PATH = 'sql/warehouse_init/setup_dw.sql'
+INDEXES_SQL_PATH = 'sql/warehouse_init/indexes.sql'
+
+# Session settings for warehouse connections while constraints are deferred
+DEFERRED_CHECKS_SQL = "SET SESSION unique_checks = 0, SESSION foreign_key_checks = 0"
+
+# High-water marks tracked per source table in the etl_watermark control table
+WATERMARK_COLUMNS = [
+    ('trans', 'trans_id'),
+    ('loan', 'loan_id'),
+    ('account', 'newdate'),
+    ('card', 'newissued'),
+]
+
+WATERMARK_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS etl_watermark (
+    source_table VARCHAR(64) NOT NULL,
+    column_name VARCHAR(64) NOT NULL,
+    high_water VARCHAR(32) NOT NULL,
+    updated_at DATETIME NOT NULL,
+    PRIMARY KEY (source_table, column_name)
+)
+"""
+
+# Warehouse column order used by the bulk load backends
+TABLE_COLUMNS = {
+    'DimDate': ('date_id', 'date', 'quarter', 'year', 'month', 'day', 'week', 'week_year', 'day_of_week',
+                'yearmonth'),
+    'DimDistrict': ('district_id', 'district_name', 'region', 'inhabitants', 'noCities',
+                    'ratio_urbaninhabitants', 'average_salary', 'unemployment',
+                    'noEntrepreneur', 'noCrimes'),
+    'DimClientAccount': ('clientAcc_id', 'client_id', 'account_id',
+                         'distCli_id', 'distAcc_id', 'date_id', 'frequency'),
+    'DimCard': ('card_id', 'clientAcc_id', 'date_id', 'type'),
+    'FactTrans': ('trans_id', 'clientAcc_id', 'date_id', 'date_year', 'account', 'type', 'operation',
+                  'k_symbol', 'amount', 'balance'),
+    'FactLoan': ('loan_id', 'clientAcc_id', 'date_id', 'date_year', 'status', 'amount', 'duration',
+                 'payments', 'description'),
+}
+
+# Generations of the star schema tables: building, live (WAREHOUSE_DB_CONFIG) and kept for rollback
+SHADOW_DATABASE = WAREHOUSE_DB_CONFIG['database'] + '_shadow'
+PREVIOUS_DATABASE = WAREHOUSE_DB_CONFIG['database'] + '_previous'
+
+# Tables swapped together when a shadow generation is published or rolled back
+# (the code tables only exist in schema v2 generations)
+PUBLISHED_TABLES = tuple(TABLE_COLUMNS) + tuple(CODE_TABLES) + AGGREGATE_TABLES
+
+DIMENSION_TABLES = ('DimDate', 'DimDistrict', 'DimClientAccount', 'DimCard')
+
+# Checkpoints always live in the live schema, also while loading into the shadow one
+CHECKPOINT_TABLE = WAREHOUSE_DB_CONFIG['database'] + '.etl_checkpoint'
+
+# Options a resumed run restores from its checkpoint so it loads exactly the same rows
+RESUME_OPTION_KEYS = ('mode', 'low_water', 'high_water', 'shadow', 'warehouse_database', 'defer_constraints',
+                      'trans_partitions', 'snapshot', 'schema_version', 'partition_facts', 'denormalize_facts',
+                      'source_database')
+
+# Source extracts of a run, in the order they are snapshotted, and the keys fact extracts are ordered by
+SNAPSHOT_EXTRACTS = ('date_range', 'district', 'client_account', 'card', 'trans', 'loan')
+SNAPSHOT_KEYS = {'trans': 'trans_id', 'loan': 'loan_id'}
+# Options that define which source rows a snapshot holds
+SNAPSHOT_STATE_KEYS = ('mode', 'low_water', 'high_water')
+
+_bulk_loaders = {}
+_lookup_caches = {}
+_lookup_caches_lock = threading.Lock()
+_run_profilers = {}
+_run_profilers_lock = threading.Lock()
+_encoders = {}
+_encoders_lock = threading.Lock()
+_memory_budgets = {}
+_memory_budgets_lock = threading.Lock()
+_dimension_changes = {}
+_dimension_changes_lock = threading.Lock()
+
+def get_etl_options(options=None):
+    """Merge per-run overrides on top of the default ETL options"""
+    merged = ETL_OPTIONS.copy()
+    if options:
+        merged.update(options)
+    return merged
+
+def get_source_connection(options=None):
     """Get connection to source database"""
+    options = get_etl_options(options)
     try:
         config = SOURCE_DB_CONFIG.copy()
         config['ssl_disabled'] = True
+        if options['source_database']:
+            config['database'] = options['source_database']
         conn = pymysql.connect(**config)
         logger.info("Connected to source database successfully")
         return conn
@@ -46,11 +207,18 @@ def get_source_connection():
         logger.error(f"Failed to connect to source database: {e}")
         raise
 
-def get_warehouse_connection():
+def get_warehouse_connection(options=None):
     """Get connection to warehouse database"""
+    options = get_etl_options(options)
     try:
         config = WAREHOUSE_DB_CONFIG.copy()
         config['ssl_disabled'] = True
+        if options['bulk_backend'] == 'load_data':
+            config['local_infile'] = True
+        if options['defer_constraints']:
+            config['init_command'] = DEFERRED_CHECKS_SQL
+        if options['warehouse_database']:
+            config['database'] = options['warehouse_database']
         conn = pymysql.connect(**config)
         logger.info("Connected to warehouse database successfully")
         return conn
@@ -58,8 +226,375 @@ def get_warehouse_connection():
         logger.error(f"Failed to connect to warehouse database: {e}")
         raise
 
-def create_warehouse_schema(warehouse_conn):
-    """Create warehouse tables from setup_dw.sql file"""
+def get_run_profiler(options=None):
+    """Profiler shared by every loader of the current run (one per process)"""
+    run_id = get_etl_options(options)['checkpoint_run']
+    with _run_profilers_lock:
+        if run_id not in _run_profilers:
+            _run_profilers[run_id] = RunProfiler()
+        return _run_profilers[run_id]
+
+def release_run_profiler(options):
+    with _run_profilers_lock:
+        _run_profilers.pop(options.get('checkpoint_run'), None)
+
+def get_memory_budget(options=None):
+    """
+    MemoryBudget of the current run in this process, shared by its loader threads;
+    None without a max_memory option. Its share per chunk assumes every loader
+    thread (and every pipelined queue slot) holds a chunk at the same time.
+    """
+    options = get_etl_options(options)
+    if not options['max_memory']:
+        return None
+    run_id = options['checkpoint_run']
+    with _memory_budgets_lock:
+        if run_id not in _memory_budgets:
+            loaders = options['workers'] if options['parallel'] else 1
+            _memory_budgets[run_id] = MemoryBudget(
+                options['max_memory'], options['chunk_size'],
+                in_flight_chunks(options['pipelined'], options['queue_chunks'], loaders))
+        return _memory_budgets[run_id]
+
+def release_memory_budget(options):
+    with _memory_budgets_lock:
+        _memory_budgets.pop(options.get('checkpoint_run'), None)
+
+def max_chunk_bytes(options):
+    """Ceiling of one extracted chunk: max_chunk_bytes, lowered to the memory budget's share"""
+    budget = get_memory_budget(options)
+    if budget is None:
+        return options['max_chunk_bytes']
+    return min(filter(None, [options['max_chunk_bytes'], budget.chunk_bytes]))
+
+def insert_rows(warehouse_conn, table, rows, options=None):
+    """
+    Insert transformed records into a warehouse table through the configured bulk load backend.
+    Incremental runs upsert so re-delivered or changed rows overwrite the stored version.
+    Records of the change-detected dimensions end with their row_hash (change_detection.py).
+    """
+    options = get_etl_options(options)
+    key = (options['bulk_backend'], options['bulk_batch_rows'], options['max_statement_bytes'])
+    if key not in _bulk_loaders:
+        _bulk_loaders[key] = get_bulk_loader(*key)
+    upsert = options['mode'] == 'incremental'
+    profile = get_run_profiler(options).loader(table)
+    columns = TABLE_COLUMNS[table]
+    if options['denormalize_facts'] and table in DENORMALIZED_COLUMNS:
+        columns = columns + DENORMALIZED_COLUMNS[table]
+    if table in HASHED_DIMENSIONS:
+        columns = columns + (HASH_COLUMN,)
+    if options['schema_version'] == 2 and table in ENCODED_TABLES:
+        # Not timed as a stage: LoaderProfile.end() charges the loader's untimed wall time to transform
+        rows = get_encoder(options).encode_rows(table, rows)
+        columns = encoded_columns(table, columns)
+    with profile.stage('load'):
+        loaded = _bulk_loaders[key].load(warehouse_conn, table, columns, rows, upsert=upsert)
+    profile.rows_loaded += loaded
+    return loaded
+
+def commit_rows(warehouse_conn, table, options=None):
+    """Commit a loader's inserted rows, timed as its commit stage"""
+    with get_run_profiler(options).loader(table).stage('commit'):
+        warehouse_conn.commit()
+
+def get_lookup_cache(options=None):
+    """
+    Dimension key lookup cache for this run. With a lookup_cache_dir every loader
+    thread shares one instance and worker processes reopen the same memory-mapped
+    arrays; without one a private cache is built for the caller.
+    """
+    options = get_etl_options(options)
+    directory = options['lookup_cache_dir']
+    if not directory:
+        return LookupCache()
+    with _lookup_caches_lock:
+        if directory not in _lookup_caches:
+            _lookup_caches[directory] = LookupCache(directory)
+        return _lookup_caches[directory]
+
+def get_checkpoint_log(options):
+    """Checkpoint log of the current run, or None when the loader runs outside run_etl_pipeline"""
+    run_id = options.get('checkpoint_run')
+    return CheckpointLog(run_id, CHECKPOINT_TABLE) if run_id else None
+
+def get_encoder(options):
+    """
+    Schema v2 attribute encoder of this run, shared by its loader threads; outside
+    run_etl_pipeline a private one is created for the caller.
+    """
+    def connect():
+        return get_warehouse_connection(options)
+    run_id = options.get('checkpoint_run')
+    if not run_id:
+        return Encoder(connect)
+    with _encoders_lock:
+        if run_id not in _encoders:
+            _encoders[run_id] = Encoder(connect)
+        return _encoders[run_id]
+
+def release_encoder(options):
+    with _encoders_lock:
+        _encoders.pop(options.get('checkpoint_run'), None)
+
+def release_lookup_cache(options):
+    """Drop the run's shared lookup cache and its files"""
+    directory = options.get('lookup_cache_dir')
+    if directory:
+        with _lookup_caches_lock:
+            _lookup_caches.pop(directory, None)
+        shutil.rmtree(directory, ignore_errors=True)
+
+def _watermark_key(source_table, column):
+    return f"{source_table}.{column}"
+
+def _parse_watermark(column, value):
+    """Id watermarks are compared as integers, date watermarks as strings"""
+    if value is None:
+        return None
+    return int(value) if column.endswith('_id') else str(value)
+
+def ensure_watermark_table(warehouse_conn):
+    """Create the etl_watermark control table if it does not exist yet"""
+    with warehouse_conn.cursor() as cursor:
+        cursor.execute(WATERMARK_TABLE_SQL)
+    warehouse_conn.commit()
+
+def read_watermarks(warehouse_conn):
+    """High-water marks recorded by the last successful run ({'trans.trans_id': 1056320, ...})"""
+    ensure_watermark_table(warehouse_conn)
+    with warehouse_conn.cursor() as cursor:
+        cursor.execute("SELECT source_table, column_name, high_water FROM etl_watermark")
+        return {_watermark_key(table, column): _parse_watermark(column, value)
+                for table, column, value in cursor.fetchall()}
+
+def capture_source_high_water(source_conn):
+    """Current maxima of the watermark columns; the run loads nothing beyond these"""
+    high_water = {}
+    with source_conn.cursor() as cursor:
+        for source_table, column in WATERMARK_COLUMNS:
+            cursor.execute(f"SELECT MAX({column}) FROM {source_table}")
+            high_water[_watermark_key(source_table, column)] = _parse_watermark(column, cursor.fetchone()[0])
+    return high_water
+
+def save_watermarks(warehouse_conn, high_water):
+    """Record the high-water marks of a successful run"""
+    ensure_watermark_table(warehouse_conn)
+    now = datetime.now()
+    records = []
+    for source_table, column in WATERMARK_COLUMNS:
+        value = high_water.get(_watermark_key(source_table, column))
+        if value is not None:
+            records.append((source_table, column, str(value), now))
+    with warehouse_conn.cursor() as cursor:
+        cursor.executemany("""
+            INSERT INTO etl_watermark (source_table, column_name, high_water, updated_at)
+            VALUES (%s, %s, %s, %s)
+            ON DUPLICATE KEY UPDATE high_water = VALUES(high_water), updated_at = VALUES(updated_at)
+        """, records)
+    warehouse_conn.commit()
+    logger.info(f"Recorded high-water marks: {high_water}")
+
+def warehouse_schema_exists(warehouse_conn):
+    """True when every star schema table is present in the warehouse"""
+    with warehouse_conn.cursor() as cursor:
+        cursor.execute("""
+            SELECT COUNT(*) FROM information_schema.TABLES
+            WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME IN %s
+        """, (tuple(TABLE_COLUMNS),))
+        return cursor.fetchone()[0] == len(TABLE_COLUMNS)
+
+def _range_filter(options, source_table, column, alias=None):
+    """
+    WHERE conditions bounding a source column to (low water, high water] for this run.
+    The low bound only applies to incremental runs.
+    """
+    key = _watermark_key(source_table, column)
+    qualified = f"{alias}.{column}" if alias else column
+    conditions, params = [], []
+    
+    low = (options['low_water'] or {}).get(key) if options['mode'] == 'incremental' else None
+    high = (options['high_water'] or {}).get(key)
+    if low is not None:
+        conditions.append(f"{qualified} > %s")
+        params.append(low)
+    if high is not None and column.endswith('_id'):
+        conditions.append(f"{qualified} <= %s")
+        params.append(high)
+    return conditions, params
+
+def _where(conditions):
+    return ("WHERE " + " AND ".join(conditions)) if conditions else ""
+
+def source_extract(name, options):
+    """
+    KeysetQuery (keyset.py) of a loader's source extract for this run, paged by a
+    unique key that is also the first selected column. The date_range extract is a
+    single MIN/MAX row without such a key and is always read in one statement.
+    """
+    if name == 'district':
+        return KeysetQuery("""district_id, district_name, region, inhabitants, noCities,
+               ratio_urbaninhabitants, average_salary, unemployment,
+               noEntrepreneur, noCrimes""", "district", "district_id")
+    
+    if name == 'client_account':
+        # Join client and account data; an account has exactly one OWNER disposition
+        return KeysetQuery("""a.account_id, c.client_id, a.frequency, a.newdate,
+               c.district_id""", """account a
+        JOIN disp d ON a.account_id = d.account_id
+        JOIN client c ON d.client_id = c.client_id""", "a.account_id", ["d.type = 'OWNER'"])
+    
+    if name == 'card':
+        return KeysetQuery("c.card_id, c.type, c.newissued, d.account_id",
+                           "card c JOIN disp d ON c.disp_id = d.disp_id", "c.card_id")
+    
+    if name == 'trans':
+        conditions, params = _range_filter(options, 'trans', 'trans_id')
+        return KeysetQuery("""trans_id, account_id, newdate, type, operation,
+               amount, balance, k_symbol, account""", "trans", "trans_id", conditions, params)
+    
+    if name == 'loan':
+        conditions, params = _range_filter(options, 'loan', 'loan_id', alias='l')
+        return KeysetQuery("""l.loan_id, l.account_id, l.newdate, l.amount, l.duration,
+               l.payments, l.status, COALESCE(ls.description, 'Unknown') as description""",
+                           "loan l LEFT JOIN ref_loanstatus ls ON l.status = ls.status",
+                           "l.loan_id", conditions, params)
+    
+    if name == 'date_range':
+        return None
+    raise ValueError(f"Unknown source extract: {name}")
+
+def source_query(name, options, after=None):
+    """
+    (query, params) of a loader's whole source extract for this run in one
+    statement, ordered by its key; after skips keys already loaded (resume).
+    """
+    if name != 'date_range':
+        return source_extract(name, options).statement(after)
+    
+    # First and last date of every source date column (no DISTINCT or sort over trans);
+    # incremental runs only look at dates of rows past the previous watermarks
+    trans_conditions, trans_params = _range_filter(options, 'trans', 'trans_id')
+    loan_conditions, loan_params = _range_filter(options, 'loan', 'loan_id')
+    card_conditions, card_params = _range_filter(options, 'card', 'newissued')
+    account_conditions, account_params = _range_filter(options, 'account', 'newdate')
+    query = f"""
+    SELECT MIN(first_date), MAX(last_date) FROM (
+        SELECT MIN(newdate) AS first_date, MAX(newdate) AS last_date FROM trans {_where(trans_conditions)}
+        UNION ALL SELECT MIN(newdate), MAX(newdate) FROM loan {_where(loan_conditions)}
+        UNION ALL SELECT MIN(newissued), MAX(newissued) FROM card {_where(card_conditions)}
+        UNION ALL SELECT MIN(newdate), MAX(newdate) FROM account {_where(account_conditions)}
+    ) AS date_ranges
+    """
+    return query, trans_params + loan_params + card_params + account_params
+
+def source_throttle(options):
+    """SourceThrottle for one keyset extract, or None when throttling is off"""
+    if options['source_busy_fraction'] >= 1 and not options['source_max_threads_running']:
+        return None
+    return SourceThrottle(options['source_busy_fraction'], options['source_max_threads_running'])
+
+def iter_extract_chunks(source_conn, extract, options, label, after=None):
+    """
+    Chunks of a KeysetQuery: keyset pages of chunk_size rows, or (without the
+    keyset option) one ordered statement read by iter_source_chunks.
+    """
+    if options['keyset']:
+        return KeysetReader(source_conn, extract, options['chunk_size'], after, source_throttle(options),
+                            max_chunk_bytes(options), label, get_memory_budget(options))
+    query, params = extract.statement(after)
+    return iter_source_chunks(source_conn, query, options, label, params)
+
+def extract_rows(source_conn, name, options):
+    """All rows of a dimension extract, read from the run's source snapshot when it has one"""
+    if options['snapshot']:
+        return Snapshot(options['snapshot']).read_rows(name)
+    extract = source_extract(name, options)
+    if extract is not None and options['keyset']:
+        return [row for page in iter_extract_chunks(source_conn, extract, options, name) for row in page]
+    query, params = source_query(name, options)
+    with source_conn.cursor() as source_cursor:
+        source_cursor.execute(query, params)
+        return source_cursor.fetchall()
+
+def extract_chunks(source_conn, name, options, label, after=None):
+    """Chunks of a fact extract from the source, or memory-mapped from the run's snapshot"""
+    if options['snapshot']:
+        return Snapshot(options['snapshot']).iter_chunks(name, options['chunk_size'], columnar=options['vectorized'],
+                                                         key_column=SNAPSHOT_KEYS[name], after=after,
+                                                         budget=get_memory_budget(options))
+    return iter_extract_chunks(source_conn, source_extract(name, options), options, label, after)
+
+def extract_row_chunks(source_conn, name, options):
+    """
+    A dimension extract as lists of row tuples: all rows at once, or under a memory
+    budget in chunks sized by it (keyset pages, streamed or snapshot batches)
+    """
+    if not options['max_memory']:
+        yield extract_rows(source_conn, name, options)
+    elif options['snapshot']:
+        yield from Snapshot(options['snapshot']).iter_chunks(name, options['chunk_size'],
+                                                             budget=get_memory_budget(options))
+    else:
+        yield from iter_extract_chunks(source_conn, source_extract(name, options), options, name)
+
+def split_foreign_keys(statement):
+    """
+    Strip FOREIGN KEY clauses from a CREATE TABLE statement.
+    Returns (statement without foreign keys, [(table, foreign key clause), ...]).
+    """
+    match = re.search(r'CREATE\s+TABLE\s+(\w+)', statement, re.IGNORECASE)
+    if not match:
+        return statement, []
+    table = match.group(1)
+    pattern = r',\s*(FOREIGN\s+KEY\s*\([^)]*\)\s*REFERENCES\s+\w+\s*\([^)]*\))'
+    foreign_keys = [(table, clause) for clause in re.findall(pattern, statement, re.IGNORECASE)]
+    return re.sub(pattern, '', statement, flags=re.IGNORECASE), foreign_keys
+
+def schema_paths(options):
+    """(schema, indexes) SQL files of the run's schema version"""
+    if options['schema_version'] == 2:
+        return SCHEMA_V2_SQL_PATH, INDEXES_V2_SQL_PATH
+    return SCHEMA_SQL_PATH, INDEXES_SQL_PATH
+
+def schema_foreign_keys(sql_file_path=SCHEMA_SQL_PATH, partition_facts=False):
+    """
+    Foreign keys declared in setup_dw.sql as [(table, clause), ...]. With
+    partition_facts the keys of the partitioned fact tables, which are never
+    created, are left out.
+    """
+    with open(sql_file_path, 'r') as file:
+        sql_content = file.read()
+    return [fk for statement in sql_content.split(';') for fk in split_foreign_keys(statement)[1]
+            if not (partition_facts and fk[0] in PARTITIONED_FACTS)]
+
+def fact_foreign_keys(sql_file_path=SCHEMA_SQL_PATH):
+    """Foreign keys of the fact tables, which partitioned facts cannot declare"""
+    return [fk for fk in schema_foreign_keys(sql_file_path) if fk[0] in PARTITIONED_FACTS]
+
+def _without_fact_foreign_keys(statement):
+    """A CREATE TABLE statement of a partitioned fact table without its foreign keys"""
+    stripped, foreign_keys = split_foreign_keys(statement)
+    return stripped if any(table in PARTITIONED_FACTS for table, _ in foreign_keys) else statement
+
+def read_index_definitions(sql_file_path=INDEXES_SQL_PATH):
+    """CREATE INDEX statements from indexes.sql as [(table, index name, column list), ...]"""
+    with open(sql_file_path, 'r') as file:
+        sql_content = file.read()
+    pattern = r'CREATE\s+INDEX\s+(\w+)\s+ON\s+(\w+)\s*\((.*?)\)\s*;'
+    return [(table, name, columns)
+            for name, table, columns in re.findall(pattern, sql_content, re.IGNORECASE | re.DOTALL)]
+
+def create_warehouse_schema(warehouse_conn, defer_constraints=False, sql_file_path=SCHEMA_SQL_PATH,
+                            partition_facts=False, denormalize_facts=False):
+    """
+    Create warehouse tables from setup_dw.sql file (or the setup_dw_v2.sql variant).
+    With defer_constraints the tables are created without their foreign keys, which
+    are returned as [(table, clause), ...] for build_deferred_constraints().
+    With partition_facts the fact tables are partitioned by partitions.sql and keep
+    no foreign keys (validate_fact_references() checks them instead).
+    With denormalize_facts denormalize.sql adds the copied dimension columns.
+    """
     logger.info("Creating warehouse schema...")
     
     try:
@@ -72,6 +607,10 @@ def create_warehouse_schema(warehouse_conn):
         DROP TABLE IF EXISTS DimClientAccount;
         DROP TABLE IF EXISTS DimDistrict;
         DROP TABLE IF EXISTS DimDate;
+        DROP TABLE IF EXISTS TransTypeJunk;
+        DROP TABLE IF EXISTS DimRegion;
+        DROP TABLE IF EXISTS DimFrequency;
+        DROP TABLE IF EXISTS DimCardType;
         SET FOREIGN_KEY_CHECKS = 1;
         """
         
@@ -80,17 +619,34 @@ def create_warehouse_schema(warehouse_conn):
             for statement in drop_statements:
                 cursor.execute(statement)
             warehouse_conn.commit()
-            logger.info("Existing tables dropped successfully")
+        drop_aggregate_tables(warehouse_conn)
+        logger.info("Existing tables dropped successfully")
         
         # Read and execute SQL file
-        sql_file_path = 'sql/warehouse_init/setup_dw.sql'
         with open(sql_file_path, 'r') as file:
             sql_content = file.read()
         
         sql_statements = [stmt.strip() for stmt in sql_content.split(';') if stmt.strip()]
+        if partition_facts:
+            with open(PARTITIONS_SQL_PATH, 'r') as file:
+                partition_statements = [stmt.strip() for stmt in file.read().split(';') if stmt.strip()]
+            sql_statements = [_without_fact_foreign_keys(statement) for statement in sql_statements]
+            sql_statements += partition_statements
+        if denormalize_facts:
+            with open(DENORMALIZE_SQL_PATH, 'r') as file:
+                sql_statements += [stmt.strip() for stmt in file.read().split(';') if stmt.strip()]
+        deferred_foreign_keys = []
+        if defer_constraints:
+            split_statements = [split_foreign_keys(statement) for statement in sql_statements]
+            sql_statements = [statement for statement, _ in split_statements]
+            deferred_foreign_keys = [fk for _, fks in split_statements for fk in fks]
+            logger.info(f"Deferring {len(deferred_foreign_keys)} foreign keys until after the load")
         
         with warehouse_conn.cursor() as cursor:
             for statement in sql_statements:
+                if statement.upper().startswith('USE'):
+                    # The connection already targets the schema being built (live or shadow)
+                    continue
                 if statement.upper().startswith('SELECT'):
                     cursor.execute(statement)
                     result = cursor.fetchone()
@@ -100,339 +656,672 @@ def create_warehouse_schema(warehouse_conn):
                     cursor.execute(statement)
             warehouse_conn.commit()
             logger.info("Warehouse schema created successfully!")
+        return deferred_foreign_keys
             
     except Exception as e:
         logger.error(f"Error creating warehouse schema: {e}")
         warehouse_conn.rollback()
         raise
 
-def load_dim_date(source_conn, warehouse_conn):
-    """Load DimDate dimension table"""
+def _foreign_key_parts(clause):
+    """(column, parent table, parent column) of a single-column FOREIGN KEY clause"""
+    match = re.match(r'FOREIGN\s+KEY\s*\((\w+)\)\s*REFERENCES\s+(\w+)\s*\((\w+)\)', clause, re.IGNORECASE)
+    return match.groups()
+
+def find_orphans(cursor, table, foreign_keys):
+    """
+    Check single-column foreign keys of one table with one orphan-counting scan.
+    Returns a description of every violated key (empty when all rows have parents).
+    """
+    table_fks = [_foreign_key_parts(clause) for fk_table, clause in foreign_keys if fk_table == table]
+    if not table_fks:
+        return []
+    joins = " ".join(f"LEFT JOIN {parent} p{i} ON p{i}.{parent_column} = c.{column}"
+                     for i, (column, parent, parent_column) in enumerate(table_fks))
+    counts = ", ".join(f"SUM(c.{column} IS NOT NULL AND p{i}.{parent_column} IS NULL)"
+                       for i, (column, parent, parent_column) in enumerate(table_fks))
+    cursor.execute(f"SELECT {counts} FROM {table} c {joins}")
+    orphans = cursor.fetchone()
+    return [f"{table}.{column} -> {parent}.{parent_column}: {int(count)} orphaned rows"
+            for (column, parent, parent_column), count in zip(table_fks, orphans) if count]
+
+def build_deferred_constraints(warehouse_conn, foreign_keys, timings=None, indexes_path=INDEXES_SQL_PATH):
+    """
+    Add the indexes from indexes.sql and the deferred foreign keys after a bulk load.
+
+    Each table's foreign keys are validated with a single orphan-counting scan, then
+    all of its indexes and constraints are added in one ALTER TABLE. The rows were
+    just checked, so the ALTER runs with foreign_key_checks = 0 and MySQL builds the
+    indexes in place instead of copying the table to re-verify every row.
+    """
+    logger.info("Building deferred indexes and foreign keys...")
+    indexes = read_index_definitions(indexes_path)
+    tables = list(dict.fromkeys([table for table, _ in foreign_keys] + [table for table, _, _ in indexes]))
+    timings = timings if timings is not None else {}
+    
+    try:
+        with warehouse_conn.cursor() as cursor:
+            cursor.execute("SET SESSION foreign_key_checks = 0")
+            for table in tables:
+                table_fks = [clause for fk_table, clause in foreign_keys if fk_table == table]
+                start = time.perf_counter()
+                
+                violations = find_orphans(cursor, table, foreign_keys)
+                if violations:
+                    raise ValueError("Foreign key validation failed: " + "; ".join(violations))
+                
+                clauses = [f"ADD INDEX {name} ({columns})" for index_table, name, columns in indexes
+                           if index_table == table]
+                clauses += [f"ADD {clause}" for fk_table, clause in foreign_keys if fk_table == table]
+                cursor.execute(f"ALTER TABLE {table} {', '.join(clauses)}")
+                
+                elapsed = time.perf_counter() - start
+                timings[f"constraints:{table}"] = elapsed
+                logger.info(f"{table}: validated {len(table_fks)} foreign keys, "
+                            f"added {len(clauses) - len(table_fks)} indexes in {elapsed:.2f}s")
+            cursor.execute("SET SESSION foreign_key_checks = 1, SESSION unique_checks = 1")
+        warehouse_conn.commit()
+        logger.info("Deferred indexes and foreign keys built successfully")
+        return timings
+        
+    except Exception as e:
+        logger.error(f"Error building deferred constraints: {e}")
+        warehouse_conn.rollback()
+        raise
+
+def load_dim_date(source_conn, warehouse_conn, options=None):
+    """
+    Load DimDate: one row per day from the first to the last source date, keyed by
+    YYYYMMDD (date_keys.py). Incremental runs only add the days that extend the range.
+    """
     logger.info("Loading DimDate dimension...")
+    options = get_etl_options(options)
     
     try:
-        with source_conn.cursor() as source_cursor:
-            # Extract unique dates from all source tables
-            date_query = """
-            SELECT DISTINCT newdate as date FROM (
-                SELECT newdate FROM trans 
-                UNION SELECT newdate FROM loan
-                UNION SELECT newissued as newdate FROM card
-                UNION SELECT newdate FROM account
-            ) AS all_dates
-            WHERE newdate IS NOT NULL
-            ORDER BY newdate
-            """
-            
-            source_cursor.execute(date_query)
-            dates = source_cursor.fetchall()
+        # First and last date used by the source tables
+        profile = get_run_profiler(options).loader('DimDate')
+        with profile.stage('extract'):
+            (first_value, last_value), = extract_rows(source_conn, 'date_range', options)
+        profile.rows_extracted += 1
             
         with warehouse_conn.cursor() as warehouse_cursor:
-            date_records = []
-            for i, (date_value,) in enumerate(dates, 1):
-                # Handle different date formats
-                if isinstance(date_value, str):
-                    if len(date_value) == 8 and date_value.isdigit():
-                        date_obj = datetime.strptime(date_value, '%Y%m%d').date()
-                    else:
-                        try:
-                            date_obj = datetime.strptime(date_value, '%Y-%m-%d').date()
-                        except:
-                            continue
+            # Days already in the calendar keep their rows; the range only grows
+            bounds, existing = [first_value, last_value], None
+            if options['mode'] == 'incremental':
+                warehouse_cursor.execute("SELECT MIN(date), MAX(date) FROM DimDate")
+                existing = warehouse_cursor.fetchone()
+                if existing[0] is None:
+                    existing = None
                 else:
-                    date_obj = date_value
-                
-                # Calculate date parts
-                quarter = (date_obj.month - 1) // 3 + 1
-                date_records.append((i, date_obj, quarter, date_obj.year, date_obj.month, date_obj.day))
+                    bounds += list(existing)
+            ordinals = [ordinal for ordinal in map(to_ordinal, bounds) if ordinal is not None]
+            
+            date_records = []
+            if ordinals:
+                first, last = date.fromordinal(min(ordinals)), date.fromordinal(max(ordinals))
+                date_records = calendar_records(first, last, skip=existing)
+                logger.info(f"DimDate calendar: {first} to {last}")
             
             # Insert data
-            insert_query = """
-            INSERT INTO DimDate (date_id, date, quarter, year, month, day)
-            VALUES (%s, %s, %s, %s, %s, %s)
-            """
-            warehouse_cursor.executemany(insert_query, date_records)
-            warehouse_conn.commit()
+            insert_rows(warehouse_conn, 'DimDate', date_records, options)
+            commit_rows(warehouse_conn, 'DimDate', options)
             logger.info(f"Loaded {len(date_records)} records into DimDate")
             
+            if options['partition_facts']:
+                # Year partitions exist before the fact loaders write into them
+                warehouse_cursor.execute("SELECT MIN(year), MAX(year) FROM DimDate")
+                ensure_year_partitions(warehouse_conn, *warehouse_cursor.fetchone())
+            
     except Exception as e:
         logger.error(f"Error loading DimDate: {e}")
         warehouse_conn.rollback()
         raise
 
-def load_dim_district(source_conn, warehouse_conn):
+def dimension_changes(warehouse_conn, table, options):
+    """
+    Change detection of a dimension load: incremental runs compare against the stored
+    row hashes, full loads write every row into their fresh tables
+    """
+    if options['mode'] != 'incremental':
+        return DimensionChanges(table)
+    ensure_hash_columns(warehouse_conn)
+    return DimensionChanges.load(warehouse_conn, table, TABLE_COLUMNS[table][0])
+
+def record_dimension_changes(options, changes):
+    """Remember how many existing rows a dimension loader of this run rewrote"""
+    with _dimension_changes_lock:
+        _dimension_changes.setdefault(options.get('checkpoint_run'), {})[changes.table] = changes.changed
+
+def changed_dimensions(options):
+    """Dimensions whose existing rows the loaders of this run changed"""
+    with _dimension_changes_lock:
+        recorded = _dimension_changes.get(options.get('checkpoint_run'), {})
+        return tuple(table for table, changed in recorded.items() if changed)
+
+def release_dimension_changes(options):
+    with _dimension_changes_lock:
+        _dimension_changes.pop(options.get('checkpoint_run'), None)
+
+def load_dim_district(source_conn, warehouse_conn, options=None):
     """Load DimDistrict dimension table"""
     logger.info("Loading DimDistrict dimension...")
+    options = get_etl_options(options)
     
     try:
-        with source_conn.cursor() as source_cursor:
-            district_query = """
-            SELECT district_id, district_name, region, inhabitants, noCities,
-                   ratio_urbaninhabitants, average_salary, unemployment, 
-                   noEntrepreneur, noCrimes
-            FROM district
-            ORDER BY district_id
-            """
-            source_cursor.execute(district_query)
-            districts = source_cursor.fetchall()
-            
-        with warehouse_conn.cursor() as warehouse_cursor:
-            # Clean and transform data
-            district_records = []
-            for district in districts:
-                (district_id, district_name, region, inhabitants, noCities, 
-                 ratio_urban, avg_salary, unemployment, noEntrepreneur, noCrimes) = district
-                
-                # Handle null values
-                district_records.append((
-                    district_id, district_name, region,
-                    int(inhabitants) if inhabitants else 0,
-                    int(noCities) if noCities else 0,
-                    float(ratio_urban) if ratio_urban else 0.0,
-                    float(avg_salary) if avg_salary else 0.0,
-                    float(unemployment) if unemployment else 0.0,
-                    int(noEntrepreneur) if noEntrepreneur else 0,
-                    int(noCrimes) if noCrimes else 0
-                ))
+        profile = get_run_profiler(options).loader('DimDistrict')
+        with profile.stage('extract'):
+            districts = extract_rows(source_conn, 'district', options)
+        profile.rows_extracted += len(districts)
+        changes = dimension_changes(warehouse_conn, 'DimDistrict', options)
             
-            insert_query = """
-            INSERT INTO DimDistrict (
-                district_id, district_name, region, inhabitants, noCities,
-                ratio_urbaninhabitants, average_salary, unemployment, 
-                noEntrepreneur, noCrimes
-            ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-            """
-            warehouse_cursor.executemany(insert_query, district_records)
-            warehouse_conn.commit()
-            logger.info(f"Loaded {len(district_records)} records into DimDistrict")
+        # Clean and transform data
+        district_records = []
+        for district in districts:
+            (district_id, district_name, region, inhabitants, noCities, 
+             ratio_urban, avg_salary, unemployment, noEntrepreneur, noCrimes) = district
             
+            # Handle null values
+            district_records.append((
+                district_id, district_name, region,
+                int(inhabitants) if inhabitants else 0,
+                int(noCities) if noCities else 0,
+                float(ratio_urban) if ratio_urban else 0.0,
+                float(avg_salary) if avg_salary else 0.0,
+                float(unemployment) if unemployment else 0.0,
+                int(noEntrepreneur) if noEntrepreneur else 0,
+                int(noCrimes) if noCrimes else 0
+            ))
+        
+        # Only new and changed districts are written
+        district_records = changes.filter(hash_records(district_records))
+        insert_rows(warehouse_conn, 'DimDistrict', district_records, options)
+        commit_rows(warehouse_conn, 'DimDistrict', options)
+        logger.info(f"Loaded {len(district_records)} records into DimDistrict")
+        changes.log()
+        record_dimension_changes(options, changes)
+        
+        if options['denormalize_facts'] and options['schema_version'] == 1:
+            # Region codes the fact loaders copy (schema v2 encodes them with DimDistrict)
+            add_region_codes(warehouse_conn)
+        
     except Exception as e:
         logger.error(f"Error loading DimDistrict: {e}")
         warehouse_conn.rollback()
         raise
 
-def load_dim_client_account(source_conn, warehouse_conn):
+def load_dim_client_account(source_conn, warehouse_conn, options=None):
     """Load DimClientAccount dimension table"""
     logger.info("Loading DimClientAccount dimension...")
+    options = get_etl_options(options)
     
     try:
-        with source_conn.cursor() as source_cursor:
-            # Join client and account data
-            client_account_query = """
-            SELECT a.account_id, c.client_id, a.frequency, a.newdate,
-                   c.district_id
-            FROM account a
-            JOIN disp d ON a.account_id = d.account_id
-            JOIN client c ON d.client_id = c.client_id
-            WHERE d.type = 'OWNER'
-            ORDER BY a.account_id
-            """
-            source_cursor.execute(client_account_query)
-            client_accounts = source_cursor.fetchall()
+        profile = get_run_profiler(options).loader('DimClientAccount')
             
         # Get date mappings
-        with warehouse_conn.cursor() as warehouse_cursor:
-            warehouse_cursor.execute("SELECT date, date_id FROM DimDate")
-            date_mappings = {str(date_val): date_id for date_val, date_id in warehouse_cursor.fetchall()}
-            
-            # Process client account data
+        lookup = get_lookup_cache(options).ensure_dates(warehouse_conn)
+        
+        # Incremental runs keep the surrogate keys already handed out (dense account_id -> key array)
+        existing_keys = None
+        next_id = 1
+        if options['mode'] == 'incremental':
+            existing_keys = LookupCache.build_account_keys(warehouse_conn)
+            next_id = int(existing_keys.max(initial=0)) + 1
+        changes = dimension_changes(warehouse_conn, 'DimClientAccount', options)
+        
+        # Extracted, transformed and inserted chunk by chunk under a memory budget
+        loaded = 0
+        for client_accounts in profile.timed_chunks(extract_row_chunks(source_conn, 'client_account', options)):
             client_account_records = []
-            for i, (account_id, client_id, frequency, account_date, district_id) in enumerate(client_accounts, 1):
-                date_key = str(account_date) if account_date else None
-                date_id = date_mappings.get(date_key, 1)
+            for account_id, client_id, frequency, account_date, district_id in client_accounts:
+                date_id = lookup.date_key(account_date)
+                
+                clientAcc_id = None
+                if existing_keys is not None and account_id < len(existing_keys):
+                    clientAcc_id = int(existing_keys[account_id]) or None
+                if clientAcc_id is None:
+                    clientAcc_id = next_id
+                    next_id += 1
                 
                 client_account_records.append((
-                    i, client_id, account_id,
+                    clientAcc_id, client_id, account_id,
                     district_id, district_id, date_id,
                     frequency if frequency else 'UNKNOWN'
                 ))
             
-            insert_query = """
-            INSERT INTO DimClientAccount (
-                clientAcc_id, client_id, account_id, 
-                distCli_id, distAcc_id, date_id, frequency
-            ) VALUES (%s, %s, %s, %s, %s, %s, %s)
-            """
-            warehouse_cursor.executemany(insert_query, client_account_records)
-            warehouse_conn.commit()
-            logger.info(f"Loaded {len(client_account_records)} records into DimClientAccount")
+            # Only new and changed accounts are written; existing ones keep their keys
+            client_account_records = changes.filter(hash_records(client_account_records))
+            insert_rows(warehouse_conn, 'DimClientAccount', client_account_records, options)
+            loaded += len(client_account_records)
+        commit_rows(warehouse_conn, 'DimClientAccount', options)
+        logger.info(f"Loaded {loaded} records into DimClientAccount")
+        changes.log()
+        record_dimension_changes(options, changes)
             
     except Exception as e:
         logger.error(f"Error loading DimClientAccount: {e}")
         warehouse_conn.rollback()
         raise
 
-def load_dim_card(source_conn, warehouse_conn):
+def load_dim_card(source_conn, warehouse_conn, options=None):
     """Load DimCard dimension table"""
     logger.info("Loading DimCard dimension...")
+    options = get_etl_options(options)
     
     try:
-        with source_conn.cursor() as source_cursor:
-            card_query = """
-            SELECT c.card_id, c.type, c.newissued, d.account_id
-            FROM card c
-            JOIN disp d ON c.disp_id = d.disp_id
-            ORDER BY c.card_id
-            """
-            source_cursor.execute(card_query)
-            cards = source_cursor.fetchall()
+        profile = get_run_profiler(options).loader('DimCard')
             
-        with warehouse_conn.cursor() as warehouse_cursor:
-            # Get mappings
-            warehouse_cursor.execute("SELECT account_id, clientAcc_id FROM DimClientAccount")
-            client_account_mappings = {account_id: clientAcc_id for account_id, clientAcc_id in warehouse_cursor.fetchall()}
-            
-            warehouse_cursor.execute("SELECT date, date_id FROM DimDate")
-            date_mappings = {str(date_val): date_id for date_val, date_id in warehouse_cursor.fetchall()}
-            
-            # Process card data
+        # Get mappings
+        lookup = get_lookup_cache(options).ensure_accounts(warehouse_conn).ensure_dates(warehouse_conn)
+        changes = dimension_changes(warehouse_conn, 'DimCard', options)
+        
+        # Extracted, transformed and inserted chunk by chunk under a memory budget
+        loaded = 0
+        for cards in profile.timed_chunks(extract_row_chunks(source_conn, 'card', options)):
             card_records = []
             for card_id, card_type, card_date, account_id in cards:
-                clientAcc_id = client_account_mappings.get(account_id)
+                clientAcc_id = lookup.account_key(account_id)
                 if not clientAcc_id:
                     continue
                     
-                date_key = str(card_date) if card_date else None
-                date_id = date_mappings.get(date_key, 1)
+                date_id = lookup.date_key(card_date)
                 
                 card_records.append((
                     card_id, clientAcc_id, date_id,
                     card_type if card_type else 'UNKNOWN'
                 ))
             
-            insert_query = """
-            INSERT INTO DimCard (card_id, clientAcc_id, date_id, type)
-            VALUES (%s, %s, %s, %s)
-            """
-            warehouse_cursor.executemany(insert_query, card_records)
-            warehouse_conn.commit()
-            logger.info(f"Loaded {len(card_records)} records into DimCard")
+            # Only new and changed cards are written
+            card_records = changes.filter(hash_records(card_records))
+            insert_rows(warehouse_conn, 'DimCard', card_records, options)
+            loaded += len(card_records)
+        commit_rows(warehouse_conn, 'DimCard', options)
+        logger.info(f"Loaded {loaded} records into DimCard")
+        changes.log()
+        record_dimension_changes(options, changes)
             
     except Exception as e:
         logger.error(f"Error loading DimCard: {e}")
         warehouse_conn.rollback()
         raise
 
-def load_fact_trans(source_conn, warehouse_conn):
-    """Load FactTrans fact table"""
-    logger.info("Loading FactTrans fact table...")
+def iter_source_chunks(source_conn, query, options=None, label="source", params=None):
+    """
+    Extract a source query in chunks.
+
+    In streaming mode an unbuffered server-side cursor (SSCursor) is used and rows
+    are pulled with fetchmany(), so only one chunk is held in memory at a time.
+    The chunk size is shrunk after the first chunk if it would exceed the
+    max_chunk_bytes ceiling, and re-sized after every chunk under a memory budget.
+    Without streaming the whole result is fetched at once and yielded as a single
+    chunk (a memory budget always streams).
+    """
+    options = get_etl_options(options)
+    budget = get_memory_budget(options)
     
-    try:
+    if not options['stream'] and budget is None:
         with source_conn.cursor() as source_cursor:
-            trans_query = """
-            SELECT trans_id, account_id, newdate, type, operation,
-                   amount, balance, k_symbol, account
-            FROM trans
-            ORDER BY trans_id
-            """
-            source_cursor.execute(trans_query)
-            transactions = source_cursor.fetchall()
-            
-        with warehouse_conn.cursor() as warehouse_cursor:
-            # Get mappings
-            warehouse_cursor.execute("SELECT account_id, clientAcc_id FROM DimClientAccount")
-            client_account_mappings = {account_id: clientAcc_id for account_id, clientAcc_id in warehouse_cursor.fetchall()}
+            source_cursor.execute(query, params)
+            yield list(source_cursor.fetchall())
+        return
+    
+    chunk_size = max(1, int(options['chunk_size']))
+    chunk_bytes = max_chunk_bytes(options)
+    row_bytes = None
+    
+    with source_conn.cursor(pymysql.cursors.SSCursor) as source_cursor:
+        source_cursor.execute(query, params)
+        chunk_no = 0
+        while True:
+            rows = source_cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            chunk_no += 1
             
-            warehouse_cursor.execute("SELECT date, date_id FROM DimDate")
-            date_mappings = {str(date_val): date_id for date_val, date_id in warehouse_cursor.fetchall()}
+            if chunk_no == 1:
+                row_bytes = estimate_row_bytes(rows)
+                if chunk_bytes and row_bytes and chunk_size * row_bytes > chunk_bytes:
+                    chunk_size = max(1, chunk_bytes // row_bytes)
+                    logger.info(f"{label}: chunk size capped at {chunk_size:,} rows "
+                                f"(~{row_bytes} bytes/row, ceiling {chunk_bytes:,} bytes)")
+            yield list(rows)
+            if budget:
+                chunk_size = budget.adapt(chunk_size, label, row_bytes)
+
+def _log_chunk_progress(table, chunk_no, extracted, loaded, total_loaded, start_time):
+    """Per-chunk progress line for streamed fact loads"""
+    elapsed = time.time() - start_time
+    rate = total_loaded / elapsed if elapsed > 0 else 0.0
+    logger.info(f"{table} chunk {chunk_no}: {extracted:,} extracted, {loaded:,} loaded "
+                f"({total_loaded:,} total, {rate:,.0f} rows/s)")
+
+def _transform_trans_rows(transactions, lookup):
+    """Transform a chunk of source trans rows into FactTrans records"""
+    trans_records = []
+    for (trans_id, account_id, trans_date, trans_type, operation, 
+         amount, balance, k_symbol, account) in transactions:
+        
+        clientAcc_id = lookup.account_key(account_id)
+        if not clientAcc_id:
+            continue
             
-            # Process transaction data
-            trans_records = []
-            for (trans_id, account_id, trans_date, trans_type, operation, 
-                 amount, balance, k_symbol, account) in transactions:
-                
-                clientAcc_id = client_account_mappings.get(account_id)
-                if not clientAcc_id:
-                    continue
-                    
-                date_key = str(trans_date) if trans_date else None
-                date_id = date_mappings.get(date_key, 1)
-                
-                # Clean data
+        date_id = lookup.date_key(trans_date)
+        date_year = lookup.date_year(date_id)
+        
+        # Clean data
+        account_int = 0
+        if account:
+            try:
+                account_int = int(account)
+            except (ValueError, TypeError):
                 account_int = 0
-                if account:
-                    try:
-                        account_int = int(account)
-                    except (ValueError, TypeError):
-                        account_int = 0
-                
-                trans_records.append((
-                    trans_id, clientAcc_id, date_id, account_int,
-                    trans_type if trans_type else 'UNKNOWN',
-                    operation if operation and operation != 'UNKNOWN' else None,
-                    k_symbol if k_symbol else '',
-                    float(amount) if amount else 0.0,
-                    float(balance) if balance else 0.0
-                ))
+        
+        trans_records.append((
+            trans_id, clientAcc_id, date_id, date_year, account_int,
+            trans_type if trans_type else 'UNKNOWN',
+            operation if operation and operation != 'UNKNOWN' else None,
+            k_symbol if k_symbol else '',
+            float(amount) if amount else 0.0,
+            float(balance) if balance else 0.0
+        ))
+    return trans_records
+
+def _transform_loan_rows(loans, lookup):
+    """Transform a chunk of source loan rows into FactLoan records"""
+    loan_records = []
+    for (loan_id, account_id, loan_date, amount, duration, 
+         payments, status, description) in loans:
+        
+        clientAcc_id = lookup.account_key(account_id)
+        if not clientAcc_id:
+            continue
             
-            insert_query = """
-            INSERT INTO FactTrans (
-                trans_id, clientAcc_id, date_id, account, type, operation,
-                k_symbol, amount, balance
-            ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
-            """
-            warehouse_cursor.executemany(insert_query, trans_records)
-            warehouse_conn.commit()
-            logger.info(f"Loaded {len(trans_records)} records into FactTrans")
+        date_id = lookup.date_key(loan_date)
+        
+        loan_records.append((
+            loan_id, clientAcc_id, date_id, lookup.date_year(date_id),
+            status if status else 'U',
+            int(amount) if amount else 0,
+            int(duration) if duration else 0,
+            float(payments) if payments else 0.0,
+            description
+        ))
+    return loan_records
+
+def _resume_fact_load(warehouse_conn, options, task, table, key_column, low=None, high=None):
+    """
+    Last source key committed by task in this run (None to start from the beginning).
+    A resumed full load first deletes whatever is past that key in (low, high], so a
+    chunk interrupted mid-commit is reloaded cleanly and the resume stays idempotent.
+    """
+    checkpoint = get_checkpoint_log(options)
+    if checkpoint is None:
+        return None
+    last_key = checkpoint.last_key(warehouse_conn, task)
+    if options['resume'] and options['mode'] == 'full':
+        start = last_key if last_key is not None else low
+        conditions, params = [], []
+        if start is not None:
+            conditions.append(f"{key_column} > %s")
+            params.append(start)
+        if high is not None:
+            conditions.append(f"{key_column} <= %s")
+            params.append(high)
+        with warehouse_conn.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {table} {_where(conditions)}", params)
+            removed = cursor.rowcount
+        warehouse_conn.commit()
+        logger.info(f"{task}: resuming after {key_column} {last_key} ({removed} uncommitted rows cleared)")
+    return last_key
+
+def _by_chunk_layout(vectorized, per_row):
+    """A chunk transform that runs vectorized on columnar chunks and row by row on tuple chunks"""
+    def transform(chunk, lookup):
+        # Building columns from a list of tuples costs more than the vectorized
+        # transform saves, so tuple chunks keep the per-row loop
+        if hasattr(chunk, 'iloc'):
+            return vectorized(chunk, lookup)
+        return per_row(chunk, lookup)
+    return transform
+
+def _fact_transforms(options):
+    """(trans, loan) chunk transform functions selected by the vectorized option"""
+    if options['vectorized']:
+        return (_by_chunk_layout(transform_trans_chunk, _transform_trans_rows),
+                _by_chunk_layout(transform_loan_chunk, _transform_loan_rows))
+    return _transform_trans_rows, _transform_loan_rows
+
+def _load_fact_chunks(warehouse_conn, table, chunks, transform, lookup, options,
+                      checkpoint_task=None, commit_each_chunk=None):
+    """
+    Transform and load extracted source chunks into a fact table; returns rows loaded.
+
+    With commit_each_chunk every chunk is inserted and checkpointed in a transaction
+    of its own; otherwise all chunks share one, committed at the end. Sequential by
+    default; with the pipelined option extraction, transformation and loading run
+    as concurrent stages over bounded queues (stages.py), whose chunks are spilled
+    to disk while the run is over its memory budget. Only the load stage touches
+    warehouse_conn.
+    """
+    checkpoint = get_checkpoint_log(options) if checkpoint_task else None
+    if commit_each_chunk is None:
+        commit_each_chunk = options['stream']
+    if options['denormalize_facts']:
+        lookup.ensure_denormalized(warehouse_conn)
+    start_time = time.time()
+    progress = {'chunks': 0, 'loaded': 0, 'in_transaction': False}
+    
+    def transform_chunk(chunk):
+        # Snapshot replays of vectorized loads yield DataFrames; the key is the first column either way
+        last_key = int(chunk.iloc[-1, 0]) if hasattr(chunk, 'iloc') else chunk[-1][0]
+        records = transform(chunk, lookup)
+        if options['denormalize_facts']:
+            records = stamp_records(table, records, lookup)
+        return len(chunk), last_key, records
+    
+    def load_chunk(transformed):
+        extracted, last_key, records = transformed
+        if not progress['in_transaction']:
+            # begin() commits whatever is open, so only when no chunk is pending
+            warehouse_conn.begin()
+            progress['in_transaction'] = True
+        insert_rows(warehouse_conn, table, records, options)
+        if checkpoint:
+            checkpoint.record_chunk(warehouse_conn, checkpoint_task, last_key, len(records))
+        progress['chunks'] += 1
+        progress['loaded'] += len(records)
+        if commit_each_chunk:
+            commit_rows(warehouse_conn, table, options)
+            progress['in_transaction'] = False
+            _log_chunk_progress(checkpoint_task or table, progress['chunks'], extracted,
+                                len(records), progress['loaded'], start_time)
+    
+    if options['pipelined']:
+        budget = get_memory_budget(options)
+        spill = ChunkSpill(budget, options['lookup_cache_dir']) if budget else None
+        try:
+            StagedPipeline(checkpoint_task or table, options['queue_chunks'], spill).run(
+                chunks, transform_chunk, load_chunk)
+        finally:
+            if spill:
+                spill.close()
+    else:
+        for chunk in chunks:
+            load_chunk(transform_chunk(chunk))
+    commit_rows(warehouse_conn, table, options)
+    return progress['loaded']
+
+def plan_trans_partitions(source_conn, options=None):
+    """
+    Split this run's trans_id range into (low, high] partitions.
+
+    quantile picks boundaries at equal row-count offsets along the primary key;
+    minmax splits the MIN..MAX id span evenly (cheaper, but skewed by id gaps).
+    """
+    options = get_etl_options(options)
+    conditions, params = _range_filter(options, 'trans', 'trans_id')
+    
+    with source_conn.cursor() as cursor:
+        cursor.execute(f"SELECT MIN(trans_id), MAX(trans_id), COUNT(*) FROM trans {_where(conditions)}", params)
+        min_id, max_id, row_count = cursor.fetchone()
+        if not row_count:
+            return []
+        
+        partitions = max(1, min(int(options['trans_partitions']), row_count))
+        lower = min_id - 1
+        bounds = []
+        if options['partition_method'] == 'quantile':
+            for i in range(1, partitions):
+                cursor.execute(f"""
+                    SELECT trans_id FROM trans {_where(conditions)}
+                    ORDER BY trans_id LIMIT 1 OFFSET %s
+                """, params + [row_count * i // partitions - 1])
+                bounds.append(cursor.fetchone()[0])
+        else:
+            span = max_id - lower
+            bounds = [lower + span * i // partitions for i in range(1, partitions)]
+    
+    edges = [lower] + sorted(set(bounds)) + [max_id]
+    return [(edges[i], edges[i + 1]) for i in range(len(edges) - 1) if edges[i] < edges[i + 1]]
+
+def _load_fact_trans_range(id_range, options):
+    """
+    Process pool worker: extract, transform and load trans_id range (low, high].
+    Runs on its own connections; the source side reads inside a consistent snapshot
+    transaction, and every range is bounded by the run's captured high-water mark.
+    Returns the range's loader profile for the parent to merge.
+    """
+    low, high = id_range
+    task = f"FactTrans({low},{high}]"
+    source_conn = get_source_connection(options)
+    warehouse_conn = get_warehouse_connection(options)
+    checkpoint = get_checkpoint_log(options)
+    # Worker processes are reused across ranges, so every range reports a fresh profile
+    release_run_profiler(options)
+    profile = get_run_profiler(options).loader('FactTrans')
+    profile.begin(source_conn, warehouse_conn)
+    
+    try:
+        with source_conn.cursor() as source_cursor:
+            source_cursor.execute("START TRANSACTION WITH CONSISTENT SNAPSHOT, READ ONLY")
+        
+        # Memory-mapped from the run's shared cache directory when one is set
+        lookup = get_lookup_cache(options).ensure_accounts(warehouse_conn).ensure_dates(warehouse_conn)
+        transform_trans, _ = _fact_transforms(options)
+        resume_key = _resume_fact_load(warehouse_conn, options, task, 'FactTrans', 'trans_id', low, high)
+        
+        trans_extract = source_extract('trans', options)
+        trans_extract.conditions.append("trans_id <= %s")
+        trans_extract.params.append(high)
+        start = low if resume_key is None else max(low, resume_key)
+        chunks = profile.timed_chunks(iter_extract_chunks(source_conn, trans_extract, options,
+                                                          f"FactTrans ({low}, {high}]", start))
+        loaded = _load_fact_chunks(warehouse_conn, 'FactTrans', chunks, transform_trans, lookup, options,
+                                   checkpoint_task=task, commit_each_chunk=True)
+        
+        if checkpoint:
+            checkpoint.mark_done(warehouse_conn, task)
+        source_conn.commit()
+        profile.end(source_conn, warehouse_conn)
+        logger.info(f"FactTrans range ({low}, {high}]: loaded {loaded:,} records")
+        return profile.to_dict()
+    except Exception:
+        warehouse_conn.rollback()
+        raise
+    finally:
+        source_conn.close()
+        warehouse_conn.close()
+
+def load_fact_trans_partitioned(source_conn, warehouse_conn, options=None):
+    """Load FactTrans as balanced trans_id ranges across a process pool"""
+    options = get_etl_options(options)
+    checkpoint = get_checkpoint_log(options)
+    
+    # A resumed run reuses its saved plan so every range keeps its checkpoint
+    ranges = checkpoint.state(warehouse_conn, 'FactTrans:plan') if checkpoint else None
+    if ranges is None:
+        ranges = plan_trans_partitions(source_conn, options)
+        if checkpoint:
+            checkpoint.save_state(warehouse_conn, 'FactTrans:plan', ranges)
+    ranges = [tuple(id_range) for id_range in ranges]
+    # Build the shared key arrays once so every worker just memory-maps them
+    lookup = get_lookup_cache(options).ensure_accounts(warehouse_conn).ensure_dates(warehouse_conn)
+    if options['denormalize_facts']:
+        lookup.ensure_denormalized(warehouse_conn)
+    logger.info(f"Loading FactTrans in {len(ranges)} partitions ({options['partition_method']}): {ranges}")
+    
+    if checkpoint:
+        completed = checkpoint.completed(warehouse_conn)
+        ranges = [(low, high) for low, high in ranges if f"FactTrans({low},{high}]" not in completed]
+    
+    # Every worker process gets an equal share of the memory budget, as does this one
+    worker_options = options
+    if options['max_memory']:
+        worker_options = dict(options, max_memory=options['max_memory'] // (len(ranges) + 1))
+    
+    # spawn so workers never inherit the parent's open MySQL sockets
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=len(ranges) or 1, mp_context=context) as pool:
+        futures = [pool.submit(_load_fact_trans_range, id_range, worker_options) for id_range in ranges]
+        profile = get_run_profiler(options).loader('FactTrans')
+        total_loaded = 0
+        for future in futures:
+            range_profile = future.result()
+            profile.merge(range_profile)
+            total_loaded += range_profile['rows_loaded']
+    
+    logger.info(f"Loaded {total_loaded} records into FactTrans")
+    return total_loaded
+
+def load_fact_trans(source_conn, warehouse_conn, options=None):
+    """Load FactTrans fact table"""
+    logger.info("Loading FactTrans fact table...")
+    options = get_etl_options(options)
+    
+    if options['trans_partitions'] > 1 and options['snapshot']:
+        logger.info("Replaying FactTrans from the source snapshot serially (partitions read the source)")
+    elif options['trans_partitions'] > 1:
+        try:
+            load_fact_trans_partitioned(source_conn, warehouse_conn, options)
+        except Exception as e:
+            logger.error(f"Error loading FactTrans: {e}")
+            raise
+        return
+    
+    try:
+        # Get mappings
+        lookup = get_lookup_cache(options).ensure_accounts(warehouse_conn).ensure_dates(warehouse_conn)
+        transform_trans, _ = _fact_transforms(options)
+        resume_key = _resume_fact_load(warehouse_conn, options, 'FactTrans', 'FactTrans', 'trans_id')
+        
+        # Extract, transform and insert chunk by chunk
+        profile = get_run_profiler(options).loader('FactTrans')
+        chunks = profile.timed_chunks(extract_chunks(source_conn, 'trans', options, "FactTrans", resume_key))
+        total_loaded = _load_fact_chunks(warehouse_conn, 'FactTrans', chunks, transform_trans, lookup, options,
+                                         checkpoint_task='FactTrans')
+        logger.info(f"Loaded {total_loaded} records into FactTrans")
             
     except Exception as e:
         logger.error(f"Error loading FactTrans: {e}")
         warehouse_conn.rollback()
         raise
 
-def load_fact_loan(source_conn, warehouse_conn):
+def load_fact_loan(source_conn, warehouse_conn, options=None):
     """Load FactLoan fact table"""
     logger.info("Loading FactLoan fact table...")
+    options = get_etl_options(options)
     
     try:
-        with source_conn.cursor() as source_cursor:
-            loan_query = """
-            SELECT l.loan_id, l.account_id, l.newdate, l.amount, l.duration,
-                   l.payments, l.status, COALESCE(ls.description, 'Unknown') as description
-            FROM loan l
-            LEFT JOIN ref_loanstatus ls ON l.status = ls.status
-            ORDER BY l.loan_id
-            """
-            source_cursor.execute(loan_query)
-            loans = source_cursor.fetchall()
-            
-        with warehouse_conn.cursor() as warehouse_cursor:
-            # Get mappings
-            warehouse_cursor.execute("SELECT account_id, clientAcc_id FROM DimClientAccount")
-            client_account_mappings = {account_id: clientAcc_id for account_id, clientAcc_id in warehouse_cursor.fetchall()}
-            
-            warehouse_cursor.execute("SELECT date, date_id FROM DimDate")
-            date_mappings = {str(date_val): date_id for date_val, date_id in warehouse_cursor.fetchall()}
-            
-            # Process loan data
-            loan_records = []
-            for (loan_id, account_id, loan_date, amount, duration, 
-                 payments, status, description) in loans:
-                
-                clientAcc_id = client_account_mappings.get(account_id)
-                if not clientAcc_id:
-                    continue
-                    
-                date_key = str(loan_date) if loan_date else None
-                date_id = date_mappings.get(date_key, 1)
-                
-                loan_records.append((
-                    loan_id, clientAcc_id, date_id,
-                    status if status else 'U',
-                    int(amount) if amount else 0,
-                    int(duration) if duration else 0,
-                    float(payments) if payments else 0.0,
-                    description
-                ))
-            
-            insert_query = """
-            INSERT INTO FactLoan (
-                loan_id, clientAcc_id, date_id, status, amount, duration, payments, description
-            ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-            """
-            warehouse_cursor.executemany(insert_query, loan_records)
-            warehouse_conn.commit()
-            logger.info(f"Loaded {len(loan_records)} records into FactLoan")
+        # Get mappings
+        lookup = get_lookup_cache(options).ensure_accounts(warehouse_conn).ensure_dates(warehouse_conn)
+        _, transform_loan = _fact_transforms(options)
+        resume_key = _resume_fact_load(warehouse_conn, options, 'FactLoan', 'FactLoan', 'loan_id')
+        
+        # Extract, transform and insert chunk by chunk
+        profile = get_run_profiler(options).loader('FactLoan')
+        chunks = profile.timed_chunks(extract_chunks(source_conn, 'loan', options, "FactLoan", resume_key))
+        total_loaded = _load_fact_chunks(warehouse_conn, 'FactLoan', chunks, transform_loan, lookup, options,
+                                         checkpoint_task='FactLoan')
+        logger.info(f"Loaded {total_loaded} records into FactLoan")
             
     except Exception as e:
         logger.error(f"Error loading FactLoan: {e}")
@@ -468,41 +1357,504 @@ def validate_data_quality(warehouse_conn):
         logger.error(f"Error during data quality validation: {e}")
         raise
 
-def run_etl_pipeline():
+def validate_fact_references(warehouse_conn, sql_file_path=SCHEMA_SQL_PATH):
+    """
+    Check the foreign keys the partitioned fact tables cannot declare with one
+    orphan-counting scan per table; raises ValueError on orphaned rows.
+    """
+    foreign_keys = fact_foreign_keys(sql_file_path)
+    with warehouse_conn.cursor() as cursor:
+        violations = [violation for table in PARTITIONED_FACTS
+                      for violation in find_orphans(cursor, table, foreign_keys)]
+    if violations:
+        raise ValueError("Fact reference validation failed: " + "; ".join(violations))
+    logger.info(f"Fact references validated ({len(foreign_keys)} undeclared foreign keys)")
+
+def validate_denormalized_columns(warehouse_conn):
+    """
+    Warn about fact rows whose copied districts no longer match DimClientAccount
+    (a dimension change after the rows were loaded); a full load restamps them.
+    """
+    with warehouse_conn.cursor() as cursor:
+        stale = {table: rows for table, rows in stale_fact_rows(cursor).items() if rows}
+    for table, rows in stale.items():
+        logger.warning(f"{table}: {rows:,} rows carry outdated denormalized districts - run a full load")
+    if not stale:
+        logger.info("Denormalized fact columns match the dimensions")
+
+def _tracked(name, func):
+    """
+    Wrap a loader so a resumed run skips it once finished, its completion is
+    checkpointed and its wall time, bytes and peak memory are profiled.
+    An unfinished dimension is reloaded from empty; its dependents cannot have started.
+    """
+    def run(source_conn, warehouse_conn, options):
+        checkpoint = get_checkpoint_log(options)
+        if checkpoint and checkpoint.is_done(warehouse_conn, name):
+            logger.info(f"{name} already loaded by run {checkpoint.run_id} - skipping")
+            return
+        if checkpoint and options['resume'] and options['mode'] == 'full' and name in DIMENSION_TABLES:
+            with warehouse_conn.cursor() as cursor:
+                cursor.execute(f"DELETE FROM {name}")
+            warehouse_conn.commit()
+        profile = get_run_profiler(options).loader(name)
+        profile.begin(source_conn, warehouse_conn)
+        func(source_conn, warehouse_conn, options)
+        profile.end(source_conn, warehouse_conn)
+        if checkpoint:
+            checkpoint.mark_done(warehouse_conn, name)
+    return run
+
+def build_load_tasks():
+    """Dimension and fact loaders with their load dependencies, checkpointed and profiled per run"""
+    tasks = [
+        ETLTask('DimDate', load_dim_date),
+        ETLTask('DimDistrict', load_dim_district),
+        ETLTask('DimClientAccount', load_dim_client_account, depends_on=['DimDate', 'DimDistrict']),
+        ETLTask('DimCard', load_dim_card, depends_on=['DimDate', 'DimClientAccount']),
+        ETLTask('FactTrans', load_fact_trans, depends_on=['DimDate', 'DimClientAccount']),
+        ETLTask('FactLoan', load_fact_loan, depends_on=['DimDate', 'DimClientAccount']),
+    ]
+    for task in tasks:
+        task.func = _tracked(task.name, task.func)
+    return tasks
+
+def run_load_tasks_parallel(options):
+    """Run all loaders through the DAG scheduler, each worker on its own connections"""
+    def connect():
+        source_conn = None if options['snapshot'] else get_source_connection(options)
+        return source_conn, get_warehouse_connection(options)
+    
+    scheduler = DAGScheduler(build_load_tasks(), connect, max_workers=options['workers'])
+    return scheduler.run(options)
+
+def _existing_tables(cursor, database):
+    cursor.execute("""
+        SELECT TABLE_NAME FROM information_schema.TABLES
+        WHERE TABLE_SCHEMA = %s AND TABLE_NAME IN %s
+    """, (database, PUBLISHED_TABLES))
+    return {row[0] for row in cursor.fetchall()}
+
+def _drop_tables(cursor, database):
+    cursor.execute("SET FOREIGN_KEY_CHECKS = 0")
+    for table in PUBLISHED_TABLES:
+        cursor.execute(f"DROP TABLE IF EXISTS {database}.{table}")
+    cursor.execute("SET FOREIGN_KEY_CHECKS = 1")
+
+def prepare_shadow_database(warehouse_conn):
+    """Create the shadow schema the next generation is built in; returns its name"""
+    with warehouse_conn.cursor() as cursor:
+        cursor.execute(f"CREATE DATABASE IF NOT EXISTS {SHADOW_DATABASE}")
+    warehouse_conn.commit()
+    logger.info(f"Building the new warehouse generation in shadow schema {SHADOW_DATABASE}")
+    return SHADOW_DATABASE
+
+def _swap_tables(warehouse_conn, renames, options):
+    """
+    Run one atomic RENAME TABLE. A short lock_wait_timeout keeps the pending
+    metadata lock from queueing dashboard reads behind a long-running query;
+    the swap is retried instead.
+    """
+    statement = "RENAME TABLE " + ", ".join(f"{source} TO {target}" for source, target in renames)
+    with warehouse_conn.cursor() as cursor:
+        cursor.execute("SET SESSION lock_wait_timeout = %s", (options['swap_lock_timeout'],))
+        for attempt in range(1, options['swap_attempts'] + 1):
+            try:
+                cursor.execute(statement)
+                return
+            except pymysql.err.OperationalError as e:
+                # 1205: lock wait timeout exceeded
+                if e.args[0] != 1205 or attempt == options['swap_attempts']:
+                    raise
+                logger.warning(f"Table swap waited on readers (attempt {attempt}) - retrying")
+                time.sleep(attempt)
+
+def publish_shadow_tables(warehouse_conn, options=None):
+    """
+    Publish the validated shadow tables with a single atomic RENAME TABLE.
+    The live generation moves to the previous schema for rollback_warehouse().
+    """
+    options = get_etl_options(options)
+    live = WAREHOUSE_DB_CONFIG['database']
+    logger.info("Publishing shadow tables...")
+    
+    try:
+        with warehouse_conn.cursor() as cursor:
+            cursor.execute(f"CREATE DATABASE IF NOT EXISTS {PREVIOUS_DATABASE}")
+            _drop_tables(cursor, PREVIOUS_DATABASE)
+            live_tables = _existing_tables(cursor, live)
+            shadow_tables = _existing_tables(cursor, SHADOW_DATABASE)
+        
+        renames = [(f"{live}.{table}", f"{PREVIOUS_DATABASE}.{table}") for table in PUBLISHED_TABLES
+                   if table in live_tables]
+        renames += [(f"{SHADOW_DATABASE}.{table}", f"{live}.{table}") for table in PUBLISHED_TABLES
+                    if table in shadow_tables]
+        _swap_tables(warehouse_conn, renames, options)
+        logger.info(f"Published new generation; previous generation kept in {PREVIOUS_DATABASE}")
+        
+    except Exception as e:
+        logger.error(f"Error publishing shadow tables: {e}")
+        raise
+
+def rollback_warehouse(options=None):
+    """
+    Swap the previous generation back in with one atomic RENAME TABLE. The replaced
+    generation becomes the new previous one, so running this again rolls forward.
+    """
+    options = get_etl_options(options)
+    live = WAREHOUSE_DB_CONFIG['database']
+    warehouse_conn = get_warehouse_connection(options)
+    
+    try:
+        with warehouse_conn.cursor() as cursor:
+            previous_tables = _existing_tables(cursor, PREVIOUS_DATABASE)
+            live_tables = _existing_tables(cursor, live)
+            if not set(TABLE_COLUMNS) | set(AGGREGATE_TABLES) <= previous_tables:
+                raise RuntimeError(f"No complete previous generation in {PREVIOUS_DATABASE} to roll back to")
+            cursor.execute(f"CREATE DATABASE IF NOT EXISTS {SHADOW_DATABASE}")
+            _drop_tables(cursor, SHADOW_DATABASE)
+        
+        # live -> shadow, previous -> live, shadow -> previous, all in one statement
+        # (a generation without code tables leaves none behind)
+        renames = []
+        for table in PUBLISHED_TABLES:
+            if table in live_tables:
+                renames.append((f"{live}.{table}", f"{SHADOW_DATABASE}.{table}"))
+            if table in previous_tables:
+                renames.append((f"{PREVIOUS_DATABASE}.{table}", f"{live}.{table}"))
+            if table in live_tables:
+                renames.append((f"{SHADOW_DATABASE}.{table}", f"{PREVIOUS_DATABASE}.{table}"))
+        _swap_tables(warehouse_conn, renames, options)
+        
+        # The watermarks describe the generation that was just retired
+        ensure_watermark_table(warehouse_conn)
+        with warehouse_conn.cursor() as cursor:
+            cursor.execute("DELETE FROM etl_watermark")
+        warehouse_conn.commit()
+        logger.info("Rolled back to the previous warehouse generation (next incremental run rebuilds in full)")
+        
+    except Exception as e:
+        logger.error(f"Error rolling back warehouse: {e}")
+        raise
+    finally:
+        warehouse_conn.close()
+
+def reload_fact_year(year, options=None):
+    """
+    Truncate the year's partition of FactTrans and FactLoan and reload it from the
+    source, up to the watermarks of the last run, then rebuild the summary tables.
+    The year of the first DimDate day also reloads the rows whose date is NULL or
+    outside DimDate, which the loaders key to that day. Readers see the year empty
+    until its reload is committed.
+    """
+    options = get_etl_options(options)
+    logger.info(f"Reloading the {year} fact partitions...")
+    source_conn = get_source_connection(options)
+    warehouse_conn = get_warehouse_connection(options)
+    
+    try:
+        with warehouse_conn.cursor() as cursor:
+            if not facts_partitioned(cursor):
+                raise RuntimeError("The fact tables are not year-partitioned (load them with --partition-facts)")
+            version = schema_version(cursor)
+            denormalized = facts_denormalized(cursor)
+        high_water = read_watermarks(warehouse_conn)
+        if not high_water:
+            raise RuntimeError("No recorded watermarks - run a full load first")
+        # Plain inserts of exactly the rows the last run loaded
+        options.update({'mode': 'full', 'low_water': None, 'high_water': high_water, 'snapshot': None,
+                        'schema_version': version, 'partition_facts': True, 'denormalize_facts': denormalized})
+        
+        lookup = LookupCache().ensure_accounts(warehouse_conn).ensure_dates(warehouse_conn)
+        transforms = dict(zip(PARTITIONED_FACTS, _fact_transforms(options)))
+        first_day, last_day = date.fromordinal(lookup.date_first), date.fromordinal(lookup.date_last)
+        for table, (extract_name, date_column) in PARTITIONED_FACTS.items():
+            def transform_year(chunk, lookup, transform=transforms[table]):
+                # date_year is the fourth column; rows keyed to another year stay in their partition
+                return [record for record in transform(chunk, lookup) if record[3] == year]
+            
+            truncate_year_partition(warehouse_conn, table, year)
+            extract = source_extract(extract_name, options)
+            if year == first_day.year:
+                # Rows without a date in DimDate fall back to its first day, so they live here too
+                extract.conditions.append(f"(YEAR({date_column}) = %s OR {date_column} IS NULL "
+                                          f"OR DATE({date_column}) < %s OR DATE({date_column}) > %s)")
+                extract.params.extend([year, first_day, last_day])
+            else:
+                extract.conditions.append(f"YEAR({date_column}) = %s")
+                extract.params.append(year)
+            chunks = iter_extract_chunks(source_conn, extract, options, f"{table} {year}")
+            loaded = _load_fact_chunks(warehouse_conn, table, chunks, transform_year, lookup, options,
+                                       commit_each_chunk=True)
+            logger.info(f"{table}: reloaded {loaded:,} records of {year}")
+        
+        build_aggregates(warehouse_conn)
+        if options['reconcile_aggregates']:
+            reconcile_aggregates(warehouse_conn)
+        
+    except Exception as e:
+        logger.error(f"Error reloading {year}: {e}")
+        warehouse_conn.rollback()
+        raise
+    finally:
+        source_conn.close()
+        warehouse_conn.close()
+
+def plan_etl_run(source_conn, warehouse_conn, options):
+    """Settle a new run's mode, target schema and source high-water marks (updates options)"""
+    if options['snapshot']:
+        # A replayed snapshot loads exactly the rows it was extracted with
+        options.update(Snapshot(options['snapshot']).state)
+        logger.info(f"Replaying source snapshot {options['snapshot']} ({options['mode']} load)")
+    # Decide between an incremental refresh and a full rebuild
+    elif options['mode'] == 'incremental':
+        options['low_water'] = read_watermarks(warehouse_conn)
+        if not options['low_water'] or not warehouse_schema_exists(warehouse_conn):
+            logger.warning("No watermarks or warehouse schema found - falling back to full rebuild")
+            options['mode'] = 'full'
+        else:
+            with warehouse_conn.cursor() as cursor:
+                live_version = schema_version(cursor)
+                live_partitioned = facts_partitioned(cursor)
+                live_denormalized = facts_denormalized(cursor)
+                live_calendar = calendar_dim_date(cursor)
+            if live_version != options['schema_version']:
+                logger.warning(f"Warehouse uses schema v{live_version}, not v{options['schema_version']} "
+                               f"- falling back to full rebuild")
+                options['mode'] = 'full'
+            elif live_partitioned != options['partition_facts']:
+                logger.warning(f"Warehouse facts are {'' if live_partitioned else 'not '}year-partitioned "
+                               f"- falling back to full rebuild")
+                options['mode'] = 'full'
+            elif not live_calendar:
+                logger.warning("Warehouse DimDate uses sequential date keys, not YYYYMMDD "
+                               "- falling back to full rebuild")
+                options['mode'] = 'full'
+            elif live_denormalized != options['denormalize_facts']:
+                logger.warning(f"Warehouse facts {'carry' if live_denormalized else 'lack'} the denormalized "
+                               f"columns - falling back to full rebuild")
+                options['mode'] = 'full'
+    if options['defer_constraints'] and options['mode'] != 'full':
+        # Upserts need the unique checks and the live foreign keys
+        logger.warning("Constraint deferral only applies to full loads - ignoring it")
+        options['defer_constraints'] = False
+    if options['shadow'] and options['mode'] != 'full':
+        logger.warning("Shadow loading only applies to full loads - refreshing the live tables in place")
+        options['shadow'] = False
+    if options['shadow']:
+        options['warehouse_database'] = prepare_shadow_database(warehouse_conn)
+    if not options['snapshot']:
+        options['high_water'] = capture_source_high_water(source_conn)
+
+def snapshot_source(source_conn, warehouse_conn, checkpoint, options):
+    """
+    Extract every source query of the run into a Parquet snapshot (snapshot.py) that
+    the loaders then read from; a resumed run reuses the snapshot it already took.
+    """
+    if checkpoint.is_done(warehouse_conn, 'snapshot'):
+        options['snapshot'] = checkpoint.state(warehouse_conn, 'snapshot')['path']
+        logger.info(f"Source snapshot already taken by this run - reusing {options['snapshot']}")
+        return
+    path = os.path.join(options['snapshot_dir'], f"snapshot_{checkpoint.run_id}")
+    queries = {}
+    for name in SNAPSHOT_EXTRACTS:
+        extract = source_extract(name, options)
+        queries[name] = (extract, None) if options['keyset'] and extract else source_query(name, options)
+    write_snapshot(source_conn, path, queries, {key: options[key] for key in SNAPSHOT_STATE_KEYS},
+                   options['chunk_size'], source_throttle(options))
+    checkpoint.save_state(warehouse_conn, 'snapshot', {'path': path})
+    checkpoint.mark_done(warehouse_conn, 'snapshot')
+    options['snapshot'] = path
+
+@contextmanager
+def timed_phase(timings, name, memory=None):
+    """Record the wall time of a pipeline phase into timings[name] (and its peak RSS into a PhaseMemory)"""
+    start = time.perf_counter()
+    try:
+        if memory is None:
+            yield
+        else:
+            with memory.phase(name):
+                yield
+    finally:
+        timings[name] = time.perf_counter() - start
+
+def log_phase_timings(timings, total_seconds, memory=None):
+    """Per-phase wall time (and peak RSS) summary"""
+    peaks = memory.peaks if memory else {}
+    logger.info("-" * 70)
+    logger.info(f"{'Phase':<36} {'Seconds':>10} {'Share':>8} {'Peak MB':>10}")
+    for name, seconds in timings.items():
+        share = seconds / total_seconds * 100 if total_seconds > 0 else 0.0
+        peak = f"{peaks[name] / 1e6:>10.0f}" if peaks.get(name) else f"{'':>10}"
+        logger.info(f"{name:<36} {seconds:>10.2f} {share:>7.1f}% {peak}")
+    logger.info("-" * 70)
+
+def write_run_report(options, timings, total_seconds, started_at, memory=None):
+    """Log the loader profiles and write / compare the JSON run report"""
+    profiler = get_run_profiler(options)
+    profiler.log_summary()
+    budget = get_memory_budget(options)
+    if budget:
+        logger.info(f"Memory budget {budget.max_bytes / MB:.0f} MB: {budget.resizes} chunk resizes, "
+                    f"{budget.spilled_chunks} chunks spilled ({budget.spilled_bytes / MB:.1f} MB)")
+    if not options['report_dir']:
+        return None
+    
+    previous_path = latest_report(options['report_dir']) if options['compare'] else None
+    report = profiler.report(options['checkpoint_run'], options, timings, total_seconds, started_at,
+                             memory.peaks if memory else None)
+    if budget:
+        report['memory_budget'] = budget.to_dict()
+    path = write_report(report, options['report_dir'])
+    if options['compare']:
+        if previous_path:
+            compare_reports(report, load_report(previous_path))
+        else:
+            logger.info("No previous run report to compare with")
+    return path
+
+def run_etl_pipeline(options=None):
     """Main ETL pipeline execution function"""
     logger.info("=" * 60)
     logger.info("Starting Financial Data Warehouse ETL Pipeline")
     logger.info("=" * 60)
     
+    options = get_etl_options(options)
     start_time = time.time()
+    started_at = datetime.now().isoformat(timespec='seconds')
     source_conn = None
     warehouse_conn = None
+    load_conn = None
+    timings = {}
+    memory = PhaseMemory().start()
+    deferred_foreign_keys = []
     
     try:
         # Establish connections
         logger.info("Establishing database connections...")
-        source_conn = get_source_connection()
-        warehouse_conn = get_warehouse_connection()
+        warehouse_conn = get_warehouse_connection(options)
+        
+        # Resume the last unfinished run with its saved options, or plan a new one
+        resumed = None
+        if options['resume']:
+            resumed = CheckpointLog.latest_unfinished(warehouse_conn, CHECKPOINT_TABLE)
+            if resumed is None:
+                logger.warning("No unfinished run to resume - starting a new run")
+                options['resume'] = False
+        if resumed:
+            checkpoint, state = resumed
+            options.update(state)
+            logger.info(f"Resuming ETL run {checkpoint.run_id}")
+        elif options['snapshot']:
+            options['snapshot'] = resolve_snapshot(options['snapshot'])
+        
+        # Snapshot replays never connect to the source
+        source_conn = None if options['snapshot'] else get_source_connection(options)
+        if not resumed:
+            plan_etl_run(source_conn, warehouse_conn, options)
+            checkpoint = CheckpointLog(CheckpointLog.new_run_id(), CHECKPOINT_TABLE)
+            checkpoint.start_run(warehouse_conn, {key: options[key] for key in RESUME_OPTION_KEYS})
+        options['checkpoint_run'] = checkpoint.run_id
+        completed = checkpoint.completed(warehouse_conn)
+        budget = get_memory_budget(options)
+        if budget:
+            logger.info(f"Memory budget {budget.max_bytes / MB:.0f} MB (RSS now {budget.baseline / MB:.0f} MB): "
+                        f"chunks capped at {budget.chunk_bytes / MB:.1f} MB, "
+                        f"{budget.in_flight} in flight")
+        
+        if not options['snapshot'] and (options['snapshot_dir'] or 'snapshot' in completed):
+            logger.info("Phase 0a: Extracting Source Snapshot")
+            with timed_phase(timings, 'snapshot', memory):
+                snapshot_source(source_conn, warehouse_conn, checkpoint, options)
+        
+        # Loaders write to the shadow schema when one is used, otherwise to the live tables
+        load_conn = get_warehouse_connection(options) if options['shadow'] else warehouse_conn
+        options['lookup_cache_dir'] = tempfile.mkdtemp(prefix='etl_lookup_')
+        logger.info(f"ETL mode: {options['mode']}")
         
         # Execute ETL phases
-        logger.info("Phase 0: Creating Warehouse Schema")
-        create_warehouse_schema(warehouse_conn)
+        schema_sql, indexes_sql = schema_paths(options)
+        if options['mode'] == 'full':
+            logger.info(f"Phase 0: Creating Warehouse Schema (v{options['schema_version']})")
+            if 'schema' in completed:
+                logger.info("Schema already created by this run - skipping")
+                deferred_foreign_keys = (schema_foreign_keys(schema_sql, options['partition_facts'])
+                                         if options['defer_constraints'] else [])
+            else:
+                if not options['shadow']:
+                    # Clear watermarks first so an interrupted rebuild is never refreshed incrementally
+                    ensure_watermark_table(warehouse_conn)
+                    with warehouse_conn.cursor() as cursor:
+                        cursor.execute("DELETE FROM etl_watermark")
+                    warehouse_conn.commit()
+                with timed_phase(timings, 'schema', memory):
+                    deferred_foreign_keys = create_warehouse_schema(load_conn, options['defer_constraints'],
+                                                                    schema_sql, options['partition_facts'],
+                                                                    options['denormalize_facts'])
+                checkpoint.mark_done(warehouse_conn, 'schema')
+        else:
+            logger.info(f"Phase 0: Incremental refresh from watermarks {options['low_water']}")
+        
+        if options['parallel']:
+            logger.info(f"Phase 1-2: Loading Dimension and Fact Tables ({options['workers']} workers)")
+            with timed_phase(timings, 'load (parallel)', memory):
+                run_load_tasks_parallel(options)
+        else:
+            logger.info("Phase 1: Loading Dimension Tables")
+            for task in build_load_tasks():
+                if task.name == 'FactTrans':
+                    logger.info("Phase 2: Loading Fact Tables")
+                with timed_phase(timings, f"load:{task.name}", memory):
+                    task.func(source_conn, load_conn, options)
         
-        logger.info("Phase 1: Loading Dimension Tables")
-        load_dim_date(source_conn, warehouse_conn)
-        load_dim_district(source_conn, warehouse_conn)
-        load_dim_client_account(source_conn, warehouse_conn)
-        load_dim_card(source_conn, warehouse_conn)
+        if options['defer_constraints'] and 'constraints' not in completed:
+            logger.info("Phase 2b: Building Deferred Indexes and Foreign Keys")
+            with timed_phase(timings, 'constraints (total)', memory):
+                build_deferred_constraints(load_conn, deferred_foreign_keys, timings, indexes_sql)
+            checkpoint.mark_done(warehouse_conn, 'constraints')
         
-        logger.info("Phase 2: Loading Fact Tables")
-        load_fact_trans(source_conn, warehouse_conn)
-        load_fact_loan(source_conn, warehouse_conn)
+        if 'aggregates' not in completed:
+            logger.info("Phase 2c: Building Dashboard Summary Tables")
+            with timed_phase(timings, 'aggregates (total)', memory):
+                if options['mode'] == 'incremental':
+                    # Only the fact rows loaded by this run are folded into the summaries, except
+                    # in tables grouped by dimensions it changed. A resumed run may have upserted
+                    # its dimension changes before the interruption, so it recomputes them all.
+                    changed = HASHED_DIMENSIONS if options['resume'] else changed_dimensions(options)
+                    maintain_aggregates(load_conn, timings, changed)
+                else:
+                    build_aggregates(load_conn, timings)
+            checkpoint.mark_done(warehouse_conn, 'aggregates')
         
         logger.info("Phase 3: Data Quality Validation")
-        validate_data_quality(warehouse_conn)
+        with timed_phase(timings, 'validation', memory):
+            validate_data_quality(load_conn)
+            if options['partition_facts']:
+                validate_fact_references(load_conn, schema_sql)
+            if options['denormalize_facts']:
+                validate_denormalized_columns(load_conn)
+        if options['reconcile_aggregates']:
+            with timed_phase(timings, 'reconciliation', memory):
+                reconcile_aggregates(load_conn)
+        if options['verify_source'] and source_conn is None:
+            logger.warning("Source reconciliation needs the source database - skipped for a snapshot replay")
+        elif options['verify_source']:
+            with timed_phase(timings, 'source reconciliation', memory):
+                reconcile_with_source(source_conn, load_conn, high_water=options['high_water'])
+        
+        if options['shadow'] and 'publish' not in completed:
+            logger.info("Phase 4: Publishing Shadow Tables")
+            with timed_phase(timings, 'publish', memory):
+                publish_shadow_tables(warehouse_conn, options)
+            checkpoint.mark_done(warehouse_conn, 'publish')
+        save_watermarks(warehouse_conn, options['high_water'])
+        checkpoint.finish_run(warehouse_conn)
         
         end_time = time.time()
         execution_time = end_time - start_time
+        log_phase_timings(timings, execution_time, memory)
+        write_run_report(options, timings, execution_time, started_at, memory)
         
         logger.info("=" * 60)
         logger.info("ETL Pipeline Completed Successfully!")
@@ -513,6 +1865,14 @@ def run_etl_pipeline():
         logger.error(f"ETL Pipeline failed: {e}")
         raise
     finally:
+        release_lookup_cache(options)
+        release_encoder(options)
+        release_run_profiler(options)
+        release_memory_budget(options)
+        release_dimension_changes(options)
+        memory.stop()
+        if load_conn and load_conn is not warehouse_conn:
+            load_conn.close()
         if source_conn:
             source_conn.close()
             logger.info("Source database connection closed")
@@ -520,13 +1880,154 @@ def run_etl_pipeline():
             warehouse_conn.close()
             logger.info("Warehouse database connection closed")
 
+def parse_args(argv=None):
+    """Command line options for running the pipeline directly"""
+    parser = argparse.ArgumentParser(description="Financial Data Warehouse ETL Pipeline")
+    parser.add_argument('--mode', choices=['full', 'incremental'], default=ETL_OPTIONS['mode'],
+                        help="full: drop and rebuild; incremental: append rows past the recorded "
+                             "watermarks (falls back to full when none exist) (default: %(default)s)")
+    parser.add_argument('--parallel', action='store_true',
+                        help="Run independent loaders concurrently on a dependency-aware thread pool")
+    parser.add_argument('--workers', type=int, default=ETL_OPTIONS['workers'],
+                        help="Worker threads for --parallel (default: %(default)s)")
+    parser.add_argument('--trans-partitions', type=int, default=ETL_OPTIONS['trans_partitions'],
+                        help="Load FactTrans as N trans_id ranges in a process pool (default: off)")
+    parser.add_argument('--partition-method', choices=['quantile', 'minmax'],
+                        default=ETL_OPTIONS['partition_method'],
+                        help="How trans_id range boundaries are balanced (default: %(default)s)")
+    parser.add_argument('--no-stream', action='store_true',
+                        help="Fetch fact sources in one buffered read instead of server-side cursor chunks")
+    parser.add_argument('--no-keyset', action='store_true',
+                        help="Read each source extract with one ORDER BY statement instead of keyset pages")
+    parser.add_argument('--source-busy-fraction', type=float, default=ETL_OPTIONS['source_busy_fraction'],
+                        help="Pause between keyset pages so source queries take at most this share of "
+                             "extract time (1 disables) (default: %(default)s)")
+    parser.add_argument('--source-max-threads', type=int, default=ETL_OPTIONS['source_max_threads_running'],
+                        help="Hold keyset pages while the source reports more running threads (default: off)")
+    parser.add_argument('--chunk-size', type=int, default=ETL_OPTIONS['chunk_size'],
+                        help="Rows per keyset page / streamed chunk (default: %(default)s)")
+    parser.add_argument('--max-chunk-mb', type=int, default=ETL_OPTIONS['max_chunk_bytes'] // (1024 * 1024),
+                        help="Memory ceiling per streamed chunk in MB (default: %(default)s)")
+    parser.add_argument('--max-memory', type=parse_size, default=None, metavar='SIZE',
+                        help="Memory budget such as 512MB: chunk sizes adapt to the process RSS, pipelined "
+                             "chunks spill to disk and dimensions load in chunks (default: unbounded)")
+    parser.add_argument('--bulk-backend', choices=['executemany', 'multirow', 'load_data'],
+                        default=ETL_OPTIONS['bulk_backend'],
+                        help="Warehouse insert backend (default: %(default)s)")
+    parser.add_argument('--bulk-batch-rows', type=int, default=ETL_OPTIONS['bulk_batch_rows'],
+                        help="Rows per bulk insert batch (default: %(default)s)")
+    parser.add_argument('--vectorized', action='store_true',
+                        help="Transform fact chunks column-wise with NumPy instead of row by row; only applies "
+                             "to --from-snapshot replays, whose chunks are columnar")
+    parser.add_argument('--pipelined', action='store_true',
+                        help="Run fact extract, transform and load as concurrent stages over bounded queues")
+    parser.add_argument('--queue-chunks', type=int, default=ETL_OPTIONS['queue_chunks'],
+                        help="Chunks buffered between pipelined stages (default: %(default)s)")
+    parser.add_argument('--schema-version', type=int, choices=[1, 2], default=ETL_OPTIONS['schema_version'],
+                        help="1: setup_dw.sql; 2: compact schema with dictionary-encoded attributes "
+                             "(setup_dw_v2.sql) (default: %(default)s)")
+    parser.add_argument('--partition-facts', action='store_true',
+                        help="RANGE-partition FactTrans and FactLoan by date year (sql/warehouse_variants/partitions.sql); "
+                             "year filters on date_year read only their partitions")
+    parser.add_argument('--denormalize-facts', action='store_true',
+                        help="Copy the districts, region code and month the dashboard groups by onto the fact "
+                             "rows (sql/warehouse_variants/denormalize.sql), so the summary tables build without joins")
+    parser.add_argument('--reload-year', type=int, nargs='+', metavar='YEAR',
+                        help="Truncate and reload the fact partitions of these years from the source, then exit")
+    parser.add_argument('--defer-constraints', action='store_true',
+                        help="Full loads: create tables without foreign keys, load with unique/foreign key "
+                             "checks off, then build indexes.sql and validate the foreign keys at the end")
+    parser.add_argument('--shadow', action='store_true',
+                        help="Full loads: build and validate in a shadow schema, then publish with one "
+                             "atomic RENAME TABLE (the replaced tables are kept for --rollback)")
+    parser.add_argument('--no-reconcile', action='store_true',
+                        help="Skip recomputing the summary tables from the facts to confirm them")
+    parser.add_argument('--verify-source', action='store_true',
+                        help="Compare per-key-range row checksums of the loaded tables with the source")
+    parser.add_argument('--source-database', default=None,
+                        help="Extract from this schema on the source server instead of "
+                             f"{SOURCE_DB_CONFIG['database']} (e.g. etl/synthetic_source.py output)")
+    parser.add_argument('--snapshot-dir', default=None,
+                        help="Extract every source query once into a Parquet snapshot under this directory "
+                             "and load from the snapshot")
+    parser.add_argument('--from-snapshot', default=None,
+                        help="Load from a saved snapshot (or the newest one in a snapshot directory) "
+                             "without connecting to the source")
+    parser.add_argument('--resume', action='store_true',
+                        help="Continue the last unfinished run from its checkpoints instead of starting over")
+    parser.add_argument('--report-dir', default=None,
+                        help="Write a JSON run report with per-loader stage timings into this directory")
+    parser.add_argument('--compare', action='store_true',
+                        help="Compare the run report with the previous one (default --report-dir: etl_reports)")
+    parser.add_argument('--rollback', action='store_true',
+                        help="Swap the previous warehouse generation back in and exit")
+    args = parser.parse_args(argv)
+    if args.vectorized and not args.from_snapshot:
+        # Live source chunks are row tuples, which the per-row loop transforms faster
+        parser.error("--vectorized only applies to --from-snapshot replays")
+    return args
+
+def options_from_args(args):
+    """Translate parsed command line arguments into ETL options"""
+    return {
+        'mode': args.mode,
+        'parallel': args.parallel,
+        'workers': args.workers,
+        'trans_partitions': args.trans_partitions,
+        'partition_method': args.partition_method,
+        'stream': not args.no_stream,
+        'keyset': not args.no_keyset,
+        'source_busy_fraction': args.source_busy_fraction,
+        'source_max_threads_running': args.source_max_threads,
+        'chunk_size': args.chunk_size,
+        'max_chunk_bytes': args.max_chunk_mb * 1024 * 1024,
+        'max_memory': args.max_memory,
+        'bulk_backend': args.bulk_backend,
+        'bulk_batch_rows': args.bulk_batch_rows,
+        'vectorized': args.vectorized,
+        'defer_constraints': args.defer_constraints,
+        'schema_version': args.schema_version,
+        'partition_facts': args.partition_facts,
+        'denormalize_facts': args.denormalize_facts,
+        'pipelined': args.pipelined,
+        'queue_chunks': args.queue_chunks,
+        'shadow': args.shadow,
+        'resume': args.resume,
+        'reconcile_aggregates': not args.no_reconcile,
+        'verify_source': args.verify_source,
+        'source_database': args.source_database,
+        'snapshot_dir': args.snapshot_dir,
+        'snapshot': args.from_snapshot,
+        'report_dir': args.report_dir or ('etl_reports' if args.compare else None),
+        'compare': args.compare,
+    }
+
 if __name__ == "__main__":
     """Execute the ETL pipeline when script is run directly"""
     print("Financial Data Warehouse ETL Pipeline")
     print("=====================================")
     
+    args = parse_args()
+    if args.rollback:
+        try:
+            rollback_warehouse()
+            print("\n Warehouse rolled back to the previous generation")
+        except Exception as e:
+            print(f"\n Rollback failed: {e}")
+            sys.exit(1)
+        sys.exit(0)
+    if args.reload_year:
+        try:
+            for year in args.reload_year:
+                reload_fact_year(year, options_from_args(args))
+            print(f"\n Reloaded fact partitions of {', '.join(map(str, args.reload_year))}")
+        except Exception as e:
+            print(f"\n Partition reload failed: {e}")
+            sys.exit(1)
+        sys.exit(0)
+    
     try:
-        run_etl_pipeline()
+        run_etl_pipeline(options_from_args(args))
         print("\n ETL Pipeline completed successfully!")
     except Exception as e:
         print(f"\n ETL Pipeline failed: {e}")
\ No newline at end of file
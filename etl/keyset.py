@@ -0,0 +1,154 @@
+"""
+Keyset Pagination
+=================
+Pages through a source extract by its key instead of reading it with one
+statement ordered over the whole table:
+
+    SELECT ... FROM ... WHERE <run filters> AND key > %s ORDER BY key LIMIT %s
+
+Every page is a short range scan along the key's index that starts where the
+previous page ended, so the source never sorts a whole table or holds a
+streaming cursor open for the length of a load, and the cost of a page does not
+grow with its position the way LIMIT ... OFFSET does. The key must be unique
+and must be the first selected column (it is read back from the last row).
+
+A SourceThrottle paces the pages so an extract leaves the OLTP server room for
+its own traffic: it sleeps between pages so that source queries take at most
+busy_fraction of the extract's wall time, and it waits while the server reports
+more than max_threads_running running threads.
+"""
+
+import sys
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def estimate_row_bytes(rows):
+    """Rough in-memory size of one extracted row, sampled from a chunk"""
+    sample = rows[:100]
+    if not sample:
+        return 0
+    total = sum(sys.getsizeof(row) + sum(sys.getsizeof(value) for value in row) for row in sample)
+    return total // len(sample)
+
+
+class KeysetQuery:
+    """A source extract that can be paged by a unique key"""
+
+    def __init__(self, select, from_clause, key, conditions=None, params=None):
+        self.select = select
+        self.from_clause = from_clause
+        self.key = key
+        self.conditions = list(conditions or [])
+        self.params = list(params or [])
+
+    def statement(self, after=None, limit=None):
+        """(query, params) of the rows past after, ordered by the key; one page when limit is set"""
+        conditions, params = list(self.conditions), list(self.params)
+        if after is not None:
+            conditions.append(f"{self.key} > %s")
+            params.append(after)
+        query = f"SELECT {self.select} FROM {self.from_clause}"
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += f" ORDER BY {self.key}"
+        if limit is not None:
+            query += " LIMIT %s"
+            params.append(int(limit))
+        return query, params
+
+
+class SourceThrottle:
+    """Paces keyset pages so the source keeps headroom for its own workload"""
+
+    def __init__(self, busy_fraction=1.0, max_threads_running=0, poll_seconds=0.5, max_wait_seconds=60):
+        self.busy_fraction = min(1.0, max(0.01, float(busy_fraction)))
+        self.max_threads_running = int(max_threads_running or 0)
+        self.poll_seconds = poll_seconds
+        self.max_wait_seconds = max_wait_seconds
+        self.slept = 0.0
+
+    def _threads_running(self, conn):
+        with conn.cursor() as cursor:
+            cursor.execute("SHOW GLOBAL STATUS LIKE 'Threads_running'")
+            row = cursor.fetchone()
+        return int(row[1]) if row else 0
+
+    def pause(self, conn, query_seconds):
+        """Wait after a page that kept the source busy for query_seconds"""
+        start = time.perf_counter()
+        if self.busy_fraction < 1.0:
+            time.sleep(query_seconds * (1.0 / self.busy_fraction - 1.0))
+        if self.max_threads_running:
+            # Our own session counts as one running thread
+            while (self._threads_running(conn) > self.max_threads_running
+                   and time.perf_counter() - start < self.max_wait_seconds):
+                time.sleep(self.poll_seconds)
+        self.slept += time.perf_counter() - start
+
+
+class KeysetReader:
+    """
+    Iterate a KeysetQuery page by page; every page is a list of row tuples.
+    The page size is shrunk after the first page if a page would exceed max_page_bytes,
+    and with a MemoryBudget (memory_budget.py) re-sized by it after every page.
+    """
+
+    def __init__(self, conn, keyset_query, page_rows, after=None, throttle=None,
+                 max_page_bytes=None, label="source", budget=None):
+        self.conn = conn
+        self.keyset_query = keyset_query
+        self.page_rows = max(1, int(page_rows))
+        self.after = after
+        self.throttle = throttle
+        self.max_page_bytes = max_page_bytes
+        self.label = label
+        self.budget = budget
+        self.description = None
+        self.pages = 0
+        self.query_seconds = 0.0
+        self._slept_at_start = throttle.slept if throttle else 0.0
+
+    def fetch_page(self):
+        """The next page (empty at the end); the caller is not throttled"""
+        query, params = self.keyset_query.statement(self.after, self.page_rows)
+        start = time.perf_counter()
+        with self.conn.cursor() as cursor:
+            cursor.execute(query, params)
+            self.description = cursor.description
+            rows = list(cursor.fetchall())
+        elapsed = time.perf_counter() - start
+        self.query_seconds += elapsed
+        if rows:
+            self.pages += 1
+            self.after = rows[-1][0]
+        return rows, elapsed
+
+    def __iter__(self):
+        while True:
+            page_rows = self.page_rows
+            rows, elapsed = self.fetch_page()
+            if not rows:
+                break
+            if self.pages == 1:
+                row_bytes = estimate_row_bytes(rows)
+                if self.max_page_bytes and row_bytes and self.page_rows * row_bytes > self.max_page_bytes:
+                    self.page_rows = max(1, self.max_page_bytes // row_bytes)
+                    logger.info(f"{self.label}: page size capped at {self.page_rows:,} rows "
+                                f"(~{row_bytes} bytes/row, ceiling {self.max_page_bytes:,} bytes)")
+            yield rows
+            if self.budget:
+                self.page_rows = self.budget.adapt(self.page_rows, self.label, row_bytes)
+            # A short page is the last one
+            if len(rows) < page_rows:
+                break
+            if self.throttle:
+                self.throttle.pause(self.conn, elapsed)
+        self.report()
+
+    def report(self):
+        slept = self.throttle.slept - self._slept_at_start if self.throttle else 0.0
+        logger.info(f"{self.label}: {self.pages} keyset pages, {self.query_seconds:.2f}s in source queries, "
+                    f"{slept:.2f}s throttled")
@@ -0,0 +1,334 @@
+"""
+Dimension Key Lookup Cache
+==========================
+Dense NumPy arrays that map natural keys to warehouse surrogate keys:
+
+- account_keys[account_id]          -> DimClientAccount.clientAcc_id (0 = not loaded)
+
+and, for --denormalize-facts loads (see denormalize.py):
+
+- account_districts[clientAcc_id]   -> (distAcc_id, distCli_id)      (0 = not loaded)
+- district_regions[district_id]     -> DimRegion.region_id           (0 = not loaded)
+
+Date keys need no array: DimDate is keyed by YYYYMMDD integers (see date_keys.py),
+computed from the date itself. The cache only keeps the first and last DimDate
+day, so dates outside the calendar map to the first day's key.
+
+The cache is built once per ETL run. When given a directory the arrays are saved
+as .npy files and reopened with mmap_mode='r', so loader threads and worker
+processes share one copy through the OS page cache instead of each rebuilding
+dicts.
+
+Run this file directly to benchmark lookup cost and memory against the dict approach.
+"""
+
+import os
+import sys
+import time
+import logging
+import threading
+from datetime import date, datetime
+
+import numpy as np
+
+from encoding import schema_version
+from date_keys import date_key, key_month, key_year, ordinals_to_keys
+
+logger = logging.getLogger(__name__)
+
+KEY_DTYPE = np.int32
+YEAR_DTYPE = np.int16
+MONTH_DTYPE = np.int8
+
+
+def to_ordinal(value):
+    """Day ordinal of a DATE value or a 'YYYY-MM-DD' / 'YYYYMMDD' string; None if unparseable"""
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        return value.date().toordinal()
+    if isinstance(value, date):
+        return value.toordinal()
+    text = str(value)
+    try:
+        if len(text) == 8 and text.isdigit():
+            return datetime.strptime(text, '%Y%m%d').toordinal()
+        return datetime.strptime(text[:10], '%Y-%m-%d').toordinal()
+    except ValueError:
+        return None
+
+
+class LookupCache:
+    """Array-backed natural key -> surrogate key lookups for DimClientAccount, computed DimDate keys"""
+
+    ACCOUNT_FILE = 'account_keys.npy'
+    ACCOUNT_DISTRICTS_FILE = 'account_districts.npy'
+    DISTRICT_REGIONS_FILE = 'district_regions.npy'
+
+    def __init__(self, directory=None):
+        self.directory = directory
+        self.account_keys = None
+        self.date_first = None
+        self.date_last = None
+        self.account_districts = None
+        self.district_regions = None
+        self._lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # Building and sharing
+    # ------------------------------------------------------------------
+
+    def _path(self, filename):
+        return os.path.join(self.directory, filename)
+
+    def _save(self, filename, array):
+        """Write atomically so concurrent readers never see a partial file"""
+        tmp_path = self._path(filename + '.tmp')
+        with open(tmp_path, 'wb') as handle:
+            np.save(handle, array)
+        os.replace(tmp_path, self._path(filename))
+
+    def _open(self, filename):
+        if self.directory and os.path.exists(self._path(filename)):
+            return np.load(self._path(filename), mmap_mode='r')
+        return None
+
+    def ensure_accounts(self, warehouse_conn):
+        """Load the account array (from the shared file if another worker built it)"""
+        if self.account_keys is not None:
+            return self
+        with self._lock:
+            if self.account_keys is None:
+                keys = self._open(self.ACCOUNT_FILE)
+                if keys is None:
+                    keys = self.build_account_keys(warehouse_conn)
+                    if self.directory:
+                        self._save(self.ACCOUNT_FILE, keys)
+                self.account_keys = keys
+        return self
+
+    def ensure_dates(self, warehouse_conn):
+        """
+        Read the first and last DimDate day (one MIN/MAX query, nothing to share).
+        Raises RuntimeError when DimDate is empty: there is no day to key dates to,
+        not even the fallback.
+        """
+        if self.date_first is not None:
+            return self
+        with warehouse_conn.cursor() as cursor:
+            cursor.execute("SELECT MIN(date), MAX(date) FROM DimDate")
+            first, last = cursor.fetchone()
+        if first is None or last is None:
+            raise RuntimeError("DimDate is empty - load the date dimension before keying dates")
+        with self._lock:
+            self.date_last = to_ordinal(last)
+            self.date_first = to_ordinal(first)
+        return self
+
+    def ensure_denormalized(self, warehouse_conn):
+        """Load the district and region arrays (from the shared files if another worker built them)"""
+        if self.district_regions is not None:
+            return self
+        with self._lock:
+            if self.district_regions is None:
+                files = (self.ACCOUNT_DISTRICTS_FILE, self.DISTRICT_REGIONS_FILE)
+                arrays = [self._open(filename) for filename in files]
+                if any(array is None for array in arrays):
+                    arrays = self.build_denormalized(warehouse_conn)
+                    if self.directory:
+                        for filename, array in zip(files, arrays):
+                            self._save(filename, array)
+                self.account_districts, self.district_regions = arrays
+        return self
+
+    @staticmethod
+    def build_account_keys(warehouse_conn):
+        """Dense array indexed by account_id holding clientAcc_id"""
+        with warehouse_conn.cursor() as cursor:
+            cursor.execute("SELECT account_id, clientAcc_id FROM DimClientAccount")
+            rows = np.array(cursor.fetchall(), dtype=np.int64).reshape(-1, 2)
+        size = int(rows[:, 0].max()) + 1 if len(rows) else 1
+        keys = np.zeros(size, dtype=KEY_DTYPE)
+        keys[rows[:, 0]] = rows[:, 1]
+        logger.info(f"Lookup cache: {len(rows):,} accounts in {keys.nbytes:,} bytes")
+        return keys
+
+    @staticmethod
+    def build_denormalized(warehouse_conn):
+        """
+        Dense arrays indexed by clientAcc_id holding (distAcc_id, distCli_id) and by
+        district_id holding its DimRegion code
+        """
+        with warehouse_conn.cursor() as cursor:
+            cursor.execute("SELECT clientAcc_id, COALESCE(distAcc_id, 0), COALESCE(distCli_id, 0) "
+                           "FROM DimClientAccount")
+            accounts = np.array(cursor.fetchall(), dtype=np.int64).reshape(-1, 3)
+            if schema_version(cursor) == 2:
+                cursor.execute("SELECT district_id, COALESCE(region_id, 0) FROM DimDistrict")
+            else:
+                # Schema v1 keeps the region text; its codes are added by denormalize.add_region_codes()
+                cursor.execute("""
+                    SELECT d.district_id, r.region_id FROM DimDistrict d
+                    JOIN DimRegion r ON r.value_hash = UNHEX(MD5(COALESCE(d.region, '')))
+                """)
+            regions = np.array(cursor.fetchall(), dtype=np.int64).reshape(-1, 2)
+
+        account_districts = np.zeros((int(accounts[:, 0].max()) + 1 if len(accounts) else 1, 2), dtype=KEY_DTYPE)
+        account_districts[accounts[:, 0]] = accounts[:, 1:]
+        district_regions = np.zeros(int(regions[:, 0].max()) + 1 if len(regions) else 1, dtype=KEY_DTYPE)
+        district_regions[regions[:, 0]] = regions[:, 1]
+        logger.info(f"Lookup cache: districts of {len(accounts):,} accounts and {len(regions):,} district regions")
+        return account_districts, district_regions
+
+    # ------------------------------------------------------------------
+    # Lookups
+    # ------------------------------------------------------------------
+
+    def account_key(self, account_id):
+        """clientAcc_id for an account_id, or None when the account is not in DimClientAccount"""
+        if account_id is None or account_id < 0 or account_id >= len(self.account_keys):
+            return None
+        key = int(self.account_keys[account_id])
+        return key or None
+
+    def default_date_key(self):
+        """Key that unparseable dates and dates outside DimDate fall back to: its first day"""
+        return date_key(date.fromordinal(self.date_first))
+
+    def date_key(self, value, default=None):
+        """YYYYMMDD date_id of a date value, or default (the first DimDate day) when it is not in DimDate"""
+        ordinal = to_ordinal(value)
+        if ordinal is None or ordinal < self.date_first or ordinal > self.date_last:
+            return self.default_date_key() if default is None else default
+        return date_key(value if type(value) is date else date.fromordinal(ordinal))
+
+    def date_year(self, date_id):
+        """Year of a date_id (0 when there is none)"""
+        return key_year(date_id) if date_id else 0
+
+    def map_accounts(self, account_ids):
+        """Vectorized account lookup; 0 marks accounts missing from DimClientAccount"""
+        account_ids = np.asarray(account_ids, dtype=np.int64)
+        in_range = (account_ids >= 0) & (account_ids < len(self.account_keys))
+        result = np.zeros(len(account_ids), dtype=KEY_DTYPE)
+        result[in_range] = self.account_keys[account_ids[in_range]]
+        return result
+
+    def map_dates(self, ordinals, default=None):
+        """Vectorized YYYYMMDD keys of day ordinals; dates outside DimDate get default (its first day)"""
+        ordinals = np.asarray(ordinals, dtype=np.int64)
+        in_range = (ordinals >= self.date_first) & (ordinals <= self.date_last)
+        result = np.full(len(ordinals), self.default_date_key() if default is None else default,
+                         dtype=KEY_DTYPE)
+        result[in_range] = ordinals_to_keys(ordinals[in_range])
+        return result
+
+    def map_years(self, date_ids):
+        """Vectorized year of YYYYMMDD date_ids"""
+        return key_year(np.asarray(date_ids, dtype=np.int64)).astype(YEAR_DTYPE)
+
+    def map_account_districts(self, client_account_ids):
+        """Vectorized (distAcc_id, distCli_id) lookup by clientAcc_id; unknown accounts get 0"""
+        client_account_ids = np.asarray(client_account_ids, dtype=np.int64)
+        in_range = (client_account_ids >= 0) & (client_account_ids < len(self.account_districts))
+        result = np.zeros((len(client_account_ids), 2), dtype=KEY_DTYPE)
+        result[in_range] = self.account_districts[client_account_ids[in_range]]
+        return result[:, 0], result[:, 1]
+
+    def map_regions(self, district_ids):
+        """Vectorized DimRegion code lookup by district_id; unknown districts get 0"""
+        district_ids = np.asarray(district_ids, dtype=np.int64)
+        in_range = (district_ids >= 0) & (district_ids < len(self.district_regions))
+        result = np.zeros(len(district_ids), dtype=KEY_DTYPE)
+        result[in_range] = self.district_regions[district_ids[in_range]]
+        return result
+
+    def map_months(self, date_ids):
+        """Vectorized month of YYYYMMDD date_ids"""
+        return key_month(np.asarray(date_ids, dtype=np.int64)).astype(MONTH_DTYPE)
+
+    def nbytes(self):
+        """Memory held by the lookup arrays"""
+        arrays = (self.account_keys, self.account_districts, self.district_regions)
+        return sum(array.nbytes for array in arrays if array is not None)
+
+
+def _dict_nbytes(mapping):
+    """Approximate memory of a dict including its keys and values"""
+    return sys.getsizeof(mapping) + sum(sys.getsizeof(key) + sys.getsizeof(value)
+                                        for key, value in mapping.items())
+
+
+def benchmark_lookups(warehouse_conn, samples=1000000, seed=42):
+    """
+    Compare the per-run dicts used by the loaders against the array-backed cache:
+    build time, memory, per-row lookup cost and vectorized lookup cost.
+    """
+    rng = np.random.default_rng(seed)
+    results = {}
+
+    start = time.perf_counter()
+    with warehouse_conn.cursor() as cursor:
+        cursor.execute("SELECT account_id, clientAcc_id FROM DimClientAccount")
+        account_dict = {account_id: clientAcc_id for account_id, clientAcc_id in cursor.fetchall()}
+        cursor.execute("SELECT date, date_id FROM DimDate")
+        date_rows = cursor.fetchall()
+        date_dict = {str(date_val): date_id for date_val, date_id in date_rows}
+    results['dict_build_s'] = time.perf_counter() - start
+    results['dict_bytes'] = _dict_nbytes(account_dict) + _dict_nbytes(date_dict)
+
+    start = time.perf_counter()
+    cache = LookupCache().ensure_accounts(warehouse_conn).ensure_dates(warehouse_conn)
+    results['array_build_s'] = time.perf_counter() - start
+    results['array_bytes'] = cache.nbytes()
+
+    account_ids = rng.choice(np.array(list(account_dict)), samples)
+    date_values = [date_rows[i][0] for i in rng.integers(0, len(date_rows), samples)]
+    account_list = account_ids.tolist()
+
+    start = time.perf_counter()
+    for account_id, date_value in zip(account_list, date_values):
+        account_dict.get(account_id)
+        date_dict.get(str(date_value), 1)
+    results['dict_lookup_s'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for account_id, date_value in zip(account_list, date_values):
+        cache.account_key(account_id)
+        cache.date_key(date_value)
+    results['array_scalar_lookup_s'] = time.perf_counter() - start
+
+    ordinals = np.array([to_ordinal(value) for value in date_values], dtype=np.int64)
+    start = time.perf_counter()
+    cache.map_accounts(account_ids)
+    cache.map_dates(ordinals)
+    results['array_vector_lookup_s'] = time.perf_counter() - start
+
+    print(f"{'Approach':<24} {'Build (s)':>10} {'Memory (bytes)':>16} {'Lookups/s':>14}")
+    print("-" * 68)
+    print(f"{'dict (str(date) keys)':<24} {results['dict_build_s']:>10.3f} {results['dict_bytes']:>16,} "
+          f"{samples / results['dict_lookup_s']:>14,.0f}")
+    print(f"{'array, per row':<24} {results['array_build_s']:>10.3f} {results['array_bytes']:>16,} "
+          f"{samples / results['array_scalar_lookup_s']:>14,.0f}")
+    print(f"{'array, vectorized':<24} {'':>10} {'':>16} "
+          f"{samples / results['array_vector_lookup_s']:>14,.0f}")
+    return results
+
+
+if __name__ == "__main__":
+    """Benchmark the array-backed cache against per-run dicts on the local warehouse"""
+    import argparse
+    import pymysql
+    from etl_pipeline_clean import WAREHOUSE_DB_CONFIG
+
+    parser = argparse.ArgumentParser(description="Dimension key lookup benchmark")
+    parser.add_argument('--samples', type=int, default=1000000, help="Lookups per approach")
+    args = parser.parse_args()
+
+    config = WAREHOUSE_DB_CONFIG.copy()
+    config['ssl_disabled'] = True
+    conn = pymysql.connect(**config)
+    try:
+        benchmark_lookups(conn, samples=args.samples)
+    finally:
+        conn.close()
@@ -0,0 +1,355 @@
+"""
+Memory Budget
+=============
+Bounds the memory of an etl_pipeline_clean.py run (--max-memory 512MB):
+
+- chunk sizes: every extract (keyset pages, streamed cursors, snapshot replays)
+  starts with chunks capped at the budget's share per in-flight chunk, then
+  halves its chunk size while the process RSS is above SHRINK_AT of the budget
+  and grows it back (up to chunk_size) once RSS drops below GROW_BELOW
+- spilling: chunks waiting in the queues of a pipelined load (stages.py) are
+  pickled to temporary files while RSS is above SPILL_AT of the budget and read
+  back when the next stage takes them
+- dimension extracts are read and inserted in chunks instead of all at once
+
+The share per chunk is the room between the RSS measured when the budget is
+created and the budget, divided over every chunk that can be in memory at once
+(CHUNK_COPIES copies of each: source rows, transformed records and the insert
+statement). The budget is a target, not a hard limit: the interpreter, the
+lookup arrays and the bulk load batches are not chunked.
+
+PhaseMemory records the peak RSS of every pipeline phase for the run report,
+sampled by a background thread (the process high-water mark where the current
+RSS cannot be read). Run this file directly to replay FactTrans from a
+synthetic source snapshot under a small budget and check its peak RSS.
+"""
+
+import os
+import re
+import gc
+import pickle
+import shutil
+import logging
+import tempfile
+import threading
+from contextlib import contextmanager
+
+from profiler import peak_rss_bytes
+
+logger = logging.getLogger(__name__)
+
+MB = 1024 ** 2
+SIZE_UNITS = {'': 1, 'B': 1, 'K': 1024, 'KB': 1024, 'M': 1024 ** 2, 'MB': 1024 ** 2,
+              'G': 1024 ** 3, 'GB': 1024 ** 3}
+
+# Shares of the budget
+CHUNK_SHARE = 0.5    # of the room above the starting RSS that in-flight chunks may take
+CHUNK_COPIES = 3     # a chunk is held as source rows, transformed records and insert statement
+SHRINK_AT = 0.9      # RSS share of the budget above which chunk sizes are halved
+GROW_BELOW = 0.6     # RSS share below which they grow back towards chunk_size
+SPILL_AT = 0.8       # RSS share above which queued pipeline chunks go to disk
+MIN_CHUNK_ROWS = 100
+
+# How often PhaseMemory samples the RSS
+SAMPLE_SECONDS = 0.05
+
+
+def parse_size(text):
+    """Bytes of a size such as 512MB, 2G or 1048576"""
+    match = re.fullmatch(r'\s*(\d+(?:\.\d+)?)\s*([KMG]?B?)\s*', str(text).upper())
+    if not match:
+        raise ValueError(f"Invalid size {text!r} (expected e.g. 512MB or 2GB)")
+    return int(float(match.group(1)) * SIZE_UNITS[match.group(2)])
+
+
+def current_rss_bytes():
+    """Resident set size of this process now (None where /proc is unavailable)"""
+    try:
+        with open('/proc/self/statm') as file:
+            pages = int(file.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return pages * os.sysconf('SC_PAGE_SIZE')
+
+
+def in_flight_chunks(pipelined=False, queue_chunks=4, loaders=1):
+    """Chunks one process can hold at once: one per loader, or every queue slot and stage when pipelined"""
+    per_loader = 2 * max(1, int(queue_chunks)) + 3 if pipelined else 1
+    return per_loader * max(1, int(loaders))
+
+
+class MemoryBudget:
+    """Chunk sizing and spill decisions of one process against a memory budget"""
+
+    def __init__(self, max_bytes, chunk_rows, in_flight=1):
+        self.max_bytes = int(max_bytes)
+        self.chunk_rows = max(1, int(chunk_rows))
+        self.in_flight = max(1, int(in_flight))
+        self.baseline = current_rss_bytes() or 0
+        self.resizes = 0
+        self.spilled_chunks = 0
+        self.spilled_bytes = 0
+        self._lock = threading.Lock()
+        if self.baseline > self.max_bytes * SPILL_AT:
+            logger.warning(f"RSS is already {self.baseline / MB:.0f} MB of the {self.max_bytes / MB:.0f} MB "
+                           f"memory budget - chunks will stay at the minimum size")
+
+    @property
+    def chunk_bytes(self):
+        """Memory ceiling of one extracted chunk"""
+        room = max(self.max_bytes - self.baseline, 0) * CHUNK_SHARE
+        return max(1, int(room / (CHUNK_COPIES * self.in_flight)))
+
+    def usage(self):
+        """Current RSS as a share of the budget (None where it cannot be read)"""
+        rss = current_rss_bytes()
+        return rss / self.max_bytes if rss is not None else None
+
+    def over(self, share):
+        usage = self.usage()
+        return usage is not None and usage > share
+
+    def adapt(self, rows, label, row_bytes=None):
+        """
+        Size of the next chunk after one of rows rows: capped by chunk_bytes,
+        halved above SHRINK_AT, grown by half below GROW_BELOW.
+        """
+        limit = self.chunk_rows
+        if row_bytes:
+            limit = max(MIN_CHUNK_ROWS, min(limit, self.chunk_bytes // row_bytes))
+        usage = self.usage()
+        resized = min(rows, limit)
+        if usage is not None and usage > SHRINK_AT and resized > MIN_CHUNK_ROWS:
+            # Release what the last chunks left behind before judging the next one
+            gc.collect()
+            usage = self.usage()
+            if usage > SHRINK_AT:
+                resized = max(MIN_CHUNK_ROWS, resized // 2)
+        elif usage is not None and usage < GROW_BELOW:
+            resized = min(limit, resized + max(resized // 2, 1))
+        if resized != rows:
+            with self._lock:
+                self.resizes += 1
+            level = logging.INFO if resized < rows else logging.DEBUG
+            logger.log(level, f"{label}: chunk size {rows:,} -> {resized:,} rows "
+                              f"(RSS {(usage or 0) * 100:.0f}% of the memory budget)")
+        return resized
+
+    def record_spill(self, size):
+        with self._lock:
+            self.spilled_chunks += 1
+            self.spilled_bytes += size
+
+    def to_dict(self):
+        return {
+            'max_bytes': self.max_bytes,
+            'baseline_rss_bytes': self.baseline,
+            'chunk_bytes': self.chunk_bytes,
+            'in_flight_chunks': self.in_flight,
+            'chunk_resizes': self.resizes,
+            'spilled_chunks': self.spilled_chunks,
+            'spilled_bytes': self.spilled_bytes,
+        }
+
+
+class SpilledChunk:
+    """Queue placeholder of a chunk pickled to disk"""
+
+    __slots__ = ('path', 'size')
+
+    def __init__(self, path, size):
+        self.path = path
+        self.size = size
+
+
+class ChunkSpill:
+    """
+    Moves pipeline chunks to temporary files while the process is over SPILL_AT
+    of its budget. park() is called by the stage that queues a chunk, restore()
+    by the stage that takes it; close() removes whatever was never read back.
+    """
+
+    def __init__(self, budget, directory=None):
+        self.budget = budget
+        self.directory = tempfile.mkdtemp(prefix='etl_spill_', dir=directory)
+
+    def park(self, chunk):
+        if not self.budget.over(SPILL_AT):
+            return chunk
+        handle, path = tempfile.mkstemp(suffix='.pickle', dir=self.directory)
+        with os.fdopen(handle, 'wb') as file:
+            pickle.dump(chunk, file, protocol=pickle.HIGHEST_PROTOCOL)
+        size = os.path.getsize(path)
+        self.budget.record_spill(size)
+        return SpilledChunk(path, size)
+
+    def restore(self, chunk):
+        if not isinstance(chunk, SpilledChunk):
+            return chunk
+        with open(chunk.path, 'rb') as file:
+            restored = pickle.load(file)
+        os.remove(chunk.path)
+        return restored
+
+    def close(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+
+class PhaseMemory:
+    """Peak RSS of each pipeline phase"""
+
+    def __init__(self):
+        self.peaks = {}
+        self._active = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Sample the RSS in the background (without /proc phases record the process high-water mark)"""
+        if current_rss_bytes() is not None and self._thread is None:
+            self._thread = threading.Thread(target=self._sample_loop, name='rss-sampler', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _sample(self):
+        rss = current_rss_bytes()
+        if rss is None:
+            rss = peak_rss_bytes()
+        with self._lock:
+            for name, peak in self._active.items():
+                self._active[name] = max(filter(None, [peak, rss]), default=None)
+
+    def _sample_loop(self):
+        while not self._stop.wait(SAMPLE_SECONDS):
+            self._sample()
+
+    @contextmanager
+    def phase(self, name):
+        """Record the peak RSS while the block runs into peaks[name]"""
+        with self._lock:
+            self._active[name] = None
+        self._sample()
+        try:
+            yield
+        finally:
+            self._sample()
+            with self._lock:
+                self.peaks[name] = self._active.pop(name)
+
+
+def check_fact_trans_budget(snapshot_dir, max_bytes, chunk_size=10000, vectorized=False, pipelined=False,
+                            queue_chunks=4):
+    """
+    Replay the FactTrans extract of a source snapshot through the budgeted
+    extract -> transform path of a FactTrans load (chunk sizing, pipelined
+    spilling) without a warehouse, and compare its peak RSS with the budget.
+    Returns the result record.
+    """
+    import time
+    import numpy as np
+    from snapshot import Snapshot
+    from stages import StagedPipeline
+    from lookup_cache import LookupCache, to_ordinal
+    from transform import transform_trans_chunk
+    from etl_pipeline_clean import _transform_trans_rows
+
+    snapshot = Snapshot(snapshot_dir)
+    memory = PhaseMemory().start()
+    try:
+        with memory.phase('lookups'):
+            # Surrogate keys as a full load hands them out: one per account in extract order
+            lookup = LookupCache()
+            account_ids = np.array([row[0] for row in snapshot.read_rows('client_account')], dtype=np.int64)
+            lookup.account_keys = np.zeros(int(account_ids.max(initial=0)) + 1, dtype=np.int32)
+            lookup.account_keys[account_ids] = np.arange(1, len(account_ids) + 1, dtype=np.int32)
+            (first, last), = snapshot.read_rows('date_range')
+            lookup.date_first, lookup.date_last = to_ordinal(first), to_ordinal(last)
+            del account_ids
+            gc.collect()
+
+        budget = MemoryBudget(max_bytes, chunk_size, in_flight_chunks(pipelined, queue_chunks))
+        transform = transform_trans_chunk if vectorized else _transform_trans_rows
+        totals = {'chunks': 0, 'extracted': 0, 'transformed': 0, 'smallest': None}
+        start = time.perf_counter()
+
+        def transform_chunk(chunk):
+            return len(chunk), transform(chunk, lookup)
+
+        def count_chunk(transformed):
+            extracted, records = transformed
+            totals['chunks'] += 1
+            totals['extracted'] += extracted
+            totals['transformed'] += len(records)
+            totals['smallest'] = min(filter(None, [totals['smallest'], extracted]))
+
+        with memory.phase('FactTrans replay'):
+            chunks = snapshot.iter_chunks('trans', budget.chunk_rows, columnar=vectorized, budget=budget)
+            if pipelined:
+                spill = ChunkSpill(budget)
+                try:
+                    StagedPipeline('FactTrans', queue_chunks, spill).run(chunks, transform_chunk, count_chunk)
+                finally:
+                    spill.close()
+            else:
+                for chunk in chunks:
+                    count_chunk(transform_chunk(chunk))
+        seconds = time.perf_counter() - start
+    finally:
+        memory.stop()
+
+    peak = memory.peaks['FactTrans replay']
+    result = dict(totals, seconds=seconds, peak_rss_bytes=peak, phase_peak_rss_bytes=dict(memory.peaks),
+                  within_budget=peak is not None and peak <= max_bytes, budget=budget.to_dict())
+    print(f"FactTrans replay of {snapshot_dir}")
+    print(f"  {totals['extracted']:,} rows extracted, {totals['transformed']:,} transformed "
+          f"in {totals['chunks']:,} chunks ({seconds:.1f}s)")
+    print(f"  chunk ceiling {budget.chunk_bytes / MB:.1f} MB, smallest chunk {totals['smallest'] or 0:,} rows, "
+          f"{budget.resizes} resizes, {budget.spilled_chunks} chunks spilled "
+          f"({budget.spilled_bytes / MB:.1f} MB)")
+    for name, phase_peak in memory.peaks.items():
+        print(f"  peak RSS {name:<18} {(phase_peak or 0) / MB:>8.0f} MB")
+    print(f"  budget {max_bytes / MB:.0f} MB: {'within budget' if result['within_budget'] else 'EXCEEDED'}")
+    return result
+
+
+if __name__ == "__main__":
+    """Check that a FactTrans replay at a fixed synthetic scale stays within a memory budget"""
+    import sys
+    import argparse
+    import subprocess
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="FactTrans under a memory budget (no database needed)")
+    parser.add_argument('--max-memory', default='256MB', help="Memory budget (default: %(default)s)")
+    parser.add_argument('--scale', type=float, default=1.0,
+                        help="Synthetic source scale factor (default: %(default)s)")
+    parser.add_argument('--snapshot', default=None,
+                        help="Replay this source snapshot instead of generating a synthetic one")
+    parser.add_argument('--chunk-size', type=int, default=10000, help="Rows per chunk (default: %(default)s)")
+    parser.add_argument('--vectorized', action='store_true', help="Columnar chunks and NumPy transforms")
+    parser.add_argument('--pipelined', action='store_true', help="Concurrent stages with chunk spilling")
+    args = parser.parse_args()
+
+    snapshot_dir = args.snapshot
+    work_dir = None
+    if snapshot_dir is None:
+        # Generated in a separate process so the generator's memory is not counted
+        work_dir = tempfile.mkdtemp(prefix='etl_budget_check_')
+        snapshot_dir = os.path.join(work_dir, 'snapshot')
+        generator = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'synthetic_source.py')
+        subprocess.run([sys.executable, generator, '--target', 'parquet', '--scale', str(args.scale),
+                        '--output', snapshot_dir], check=True)
+    try:
+        result = check_fact_trans_budget(snapshot_dir, parse_size(args.max_memory), args.chunk_size,
+                                         args.vectorized, args.pipelined)
+    finally:
+        if work_dir:
+            shutil.rmtree(work_dir, ignore_errors=True)
+    sys.exit(0 if result['within_budget'] else 1)
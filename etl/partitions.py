@@ -0,0 +1,128 @@
+"""
+Year Partitioning of the Fact Tables
+====================================
+With --partition-facts, FactTrans and FactLoan are RANGE-partitioned on date_year,
+the year of their DimDate key (sql/warehouse_variants/partitions.sql):
+
+    p_none      date_year < 1         (no date year)
+    p1993       date_year < 1994
+    ...
+    p1998       date_year < 1999
+    p_future    everything later
+
+partitions.sql only creates p_none and p_future. After DimDate is loaded,
+ensure_year_partitions() splits one partition per year off p_future (or off the
+partition a new earlier year falls into); the splits run before the fact rows of
+that year arrive, so they move no data. Years are kept contiguous, so the
+partition p<year> holds exactly the rows of that year.
+
+A query that filters the fact's date_year by a constant reads only the matching
+partitions (EXPLAIN lists them in its partitions column), and a single year can be
+emptied with ALTER TABLE ... TRUNCATE PARTITION and reloaded (see
+reload_fact_year() in etl_pipeline_clean.py).
+
+Run this file directly to list the partitions and their row counts.
+"""
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+PARTITIONS_SQL_PATH = 'sql/warehouse_variants/partitions.sql'
+
+# Partitioned fact table -> source extract and its date column
+PARTITIONED_FACTS = {
+    'FactTrans': ('trans', 'newdate'),
+    'FactLoan': ('loan', 'l.newdate'),
+}
+
+
+def year_partition(year):
+    """Name of the partition holding year"""
+    return f"p{int(year)}"
+
+
+def list_partitions(cursor, table):
+    """[(partition name, upper bound or None for MAXVALUE), ...] in order; [] if the table is not partitioned"""
+    cursor.execute("""
+        SELECT PARTITION_NAME, PARTITION_DESCRIPTION FROM information_schema.PARTITIONS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND PARTITION_NAME IS NOT NULL
+        ORDER BY PARTITION_ORDINAL_POSITION
+    """, (table,))
+    return [(name, None if bound == 'MAXVALUE' else int(bound)) for name, bound in cursor.fetchall()]
+
+
+def facts_partitioned(cursor):
+    """True when the fact tables of the cursor's schema use the year-partitioned layout"""
+    return bool(list_partitions(cursor, 'FactTrans'))
+
+
+def ensure_year_partitions(conn, first_year, last_year, tables=tuple(PARTITIONED_FACTS)):
+    """
+    Give every year of first_year..last_year its own partition in each table.
+    Returns the names of the partitions added.
+    """
+    added = []
+    if first_year is None or last_year is None:
+        return added
+    with conn.cursor() as cursor:
+        for table in tables:
+            partitions = list_partitions(cursor, table)
+            bounds = {bound for _, bound in partitions}
+            for year in range(int(first_year), int(last_year) + 1):
+                if year + 1 in bounds:
+                    continue
+                # The partition the year falls into now: the first one bounded above it
+                name, bound = next((name, bound) for name, bound in partitions
+                                   if bound is None or bound > year)
+                upper = 'MAXVALUE' if bound is None else f"({bound})"
+                cursor.execute(f"""
+                    ALTER TABLE {table} REORGANIZE PARTITION {name} INTO (
+                        PARTITION {year_partition(year)} VALUES LESS THAN ({year + 1}),
+                        PARTITION {name} VALUES LESS THAN {upper}
+                    )
+                """)
+                added.append(f"{table}.{year_partition(year)}")
+                partitions = list_partitions(cursor, table)
+                bounds = {bound for _, bound in partitions}
+    if added:
+        logger.info(f"Added year partitions: {', '.join(added)}")
+    return added
+
+
+def truncate_year_partition(conn, table, year):
+    """Empty the partition of one year"""
+    with conn.cursor() as cursor:
+        names = [name for name, _ in list_partitions(cursor, table)]
+        if year_partition(year) not in names:
+            raise ValueError(f"{table} has no partition for {year} (partitions: {', '.join(names) or 'none'})")
+        cursor.execute(f"ALTER TABLE {table} TRUNCATE PARTITION {year_partition(year)}")
+    logger.info(f"{table}: truncated partition {year_partition(year)}")
+
+
+def partition_rows(cursor, table):
+    """{partition name: row count} of a partitioned table, counted per partition"""
+    counts = {}
+    for name, _ in list_partitions(cursor, table):
+        cursor.execute(f"SELECT COUNT(*) FROM {table} PARTITION ({name})")
+        counts[name] = cursor.fetchone()[0]
+    return counts
+
+
+if __name__ == "__main__":
+    """List the fact table partitions of the live warehouse"""
+    import pymysql
+    from etl_pipeline_clean import WAREHOUSE_DB_CONFIG
+
+    config = WAREHOUSE_DB_CONFIG.copy()
+    config['ssl_disabled'] = True
+    conn = pymysql.connect(**config)
+    try:
+        with conn.cursor() as cursor:
+            if not facts_partitioned(cursor):
+                print("The fact tables are not partitioned (load with --partition-facts)")
+            for table in PARTITIONED_FACTS:
+                for name, rows in partition_rows(cursor, table).items():
+                    print(f"{table:<10} {name:<10} {rows:>12,}")
+    finally:
+        conn.close()
@@ -0,0 +1,249 @@
+"""
+ETL Run Profiler
+================
+Per-loader instrumentation for etl_pipeline_clean.py. Every load_* function gets:
+
+- wall time split into extract / transform / load / commit seconds
+  (transform is the loader's wall time not spent in the other three stages,
+  i.e. the Python row work including key lookups)
+- rows extracted and loaded, and loaded rows/sec
+- bytes received from the source and sent to the warehouse, read from the
+  server-side Bytes_sent / Bytes_received session counters of the loader's
+  connections, so every bulk load backend is measured the same way
+- the process-lifetime peak RSS (ru_maxrss) when the loader finished. Loaders
+  share the process and run concurrently, so this is not the loader's own
+  footprint; the report also carries the peak RSS of every pipeline phase, see
+  memory_budget.PhaseMemory
+
+A run's profile is written as a JSON report and can be compared against the
+previous report. Run this file directly to compare two saved reports.
+"""
+
+import os
+import sys
+import json
+import time
+import logging
+import threading
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+STAGES = ('extract', 'transform', 'load', 'commit')
+REPORT_PREFIX = 'etl_run_'
+
+
+def peak_rss_bytes():
+    """Peak resident set size of this process so far (None where unsupported)"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes elsewhere
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def session_counter(conn, variable):
+    """Value of a MySQL session status counter such as Bytes_sent (0 without a connection)"""
+    if conn is None:
+        return 0
+    with conn.cursor() as cursor:
+        cursor.execute("SHOW SESSION STATUS LIKE %s", (variable,))
+        row = cursor.fetchone()
+    return int(row[1]) if row else 0
+
+
+class LoaderProfile:
+    """Stage timings and volumes of one loader (one warehouse table)"""
+
+    def __init__(self, name):
+        self.name = name
+        self.stage_seconds = dict.fromkeys(STAGES, 0.0)
+        self.wall_seconds = 0.0
+        self.rows_extracted = 0
+        self.rows_loaded = 0
+        self.bytes_received = 0
+        self.bytes_sent = 0
+        self.process_peak_rss_bytes = None
+        self._counters = None
+
+    @contextmanager
+    def stage(self, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stage_seconds[stage] += time.perf_counter() - start
+
+    def timed_chunks(self, chunks):
+        """Pass chunks through, charging the time spent producing each one to extract"""
+        iterator = iter(chunks)
+        while True:
+            start = time.perf_counter()
+            try:
+                chunk = next(iterator)
+            except StopIteration:
+                self.stage_seconds['extract'] += time.perf_counter() - start
+                return
+            self.stage_seconds['extract'] += time.perf_counter() - start
+            self.rows_extracted += len(chunk)
+            yield chunk
+
+    def begin(self, source_conn, warehouse_conn):
+        """Snapshot the connection byte counters and the clock before the loader runs"""
+        self._counters = (time.perf_counter(), dict(self.stage_seconds),
+                          session_counter(source_conn, 'Bytes_sent'),
+                          session_counter(warehouse_conn, 'Bytes_received'))
+
+    def end(self, source_conn, warehouse_conn):
+        """Add the wall time, transform time and bytes since begin() and record the process peak RSS"""
+        start, stages_at_start, source_sent, warehouse_received = self._counters
+        wall_seconds = time.perf_counter() - start
+        measured = sum(self.stage_seconds[stage] - stages_at_start[stage]
+                       for stage in ('extract', 'load', 'commit'))
+        self.wall_seconds += wall_seconds
+        self.stage_seconds['transform'] += max(wall_seconds - measured, 0.0)
+        self.bytes_received += session_counter(source_conn, 'Bytes_sent') - source_sent
+        self.bytes_sent += session_counter(warehouse_conn, 'Bytes_received') - warehouse_received
+        self.process_peak_rss_bytes = max(filter(None, [self.process_peak_rss_bytes, peak_rss_bytes()]),
+                                          default=None)
+        self._counters = None
+
+    def merge(self, other):
+        """
+        Fold in a profile dict from a worker process (partitioned loads). Stage seconds
+        add up across workers, so they can exceed the parent loader's wall time.
+        """
+        for stage in STAGES:
+            self.stage_seconds[stage] += other['stage_seconds'][stage]
+        self.rows_extracted += other['rows_extracted']
+        self.rows_loaded += other['rows_loaded']
+        self.bytes_received += other['bytes_received']
+        self.bytes_sent += other['bytes_sent']
+        self.process_peak_rss_bytes = max(filter(None, [self.process_peak_rss_bytes,
+                                                        other['process_peak_rss_bytes']]), default=None)
+
+    def to_dict(self):
+        return {
+            'wall_seconds': self.wall_seconds,
+            'stage_seconds': dict(self.stage_seconds),
+            'rows_extracted': self.rows_extracted,
+            'rows_loaded': self.rows_loaded,
+            'rows_per_sec': self.rows_loaded / self.wall_seconds if self.wall_seconds > 0 else 0.0,
+            'bytes_received': self.bytes_received,
+            'bytes_sent': self.bytes_sent,
+            'process_peak_rss_bytes': self.process_peak_rss_bytes,
+        }
+
+
+class RunProfiler:
+    """Loader profiles of one ETL run, shared by every loader thread"""
+
+    def __init__(self):
+        self.loaders = {}
+        self._lock = threading.Lock()
+
+    def loader(self, name):
+        with self._lock:
+            if name not in self.loaders:
+                self.loaders[name] = LoaderProfile(name)
+            return self.loaders[name]
+
+    def report(self, run_id, options, phase_timings, total_seconds, started_at, phase_peak_rss=None):
+        """Machine-readable run report"""
+        return {
+            'run_id': run_id,
+            'started_at': started_at,
+            'total_seconds': total_seconds,
+            'peak_rss_bytes': peak_rss_bytes(),
+            'options': options,
+            'phases': dict(phase_timings),
+            'phase_peak_rss_bytes': dict(phase_peak_rss or {}),
+            'loaders': {name: profile.to_dict() for name, profile in self.loaders.items()},
+        }
+
+    def log_summary(self):
+        logger.info("-" * 105)
+        logger.info(f"{'Loader':<18} {'Rows':>10} {'Rows/s':>10} {'Extract':>8} {'Transf.':>8} "
+                    f"{'Load':>8} {'Commit':>8} {'Sent MB':>8} {'Recv MB':>8} {'Proc peak MB':>13}")
+        for name, profile in self.loaders.items():
+            data = profile.to_dict()
+            stages = data['stage_seconds']
+            peak = data['process_peak_rss_bytes'] / 1e6 if data['process_peak_rss_bytes'] else 0.0
+            logger.info(f"{name:<18} {data['rows_loaded']:>10,} {data['rows_per_sec']:>10,.0f} "
+                        f"{stages['extract']:>8.2f} {stages['transform']:>8.2f} {stages['load']:>8.2f} "
+                        f"{stages['commit']:>8.2f} {data['bytes_sent'] / 1e6:>8.1f} "
+                        f"{data['bytes_received'] / 1e6:>8.1f} {peak:>13.0f}")
+        logger.info("-" * 105)
+
+
+def latest_report(report_dir):
+    """Path of the newest run report in report_dir, or None"""
+    if not report_dir or not os.path.isdir(report_dir):
+        return None
+    reports = sorted(name for name in os.listdir(report_dir)
+                     if name.startswith(REPORT_PREFIX) and name.endswith('.json'))
+    return os.path.join(report_dir, reports[-1]) if reports else None
+
+
+def write_report(report, report_dir):
+    """Write a run report as etl_run_<run_id>.json; returns its path"""
+    os.makedirs(report_dir, exist_ok=True)
+    path = os.path.join(report_dir, f"{REPORT_PREFIX}{report['run_id']}.json")
+    with open(path, 'w') as file:
+        json.dump(report, file, indent=2, default=str)
+    logger.info(f"Run report written to {path}")
+    return path
+
+
+def load_report(path):
+    with open(path, 'r') as file:
+        return json.load(file)
+
+
+def _change(current, previous):
+    if not previous:
+        return "     n/a"
+    return f"{(current - previous) / previous * 100:>+7.1f}%"
+
+
+def compare_reports(current, previous):
+    """Log per-loader and per-phase changes between two run reports; returns the rows compared"""
+    rows = []
+    logger.info(f"Comparison with run {previous['run_id']}")
+    logger.info(f"{'Loader':<18} {'Rows/s before':>14} {'Rows/s now':>12} {'Change':>8}  Slowest stage change")
+    for name, now in current['loaders'].items():
+        before = previous['loaders'].get(name)
+        if before is None:
+            logger.info(f"{name:<18} {'(new)':>14} {now['rows_per_sec']:>12,.0f}")
+            continue
+        stage_deltas = {stage: now['stage_seconds'][stage] - before['stage_seconds'][stage] for stage in STAGES}
+        worst = max(stage_deltas, key=stage_deltas.get)
+        rows.append({'loader': name, 'before': before['rows_per_sec'], 'now': now['rows_per_sec'],
+                     'stage_deltas': stage_deltas})
+        logger.info(f"{name:<18} {before['rows_per_sec']:>14,.0f} {now['rows_per_sec']:>12,.0f} "
+                    f"{_change(now['rows_per_sec'], before['rows_per_sec'])}  "
+                    f"{worst} {stage_deltas[worst]:+.2f}s")
+    for phase, seconds in current['phases'].items():
+        if phase in previous['phases']:
+            logger.info(f"Phase {phase:<30} {previous['phases'][phase]:>8.2f}s -> {seconds:>8.2f}s "
+                        f"{_change(seconds, previous['phases'][phase])}")
+    logger.info(f"Total {previous['total_seconds']:.2f}s -> {current['total_seconds']:.2f}s "
+                f"{_change(current['total_seconds'], previous['total_seconds'])}")
+    return rows
+
+
+if __name__ == "__main__":
+    """Compare two saved run reports"""
+    import argparse
+
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    parser = argparse.ArgumentParser(description="Compare two ETL run reports")
+    parser.add_argument('current', help="Run report JSON")
+    parser.add_argument('previous', help="Earlier run report JSON")
+    args = parser.parse_args()
+    compare_reports(load_report(args.current), load_report(args.previous))
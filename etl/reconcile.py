@@ -0,0 +1,355 @@
+"""
+Source vs Warehouse Reconciliation
+==================================
+Verifies that the warehouse rows match the source rows they were loaded from,
+without a full row diff.
+
+Each table is described by a normalized row expression on both sides: the source
+side applies the loader's cleaning rules in SQL (defaults, 'UNKNOWN' operations,
+orphan filtering, NULL or out-of-range dates falling back to the first DimDate day)
+and the warehouse side resolves the surrogate keys back to
+natural keys through DimClientAccount and DimDate. The key space is split into
+ranges and each side returns COUNT(*) and BIT_XOR(CRC32(normalized row)) per range
+in a single grouped scan; both sides run concurrently on their own connection.
+
+Only ranges whose count or checksum differ are split again (drill-down), until a
+range holds few enough rows to compare row checksums key by key. Matching data
+therefore costs one index-ordered scan per side.
+
+Run this file directly to reconcile the live warehouse against the source.
+"""
+
+import math
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from encoding import schema_version
+
+logger = logging.getLogger(__name__)
+
+RECONCILE_OPTIONS = {
+    'ranges': 64,          # Top-level key ranges per table
+    'fanout': 16,          # Sub-ranges a mismatching range is split into
+    'leaf_rows': 2000,     # Ranges with at most this many rows are compared row by row
+    'max_reported': 20,    # Mismatching keys logged per table
+}
+
+# Source accounts that become DimClientAccount rows (see load_dim_client_account)
+OWNER_ACCOUNTS = """
+    SELECT d.account_id FROM disp d
+    JOIN client c ON d.client_id = c.client_id
+    JOIN account a ON a.account_id = d.account_id
+    WHERE d.type = 'OWNER'
+"""
+
+# Table -> key and normalized row expression on each side, plus the watermark bounding the load;
+# {date} in a source row is its 'date' column resolved like LookupCache.date_key, and
+# warehouse_v2 decodes the dictionary-encoded attributes of schema v2 (see encoding.py)
+RECONCILE_TABLES = {
+    'FactTrans': {
+        'watermark': 'trans.trans_id',
+        'source': {
+            'key': 't.trans_id',
+            'from': "trans t",
+            'filter': f"t.account_id IN ({OWNER_ACCOUNTS})",
+            'date': 't.newdate',
+            'row': """CONCAT_WS('|', t.trans_id, t.account_id, {date},
+                        IF(TRIM(t.account) REGEXP '^[+-]?[0-9]+$', CAST(TRIM(t.account) AS SIGNED), 0),
+                        COALESCE(NULLIF(t.type, ''), 'UNKNOWN'),
+                        COALESCE(NULLIF(NULLIF(t.operation, 'UNKNOWN'), ''), ''),
+                        COALESCE(t.k_symbol, ''),
+                        CAST(COALESCE(t.amount, 0) AS DECIMAL(20, 2)),
+                        CAST(COALESCE(t.balance, 0) AS DECIMAL(20, 2)))""",
+        },
+        'warehouse': {
+            'key': 'ft.trans_id',
+            'from': """FactTrans ft
+                       JOIN DimClientAccount ca ON ft.clientAcc_id = ca.clientAcc_id
+                       JOIN DimDate dd ON ft.date_id = dd.date_id""",
+            'filter': None,
+            'row': """CONCAT_WS('|', ft.trans_id, ca.account_id, dd.date, ft.account, ft.type,
+                        COALESCE(ft.operation, ''), ft.k_symbol,
+                        CAST(ft.amount AS DECIMAL(20, 2)),
+                        CAST(ft.balance AS DECIMAL(20, 2)))""",
+        },
+        'warehouse_v2': {
+            'key': 'ft.trans_id',
+            'from': """FactTrans ft
+                       JOIN DimClientAccount ca ON ft.clientAcc_id = ca.clientAcc_id
+                       JOIN DimDate dd ON ft.date_id = dd.date_id
+                       JOIN TransTypeJunk tj ON ft.trans_type_id = tj.trans_type_id""",
+            'filter': None,
+            'row': """CONCAT_WS('|', ft.trans_id, ca.account_id, dd.date, ft.account, tj.type,
+                        tj.operation, tj.k_symbol,
+                        CAST(ft.amount AS DECIMAL(20, 2)),
+                        CAST(ft.balance AS DECIMAL(20, 2)))""",
+        },
+    },
+    'FactLoan': {
+        'watermark': 'loan.loan_id',
+        'source': {
+            'key': 'l.loan_id',
+            'from': "loan l LEFT JOIN ref_loanstatus ls ON l.status = ls.status",
+            'filter': f"l.account_id IN ({OWNER_ACCOUNTS})",
+            'date': 'l.newdate',
+            'row': """CONCAT_WS('|', l.loan_id, l.account_id, {date},
+                        COALESCE(NULLIF(l.status, ''), 'U'),
+                        CAST(TRUNCATE(COALESCE(l.amount, 0), 0) AS SIGNED),
+                        CAST(TRUNCATE(COALESCE(l.duration, 0), 0) AS SIGNED),
+                        CAST(COALESCE(l.payments, 0) AS DECIMAL(20, 2)),
+                        COALESCE(ls.description, 'Unknown'))""",
+        },
+        'warehouse': {
+            'key': 'fl.loan_id',
+            'from': """FactLoan fl
+                       JOIN DimClientAccount ca ON fl.clientAcc_id = ca.clientAcc_id
+                       JOIN DimDate dd ON fl.date_id = dd.date_id""",
+            'filter': None,
+            'row': """CONCAT_WS('|', fl.loan_id, ca.account_id, dd.date, fl.status, fl.amount, fl.duration,
+                        CAST(fl.payments AS DECIMAL(20, 2)), fl.description)""",
+        },
+    },
+    'DimCard': {
+        'watermark': None,
+        'source': {
+            'key': 'c.card_id',
+            'from': "card c JOIN disp d ON c.disp_id = d.disp_id",
+            'filter': f"d.account_id IN ({OWNER_ACCOUNTS})",
+            'date': 'c.newissued',
+            'row': """CONCAT_WS('|', c.card_id, d.account_id, {date},
+                        COALESCE(NULLIF(c.type, ''), 'UNKNOWN'))""",
+        },
+        'warehouse': {
+            'key': 'dc.card_id',
+            'from': """DimCard dc
+                       JOIN DimClientAccount ca ON dc.clientAcc_id = ca.clientAcc_id
+                       JOIN DimDate dd ON dc.date_id = dd.date_id""",
+            'filter': None,
+            'row': "CONCAT_WS('|', dc.card_id, ca.account_id, dd.date, dc.type)",
+        },
+        'warehouse_v2': {
+            'key': 'dc.card_id',
+            'from': """DimCard dc
+                       JOIN DimClientAccount ca ON dc.clientAcc_id = ca.clientAcc_id
+                       JOIN DimDate dd ON dc.date_id = dd.date_id
+                       JOIN DimCardType ct ON dc.card_type_id = ct.card_type_id""",
+            'filter': None,
+            'row': "CONCAT_WS('|', dc.card_id, ca.account_id, dd.date, ct.card_type)",
+        },
+    },
+}
+
+
+class TableReconciliation:
+    """Outcome of reconciling one table"""
+
+    def __init__(self, table):
+        self.table = table
+        self.ranges_compared = 0
+        self.mismatched_ranges = 0
+        self.rows_compared = 0
+        self.missing = []      # keys in the source but not in the warehouse
+        self.extra = []        # keys in the warehouse but not in the source
+        self.changed = []      # keys whose normalized rows differ
+        self.seconds = 0.0
+
+    @property
+    def matches(self):
+        return not (self.missing or self.extra or self.changed)
+
+    def to_dict(self):
+        return {
+            'ranges_compared': self.ranges_compared,
+            'mismatched_ranges': self.mismatched_ranges,
+            'rows_compared': self.rows_compared,
+            'missing': len(self.missing),
+            'extra': len(self.extra),
+            'changed': len(self.changed),
+            'seconds': self.seconds,
+        }
+
+
+class SourceReconciler:
+    """Chunked checksum comparison of source tables against their warehouse tables"""
+
+    def __init__(self, source_conn, warehouse_conn, options=None):
+        self.connections = {'source': source_conn, 'warehouse': warehouse_conn}
+        self.options = {**RECONCILE_OPTIONS, **(options or {})}
+        self._pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix='reconcile')
+        with warehouse_conn.cursor() as cursor:
+            self.schema_version = schema_version(cursor)
+            cursor.execute("SELECT MIN(date), MAX(date) FROM DimDate")
+            self.date_range = cursor.fetchone()
+
+    def close(self):
+        self._pool.shutdown(wait=True)
+
+    def _both_sides(self, func, *args):
+        """Run func(side, ...) for the source and the warehouse concurrently"""
+        futures = {side: self._pool.submit(func, side, *args) for side in self.connections}
+        return futures['source'].result(), futures['warehouse'].result()
+
+    def _fallback_date(self, column):
+        """SQL date of a source column as the loaders key it: the first DimDate day when NULL or outside DimDate"""
+        first, last = self.date_range
+        if first is None:
+            return f"DATE({column})"
+        return f"IF(DATE({column}) BETWEEN '{first:%Y-%m-%d}' AND '{last:%Y-%m-%d}', DATE({column}), '{first:%Y-%m-%d}')"
+
+    def _spec(self, table, side):
+        specs = RECONCILE_TABLES[table]
+        if side == 'warehouse' and self.schema_version == 2:
+            return specs.get('warehouse_v2', specs['warehouse'])
+        if 'date' in specs[side]:
+            return {**specs[side], 'row': specs[side]['row'].replace('{date}', self._fallback_date(specs[side]['date']))}
+        return specs[side]
+
+    def _conditions(self, spec):
+        conditions = [f"{spec['key']} >= %s", f"{spec['key']} < %s"]
+        if spec['filter']:
+            conditions.append(spec['filter'])
+        return " AND ".join(conditions)
+
+    def _key_bounds(self, side, table, high_water):
+        spec = self._spec(table, side)
+        where = f"WHERE {spec['filter']}" if spec['filter'] else ""
+        with self.connections[side].cursor() as cursor:
+            cursor.execute(f"SELECT MIN({spec['key']}), MAX({spec['key']}) FROM {spec['from']} {where}")
+            low, high = cursor.fetchone()
+        if high is not None and high_water is not None:
+            high = min(high, high_water)
+        return low, high
+
+    def _range_checksums(self, side, table, low, high, width):
+        """{bucket: (rows, checksum)} for [low, high) split into buckets of width keys"""
+        spec = self._spec(table, side)
+        with self.connections[side].cursor() as cursor:
+            cursor.execute(f"""
+                SELECT FLOOR(({spec['key']} - %s) / %s) AS bucket, COUNT(*), BIT_XOR(CRC32({spec['row']}))
+                FROM {spec['from']}
+                WHERE {self._conditions(spec)}
+                GROUP BY bucket
+            """, (low, width, low, high))
+            return {int(bucket): (int(rows), int(checksum)) for bucket, rows, checksum in cursor.fetchall()}
+
+    def _row_checksums(self, side, table, low, high):
+        spec = self._spec(table, side)
+        with self.connections[side].cursor() as cursor:
+            cursor.execute(f"""
+                SELECT {spec['key']}, CRC32({spec['row']})
+                FROM {spec['from']}
+                WHERE {self._conditions(spec)}
+            """, (low, high))
+            return dict(cursor.fetchall())
+
+    def _compare_rows(self, result, table, low, high):
+        source_rows, warehouse_rows = self._both_sides(self._row_checksums, table, low, high)
+        result.rows_compared += max(len(source_rows), len(warehouse_rows))
+        result.missing += sorted(set(source_rows) - set(warehouse_rows))
+        result.extra += sorted(set(warehouse_rows) - set(source_rows))
+        result.changed += sorted(key for key in set(source_rows) & set(warehouse_rows)
+                                 if source_rows[key] != warehouse_rows[key])
+
+    def _compare_ranges(self, result, table, low, high, width):
+        """Compare [low, high) bucket by bucket and drill into the buckets that differ"""
+        source, warehouse = self._both_sides(self._range_checksums, table, low, high, width)
+        buckets = set(source) | set(warehouse)
+        result.ranges_compared += len(buckets)
+        for bucket in sorted(buckets):
+            source_bucket, warehouse_bucket = source.get(bucket, (0, 0)), warehouse.get(bucket, (0, 0))
+            if source_bucket == warehouse_bucket:
+                result.rows_compared += source_bucket[0]
+                continue
+            result.mismatched_ranges += 1
+            bucket_low = low + bucket * width
+            bucket_high = min(bucket_low + width, high)
+            if max(source_bucket[0], warehouse_bucket[0]) <= self.options['leaf_rows'] or width <= 1:
+                self._compare_rows(result, table, bucket_low, bucket_high)
+            else:
+                self._compare_ranges(result, table, bucket_low, bucket_high,
+                                     math.ceil(width / self.options['fanout']))
+
+    def reconcile_table(self, table, high_water=None):
+        """Reconcile one table; high_water bounds the keys to those the load covered"""
+        result = TableReconciliation(table)
+        start = time.perf_counter()
+        bounds = self._both_sides(self._key_bounds, table, high_water)
+        lows = [low for low, _ in bounds if low is not None]
+        highs = [high for _, high in bounds if high is not None]
+        if lows:
+            low, high = min(lows), max(highs) + 1
+            width = max(1, math.ceil((high - low) / self.options['ranges']))
+            self._compare_ranges(result, table, low, high, width)
+        result.seconds = time.perf_counter() - start
+        self._log(result)
+        return result
+
+    def reconcile(self, tables=None, high_water=None):
+        """Reconcile the given tables (default: all); returns {table: TableReconciliation}"""
+        high_water = high_water or {}
+        results = {}
+        for table in tables or RECONCILE_TABLES:
+            watermark = RECONCILE_TABLES[table]['watermark']
+            results[table] = self.reconcile_table(table, high_water.get(watermark) if watermark else None)
+        return results
+
+    def _log(self, result):
+        status = "OK" if result.matches else "MISMATCH"
+        logger.info(f"{result.table}: {status} - {result.rows_compared:,} rows in {result.ranges_compared} ranges "
+                    f"({result.mismatched_ranges} drilled into) in {result.seconds:.2f}s")
+        limit = self.options['max_reported']
+        for label, keys in (('missing from warehouse', result.missing), ('not in source', result.extra),
+                            ('changed', result.changed)):
+            if keys:
+                shown = ", ".join(str(key) for key in keys[:limit])
+                more = f" (+{len(keys) - limit} more)" if len(keys) > limit else ""
+                logger.warning(f"  {len(keys)} keys {label}: {shown}{more}")
+
+
+def reconcile_with_source(source_conn, warehouse_conn, tables=None, high_water=None, options=None,
+                          raise_on_mismatch=True):
+    """
+    Reconcile warehouse tables against the source. Returns {table: TableReconciliation};
+    raises ValueError when any table differs unless told not to.
+    """
+    logger.info("Reconciling warehouse tables with the source...")
+    reconciler = SourceReconciler(source_conn, warehouse_conn, options)
+    try:
+        results = reconciler.reconcile(tables, high_water)
+    finally:
+        reconciler.close()
+
+    failed = [table for table, result in results.items() if not result.matches]
+    if failed and raise_on_mismatch:
+        raise ValueError(f"Source reconciliation failed: {', '.join(failed)}")
+    return results
+
+
+if __name__ == "__main__":
+    """Reconcile the live warehouse against the source up to the recorded watermarks"""
+    import argparse
+    from etl_pipeline_clean import get_source_connection, get_warehouse_connection, read_watermarks
+
+    parser = argparse.ArgumentParser(description="Source vs warehouse checksum reconciliation")
+    parser.add_argument('tables', nargs='*', help=f"Tables to reconcile: {', '.join(RECONCILE_TABLES)} (default: all)")
+    parser.add_argument('--ranges', type=int, default=RECONCILE_OPTIONS['ranges'],
+                        help="Top-level key ranges per table (default: %(default)s)")
+    parser.add_argument('--leaf-rows', type=int, default=RECONCILE_OPTIONS['leaf_rows'],
+                        help="Compare ranges of at most this many rows key by key (default: %(default)s)")
+    args = parser.parse_args()
+    unknown = [table for table in args.tables if table not in RECONCILE_TABLES]
+    if unknown:
+        parser.error(f"cannot reconcile {', '.join(unknown)}")
+
+    source_conn = get_source_connection()
+    warehouse_conn = get_warehouse_connection()
+    try:
+        results = reconcile_with_source(source_conn, warehouse_conn, args.tables or None,
+                                        read_watermarks(warehouse_conn),
+                                        {'ranges': args.ranges, 'leaf_rows': args.leaf_rows},
+                                        raise_on_mismatch=False)
+    finally:
+        source_conn.close()
+        warehouse_conn.close()
+    raise SystemExit(0 if all(result.matches for result in results.values()) else 1)
@@ -0,0 +1,171 @@
+"""
+Dependency-Aware ETL Scheduler
+==============================
+Runs ETL loaders as a small DAG: every task declares the tasks it depends on and
+independent tasks run concurrently on a thread pool. Each worker thread opens its
+own source/warehouse connection pair, so loaders never share a connection.
+"""
+
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+logger = logging.getLogger(__name__)
+
+
+class ETLTask:
+    """One schedulable loader: func(source_conn, warehouse_conn, options)"""
+
+    def __init__(self, name, func, depends_on=None):
+        self.name = name
+        self.func = func
+        self.depends_on = list(depends_on or [])
+
+    def __repr__(self):
+        return f"ETLTask({self.name!r}, depends_on={self.depends_on})"
+
+
+def validate_dag(tasks):
+    """Check for unknown dependencies and cycles; returns the tasks in a valid topological order"""
+    by_name = {task.name: task for task in tasks}
+    for task in tasks:
+        for dependency in task.depends_on:
+            if dependency not in by_name:
+                raise ValueError(f"Task '{task.name}' depends on unknown task '{dependency}'")
+
+    ordered, visiting, done = [], set(), set()
+
+    def visit(task):
+        if task.name in done:
+            return
+        if task.name in visiting:
+            raise ValueError(f"Dependency cycle detected at task '{task.name}'")
+        visiting.add(task.name)
+        for dependency in task.depends_on:
+            visit(by_name[dependency])
+        visiting.discard(task.name)
+        done.add(task.name)
+        ordered.append(task)
+
+    for task in tasks:
+        visit(task)
+    return ordered
+
+
+def critical_path(tasks, timings):
+    """
+    Longest dependency chain by measured task duration.
+    Returns (path, seconds) where path is the list of task names along the chain.
+    """
+    best = {}
+
+    for task in validate_dag(tasks):
+        duration = timings[task.name]['duration']
+        previous = max(task.depends_on, key=lambda name: best[name][1], default=None)
+        if previous is None:
+            best[task.name] = ([task.name], duration)
+        else:
+            path, seconds = best[previous]
+            best[task.name] = (path + [task.name], seconds + duration)
+
+    if not best:
+        return [], 0.0
+    return max(best.values(), key=lambda entry: entry[1])
+
+
+class DAGScheduler:
+    """Run ETLTasks respecting dependencies, with one connection pair per worker thread"""
+
+    def __init__(self, tasks, connect, max_workers=4):
+        """
+        tasks:       list of ETLTask
+        connect:     callable returning a new (source_conn, warehouse_conn) pair
+        max_workers: thread pool size
+        """
+        self.tasks = validate_dag(tasks)
+        self.connect = connect
+        self.max_workers = max(1, int(max_workers))
+        self.timings = {}
+        self._local = threading.local()
+        self._connections = []
+        self._lock = threading.Lock()
+
+    def _worker_connections(self):
+        """Connection pair owned by the current worker thread (opened on first use)"""
+        if not hasattr(self._local, 'connections'):
+            self._local.connections = self.connect()
+            with self._lock:
+                self._connections.append(self._local.connections)
+        return self._local.connections
+
+    def _run_task(self, task, options, run_start):
+        source_conn, warehouse_conn = self._worker_connections()
+        start = time.perf_counter()
+        logger.info(f"[{threading.current_thread().name}] Starting {task.name}")
+        task.func(source_conn, warehouse_conn, options)
+        end = time.perf_counter()
+        self.timings[task.name] = {
+            'start': start - run_start,
+            'end': end - run_start,
+            'duration': end - start,
+            'thread': threading.current_thread().name,
+        }
+        logger.info(f"[{threading.current_thread().name}] Finished {task.name} in {end - start:.2f}s")
+
+    def _close_connections(self):
+        for pair in self._connections:
+            for conn in pair:
+                try:
+                    conn.close()
+                except Exception:
+                    pass
+        self._connections = []
+
+    def run(self, options=None):
+        """Execute all tasks; raises the first task failure after cancelling tasks not yet started"""
+        remaining = {task.name: task for task in self.tasks}
+        completed = set()
+        running = {}
+        run_start = time.perf_counter()
+
+        try:
+            with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='etl-worker') as pool:
+                while remaining or running:
+                    # Submit every task whose dependencies have all completed
+                    for name, task in list(remaining.items()):
+                        if all(dependency in completed for dependency in task.depends_on):
+                            running[pool.submit(self._run_task, task, options, run_start)] = name
+                            del remaining[name]
+
+                    done, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        name = running.pop(future)
+                        error = future.exception()
+                        if error is not None:
+                            logger.error(f"Task {name} failed: {error}")
+                            for pending in running:
+                                pending.cancel()
+                            raise error
+                        completed.add(name)
+        finally:
+            self._close_connections()
+
+        wall_time = time.perf_counter() - run_start
+        self.report(wall_time)
+        return self.timings
+
+    def report(self, wall_time):
+        """Log per-task timings and the critical path"""
+        path, path_seconds = critical_path(self.tasks, self.timings)
+        serial_seconds = sum(timing['duration'] for timing in self.timings.values())
+
+        logger.info("-" * 60)
+        logger.info(f"{'Task':<20} {'Start (s)':>10} {'End (s)':>10} {'Duration':>10}  Worker")
+        for name, timing in sorted(self.timings.items(), key=lambda item: item[1]['start']):
+            logger.info(f"{name:<20} {timing['start']:>10.2f} {timing['end']:>10.2f} "
+                        f"{timing['duration']:>10.2f}  {timing['thread']}")
+        logger.info(f"Critical path: {' -> '.join(path)} ({path_seconds:.2f}s)")
+        logger.info(f"Wall time: {wall_time:.2f}s, serial sum: {serial_seconds:.2f}s, "
+                    f"speedup: {serial_seconds / wall_time if wall_time > 0 else 0:.2f}x")
+        logger.info("-" * 60)
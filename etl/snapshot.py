@@ -0,0 +1,246 @@
+"""
+Source Snapshots
+================
+Extract-to-Parquet stage for etl_pipeline_clean.py. Every source query of a run
+(date_range, district, client_account, card, trans, loan) is streamed from the OLTP
+database once (in keyset pages, see keyset.py) and written as a zstd-compressed
+Parquet file, one row group per extracted chunk:
+
+    <snapshot_dir>/snapshot_<run_id>/
+        trans.parquet, loan.parquet, ...
+        manifest.json     (written last: the run options the queries were built
+                           with, and per-file row counts and sizes)
+
+The loaders then read their rows from the snapshot instead of the source. Files
+are opened memory-mapped and read batch by batch, so a replay never holds more
+than one chunk of a fact table in memory. Because the manifest keeps the
+watermarks the snapshot was taken with, a snapshot can be replayed later (for
+example to iterate on transforms offline) without connecting to the source.
+
+Column types follow the source column types from the cursor description; DECIMAL
+columns stay decimal, so replayed transforms see the same values as live ones.
+"""
+
+import os
+import json
+import time
+import logging
+import itertools
+from datetime import date, datetime
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+import pymysql.cursors
+from pymysql.constants import FIELD_TYPE
+
+from keyset import KeysetQuery, KeysetReader, estimate_row_bytes
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_FILE = 'manifest.json'
+SNAPSHOT_PREFIX = 'snapshot_'
+COMPRESSION = 'zstd'
+
+_INTEGER_TYPES = {FIELD_TYPE.TINY, FIELD_TYPE.SHORT, FIELD_TYPE.LONG, FIELD_TYPE.INT24,
+                  FIELD_TYPE.LONGLONG, FIELD_TYPE.YEAR}
+_DECIMAL_TYPES = {FIELD_TYPE.DECIMAL, FIELD_TYPE.NEWDECIMAL}
+_FLOAT_TYPES = {FIELD_TYPE.FLOAT, FIELD_TYPE.DOUBLE}
+_DATE_TYPES = {FIELD_TYPE.DATE, FIELD_TYPE.NEWDATE}
+_DATETIME_TYPES = {FIELD_TYPE.DATETIME, FIELD_TYPE.TIMESTAMP}
+
+
+def arrow_schema(description):
+    """Arrow schema for a pymysql cursor description"""
+    fields = []
+    for name, type_code, _, _, _, scale, _ in description:
+        if type_code in _INTEGER_TYPES:
+            arrow_type = pa.int64()
+        elif type_code in _DECIMAL_TYPES:
+            arrow_type = pa.decimal128(38, scale or 0)
+        elif type_code in _FLOAT_TYPES:
+            arrow_type = pa.float64()
+        elif type_code in _DATE_TYPES:
+            arrow_type = pa.date32()
+        elif type_code in _DATETIME_TYPES:
+            arrow_type = pa.timestamp('us')
+        else:
+            arrow_type = pa.string()
+        fields.append(pa.field(name, arrow_type))
+    return pa.schema(fields)
+
+
+def _to_array(values, arrow_type):
+    """Arrow array of one column; values the type cannot hold (e.g. invalid dates) become null"""
+    try:
+        return pa.array(values, type=arrow_type)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        pass
+    if pa.types.is_string(arrow_type):
+        cleaned = [value.decode('utf-8', 'replace') if isinstance(value, bytes)
+                   else None if value is None else str(value) for value in values]
+    elif pa.types.is_date(arrow_type):
+        cleaned = [value if isinstance(value, date) else None for value in values]
+    elif pa.types.is_timestamp(arrow_type):
+        cleaned = [value if isinstance(value, datetime) else None for value in values]
+    else:
+        cleaned = [value if isinstance(value, (int, float)) or value is None else None for value in values]
+    return pa.array(cleaned, type=arrow_type)
+
+
+def _record_batch(rows, schema):
+    columns = list(zip(*rows))
+    return pa.record_batch([_to_array(list(column), field.type) for column, field in zip(columns, schema)],
+                           schema=schema)
+
+
+def _write_chunks(path, description, chunks):
+    """Write row chunks into a Parquet file (one row group each); returns the number of rows written"""
+    rows_written = 0
+    tmp_path = path + '.tmp'
+    schema = arrow_schema(description)
+    with pq.ParquetWriter(tmp_path, schema, compression=COMPRESSION) as writer:
+        for rows in chunks:
+            writer.write_batch(_record_batch(rows, schema))
+            rows_written += len(rows)
+    os.replace(tmp_path, path)
+    return rows_written
+
+
+def _fetch_chunks(cursor, chunk_size):
+    while True:
+        rows = cursor.fetchmany(chunk_size)
+        if not rows:
+            return
+        yield list(rows)
+
+
+def write_table_snapshot(source_conn, path, query, params=None, chunk_size=10000, throttle=None):
+    """
+    Stream one source query into a Parquet file; returns the number of rows written.
+    A KeysetQuery (keyset.py) is read in keyset pages of chunk_size rows instead.
+    """
+    if isinstance(query, KeysetQuery):
+        reader = KeysetReader(source_conn, query, chunk_size, throttle=throttle, label=os.path.basename(path))
+        pages = iter(reader)
+        first = next(pages, None)
+        chunks = itertools.chain([first], pages) if first else []
+        return _write_chunks(path, reader.description, chunks)
+
+    with source_conn.cursor(pymysql.cursors.SSCursor) as cursor:
+        cursor.execute(query, params)
+        return _write_chunks(path, cursor.description, _fetch_chunks(cursor, chunk_size))
+
+
+def write_snapshot(source_conn, directory, queries, state, chunk_size=10000, throttle=None):
+    """
+    Snapshot every source query into directory.
+    queries: {name: (query or KeysetQuery, params)}; state: run options recorded in the manifest.
+    Returns the manifest.
+    """
+    os.makedirs(directory, exist_ok=True)
+    manifest = {'created_at': datetime.now().isoformat(timespec='seconds'), 'state': state, 'files': {}}
+
+    for name, (query, params) in queries.items():
+        start = time.perf_counter()
+        path = os.path.join(directory, f"{name}.parquet")
+        rows = write_table_snapshot(source_conn, path, query, params, chunk_size, throttle)
+        manifest['files'][name] = {'rows': rows, 'bytes': os.path.getsize(path),
+                                   'seconds': time.perf_counter() - start}
+        logger.info(f"Snapshot {name}: {rows:,} rows, {os.path.getsize(path) / 1e6:.1f} MB "
+                    f"in {manifest['files'][name]['seconds']:.2f}s")
+
+    # The manifest marks the snapshot complete
+    tmp_path = os.path.join(directory, MANIFEST_FILE + '.tmp')
+    with open(tmp_path, 'w') as file:
+        json.dump(manifest, file, indent=2, default=str)
+    os.replace(tmp_path, os.path.join(directory, MANIFEST_FILE))
+    logger.info(f"Source snapshot written to {directory}")
+    return manifest
+
+
+def latest_snapshot(snapshot_dir):
+    """Newest complete snapshot directory under snapshot_dir, or None"""
+    if not snapshot_dir or not os.path.isdir(snapshot_dir):
+        return None
+    snapshots = sorted(name for name in os.listdir(snapshot_dir) if name.startswith(SNAPSHOT_PREFIX)
+                       and os.path.exists(os.path.join(snapshot_dir, name, MANIFEST_FILE)))
+    return os.path.join(snapshot_dir, snapshots[-1]) if snapshots else None
+
+
+def resolve_snapshot(path):
+    """A snapshot directory, or the newest complete snapshot when given the directory holding them"""
+    if os.path.exists(os.path.join(path, MANIFEST_FILE)):
+        return path
+    snapshot = latest_snapshot(path)
+    if snapshot is None:
+        raise FileNotFoundError(f"No complete source snapshot in {path}")
+    return snapshot
+
+
+def _to_frame(batch):
+    """
+    DataFrame with typed columns for the vectorized transforms; text columns stay
+    object arrays holding None for NULL, as in rows fetched from the source.
+    """
+    frame = batch.to_pandas()
+    for name, column in zip(batch.schema.names, batch.columns):
+        if pa.types.is_string(column.type):
+            frame[name] = pd.Series(column.to_pylist(), dtype=object, index=frame.index)
+    return frame
+
+
+class Snapshot:
+    """Read side of a snapshot directory"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        with open(os.path.join(directory, MANIFEST_FILE), 'r') as file:
+            self.manifest = json.load(file)
+
+    @property
+    def state(self):
+        """Run options (mode, watermarks) the snapshot queries were built with"""
+        return self.manifest['state']
+
+    def _file(self, name):
+        if name not in self.manifest['files']:
+            raise KeyError(f"Snapshot {self.directory} has no {name} extract")
+        return pq.ParquetFile(os.path.join(self.directory, f"{name}.parquet"), memory_map=True)
+
+    def read_rows(self, name):
+        """All rows of a small extract as tuples, like cursor.fetchall()"""
+        table = self._file(name).read()
+        return list(zip(*[column.to_pylist() for column in table.columns]))
+
+    def iter_chunks(self, name, chunk_size, columnar=False, key_column=None, after=None, budget=None):
+        """
+        Yield an extract in chunks of up to chunk_size rows: row tuples, or pandas
+        DataFrames with typed columns when columnar. With after, only rows whose
+        key_column is greater are returned (resuming a fact load). With a
+        MemoryBudget (memory_budget.py) the batches are re-sliced to the chunk
+        size the budget allows after every chunk.
+        """
+        parquet_file = self._file(name)
+        rows = max(1, int(chunk_size))
+        row_bytes = None
+        for batch in parquet_file.iter_batches(batch_size=rows):
+            if after is not None:
+                batch = batch.filter(pc.greater(batch.column(key_column), after))
+                if batch.num_rows == 0:
+                    continue
+            offset = 0
+            while offset < batch.num_rows:
+                part = batch.slice(offset, rows) if budget else batch
+                offset += part.num_rows
+                if columnar:
+                    chunk = _to_frame(part)
+                else:
+                    chunk = list(zip(*[column.to_pylist() for column in part.columns]))
+                if budget and row_bytes is None:
+                    row_bytes = (int(chunk.memory_usage(deep=True).sum()) // max(len(chunk), 1) if columnar
+                                 else estimate_row_bytes(chunk))
+                yield chunk
+                if budget:
+                    rows = budget.adapt(rows, name, row_bytes)
@@ -0,0 +1,191 @@
+"""
+Pipelined ETL Stages
+====================
+Runs extract, transform and load as concurrent producer/consumer stages joined by
+bounded queues:
+
+    extract thread --[queue]--> transform thread --[queue]--> load (calling thread)
+
+While one chunk is being inserted into the warehouse the next one is already being
+transformed and the one after that fetched from the source, so network waits on
+both databases overlap with Python work. A full queue blocks its producer
+(backpressure), so at most queue_chunks chunks wait between two stages.
+
+Each stage keeps its own connection: the extract thread is the only user of the
+source connection and the load stage runs in the caller's thread on the caller's
+warehouse connection. Chunks keep their extraction order, so key-ordered
+checkpoints remain valid.
+
+With a ChunkSpill (memory_budget.py) the queues hold placeholders of chunks
+pickled to disk while the process is over its memory budget; the consuming stage
+reads them back, so a memory budget no longer has to fit every queued chunk.
+"""
+
+import time
+import queue
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+_END = object()
+
+# How often blocked stages check whether another stage has failed
+POLL_SECONDS = 0.1
+
+
+class StageStats:
+    """Busy / blocked / starved time of one stage"""
+
+    def __init__(self, name):
+        self.name = name
+        self.busy = 0.0       # doing the stage's own work
+        self.blocked = 0.0    # waiting for room in the downstream queue (backpressure)
+        self.starved = 0.0    # waiting for input from the upstream queue
+        self.chunks = 0
+
+    def to_dict(self, wall_seconds):
+        return {
+            'busy_seconds': self.busy,
+            'blocked_seconds': self.blocked,
+            'starved_seconds': self.starved,
+            'chunks': self.chunks,
+            'utilization': self.busy / wall_seconds if wall_seconds > 0 else 0.0,
+        }
+
+
+class StagedPipeline:
+    """Extract -> transform -> load over bounded queues"""
+
+    def __init__(self, name, queue_chunks=4, spill=None):
+        self.name = name
+        self.queue_chunks = max(1, int(queue_chunks))
+        self.spill = spill
+        self.stats = {stage: StageStats(stage) for stage in ('extract', 'transform', 'load')}
+        self._stop = threading.Event()
+        self._errors = []
+
+    def _put(self, target, item, stats):
+        if self.spill and item is not _END:
+            item = self.spill.park(item)
+        start = time.perf_counter()
+        try:
+            while not self._stop.is_set():
+                try:
+                    target.put(item, timeout=POLL_SECONDS)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+        finally:
+            stats.blocked += time.perf_counter() - start
+
+    def _get(self, source, stats):
+        start = time.perf_counter()
+        try:
+            while not self._stop.is_set():
+                try:
+                    item = source.get(timeout=POLL_SECONDS)
+                except queue.Empty:
+                    continue
+                if self.spill and item is not _END:
+                    item = self.spill.restore(item)
+                return item
+            return _END
+        finally:
+            stats.starved += time.perf_counter() - start
+
+    def _fail(self, error):
+        self._errors.append(error)
+        self._stop.set()
+
+    def _extract(self, chunks, extracted):
+        stats = self.stats['extract']
+        iterator = iter(chunks)
+        try:
+            while not self._stop.is_set():
+                start = time.perf_counter()
+                chunk = next(iterator, _END)
+                stats.busy += time.perf_counter() - start
+                if chunk is _END:
+                    break
+                stats.chunks += 1
+                if not self._put(extracted, chunk, stats):
+                    break
+        except Exception as e:
+            self._fail(e)
+        finally:
+            if hasattr(iterator, 'close'):
+                iterator.close()
+            self._put(extracted, _END, stats)
+
+    def _transform(self, transform, extracted, transformed):
+        stats = self.stats['transform']
+        try:
+            while True:
+                chunk = self._get(extracted, stats)
+                if chunk is _END:
+                    break
+                start = time.perf_counter()
+                result = transform(chunk)
+                stats.busy += time.perf_counter() - start
+                stats.chunks += 1
+                if not self._put(transformed, result, stats):
+                    break
+        except Exception as e:
+            self._fail(e)
+        finally:
+            self._put(transformed, _END, stats)
+
+    def run(self, chunks, transform, load):
+        """
+        Feed every chunk through transform() and load(); load runs in this thread.
+        Re-raises the first stage failure after all stages have stopped.
+        Returns per-stage statistics.
+        """
+        extracted = queue.Queue(maxsize=self.queue_chunks)
+        transformed = queue.Queue(maxsize=self.queue_chunks)
+        threads = [
+            threading.Thread(target=self._extract, args=(chunks, extracted),
+                             name=f"{self.name}-extract", daemon=True),
+            threading.Thread(target=self._transform, args=(transform, extracted, transformed),
+                             name=f"{self.name}-transform", daemon=True),
+        ]
+        run_start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+
+        stats = self.stats['load']
+        try:
+            while True:
+                result = self._get(transformed, stats)
+                if result is _END:
+                    break
+                start = time.perf_counter()
+                load(result)
+                stats.busy += time.perf_counter() - start
+                stats.chunks += 1
+        except Exception as e:
+            self._fail(e)
+        finally:
+            # Also releases the other stages when the load stage is interrupted
+            self._stop.set()
+            for thread in threads:
+                thread.join()
+
+        if self._errors:
+            raise self._errors[0]
+        wall_seconds = time.perf_counter() - run_start
+        self.report(wall_seconds)
+        return {name: stage.to_dict(wall_seconds) for name, stage in self.stats.items()}
+
+    def report(self, wall_seconds):
+        """Log stage utilization; the busiest stage is the bottleneck"""
+        logger.info(f"{self.name} pipeline: {wall_seconds:.2f}s wall, queue depth {self.queue_chunks}")
+        logger.info(f"{'Stage':<10} {'Busy (s)':>9} {'Util':>7} {'Blocked (s)':>12} {'Starved (s)':>12} {'Chunks':>7}")
+        for stage in self.stats.values():
+            utilization = stage.busy / wall_seconds * 100 if wall_seconds > 0 else 0.0
+            logger.info(f"{stage.name:<10} {stage.busy:>9.2f} {utilization:>6.1f}% {stage.blocked:>12.2f} "
+                        f"{stage.starved:>12.2f} {stage.chunks:>7}")
+        bottleneck = max(self.stats.values(), key=lambda stage: stage.busy)
+        logger.info(f"Bottleneck stage: {bottleneck.name}")
@@ -0,0 +1,693 @@
+"""
+Synthetic Berka Source
+======================
+Scale-out generator for the Berka-style source schema (district, ref_loanstatus,
+account, client, disp, card, loan, trans). The real source only comes at one size;
+this writes statistically similar, referentially consistent data at any scale
+factor so the ETL and the dashboard queries can be measured at 10x-1000x:
+
+    python etl/synthetic_source.py --scale 10 --target mysql
+    python etl/synthetic_source.py --scale 10 --target parquet --output synthetic/x10
+
+The shape of the data comes from a profile: row counts, date range, the district
+table, category shares (account frequency, card type, loan status and duration,
+trans type / operation / k_symbol) and log-normal amount parameters per trans kind.
+The built-in DEFAULT_PROFILE approximates the published Berka statistics (its
+district attributes are generated); --fit derives a profile from the real source
+instead and saves it as JSON for --profile.
+
+Referential consistency:
+- Districts and loan statuses are reference data and keep their size; every other
+  table grows with the scale factor.
+- Every account has exactly one OWNER disposition (and client) and optionally one
+  DISPONENT; cards belong to OWNER dispositions, loans (at most one per account)
+  and transactions to accounts, all dated between the account's opening and the
+  last date of the profile. Transaction counts are proportional to the days an
+  account is open, and balances are running per-account sums.
+
+Accounts are generated in batches of --batch-accounts, so memory stays bounded at
+any scale. Each batch is streamed to one of two targets:
+- mysql   : bulk inserts (bulk_loader.py) into a separate schema on the source
+            server (financedata_synthetic by default, sql/synthetic/berka_source.sql);
+            run the ETL on it with --source-database.
+- parquet : the extracts of a full ETL run written as a source snapshot
+            (snapshot.py layout with a manifest); replay it with --from-snapshot.
+
+Ids are assigned in batch order, so trans_id increases by account rather than by date.
+"""
+
+import os
+import json
+import time
+import logging
+from datetime import date, datetime
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from bulk_loader import get_bulk_loader
+from date_keys import EPOCH_ORDINAL
+from snapshot import MANIFEST_FILE, COMPRESSION
+
+logger = logging.getLogger(__name__)
+
+SOURCE_SCHEMA_SQL_PATH = 'sql/synthetic/berka_source.sql'
+DEFAULT_DATABASE = 'financedata_synthetic'
+
+# Columns written to each source table, in insert order (parents before children)
+SOURCE_COLUMNS = {
+    'district': ('district_id', 'district_name', 'region', 'inhabitants', 'noCities', 'ratio_urbaninhabitants',
+                 'average_salary', 'unemployment', 'noEntrepreneur', 'noCrimes'),
+    'ref_loanstatus': ('status', 'description'),
+    'account': ('account_id', 'district_id', 'frequency', 'newdate'),
+    'client': ('client_id', 'district_id'),
+    'disp': ('disp_id', 'client_id', 'account_id', 'type'),
+    'card': ('card_id', 'disp_id', 'type', 'newissued'),
+    'loan': ('loan_id', 'account_id', 'newdate', 'amount', 'duration', 'payments', 'status'),
+    'trans': ('trans_id', 'account_id', 'newdate', 'type', 'operation', 'amount', 'balance', 'k_symbol',
+              'bank', 'account'),
+}
+
+# Snapshot extracts (source_extract() in etl_pipeline_clean.py): (batch table, column) per extract column
+SNAPSHOT_COLUMNS = {
+    'client_account': (('account', 'account_id'), ('account', 'client_id'), ('account', 'frequency'),
+                       ('account', 'newdate'), ('account', 'client_district_id')),
+    'card': (('card', 'card_id'), ('card', 'type'), ('card', 'newissued'), ('card', 'account_id')),
+    'trans': (('trans', 'trans_id'), ('trans', 'account_id'), ('trans', 'newdate'), ('trans', 'type'),
+              ('trans', 'operation'), ('trans', 'amount'), ('trans', 'balance'), ('trans', 'k_symbol'),
+              ('trans', 'account')),
+    'loan': (('loan', 'loan_id'), ('loan', 'account_id'), ('loan', 'newdate'), ('loan', 'amount'),
+             ('loan', 'duration'), ('loan', 'payments'), ('loan', 'status'), ('loan', 'description')),
+}
+
+# Arrow types of every generated column (anything else is a string)
+ARROW_TYPES = {
+    'newdate': pa.date32(), 'newissued': pa.date32(), 'first_date': pa.date32(), 'last_date': pa.date32(),
+    'amount': pa.float64(), 'balance': pa.float64(), 'payments': pa.float64(),
+    'ratio_urbaninhabitants': pa.float64(), 'unemployment': pa.float64(),
+}
+_INTEGER_COLUMNS = {'account_id', 'client_id', 'card_id', 'trans_id', 'loan_id', 'district_id', 'client_district_id',
+                    'duration', 'account', 'inhabitants', 'noCities', 'average_salary', 'noEntrepreneur', 'noCrimes'}
+
+# Berka's 77 districts by region
+_BERKA_DISTRICTS = {
+    'Prague': ['Hl.m. Praha'],
+    'central Bohemia': ['Benesov', 'Beroun', 'Kladno', 'Kolin', 'Kutna Hora', 'Melnik', 'Mlada Boleslav',
+                        'Nymburk', 'Praha - vychod', 'Praha - zapad', 'Pribram', 'Rakovnik'],
+    'south Bohemia': ['Ceske Budejovice', 'Cesky Krumlov', 'Jindrichuv Hradec', 'Pelhrimov', 'Pisek',
+                      'Prachatice', 'Strakonice', 'Tabor'],
+    'west Bohemia': ['Domazlice', 'Cheb', 'Karlovy Vary', 'Klatovy', 'Plzen - mesto', 'Plzen - jih',
+                     'Plzen - sever', 'Rokycany', 'Sokolov', 'Tachov'],
+    'north Bohemia': ['Ceska Lipa', 'Decin', 'Chomutov', 'Jablonec n. Nisou', 'Liberec', 'Litomerice',
+                      'Louny', 'Most', 'Teplice', 'Usti nad Labem'],
+    'east Bohemia': ['Havlickuv Brod', 'Hradec Kralove', 'Chrudim', 'Jicin', 'Nachod', 'Pardubice',
+                     'Rychnov nad Kneznou', 'Semily', 'Svitavy', 'Trutnov', 'Usti nad Orlici'],
+    'south Moravia': ['Blansko', 'Brno - mesto', 'Brno - venkov', 'Breclav', 'Hodonin', 'Jihlava', 'Kromeriz',
+                      'Prostejov', 'Trebic', 'Uherske Hradiste', 'Vyskov', 'Zlin', 'Znojmo', 'Zdar nad Sazavou'],
+    'north Moravia': ['Bruntal', 'Frydek - Mistek', 'Jesenik', 'Karvina', 'Novy Jicin', 'Olomouc', 'Opava',
+                      'Ostrava - mesto', 'Prerov', 'Sumperk', 'Vsetin'],
+}
+
+
+def _default_districts():
+    """Berka district names and regions with generated (plausible, fixed) attributes"""
+    rng = np.random.default_rng(1993)
+    rows = []
+    for region, names in _BERKA_DISTRICTS.items():
+        for name in names:
+            capital = region == 'Prague'
+            inhabitants = 1204953 if capital else int(rng.lognormal(11.6, 0.35))
+            urban = 100.0 if capital else round(float(rng.uniform(35, 90)), 1)
+            rows.append([len(rows) + 1, name, region, inhabitants, 1 if capital else int(rng.integers(4, 12)),
+                         urban, 12541 if capital else int(rng.normal(9000, 600)),
+                         0.29 if capital else round(float(rng.uniform(0.5, 7.5)), 2),
+                         167 if capital else int(rng.integers(80, 160)),
+                         85677 if capital else int(inhabitants * rng.uniform(0.02, 0.05))])
+    return rows
+
+
+# Approximation of the Berka financial dataset; see profile_source() for fitting the real one
+DEFAULT_PROFILE = {
+    'counts': {'account': 4500, 'client': 5369, 'disp': 5369, 'card': 892, 'loan': 682, 'trans': 1056320},
+    'first_date': '1993-01-01',
+    'last_date': '1998-12-31',
+    'last_account_date': '1997-12-29',
+    'same_district_share': 0.9,
+    'districts': _default_districts(),
+    'account_districts': None,
+    'frequencies': {'Monthly Issuance': 0.926, 'Weekly Issuance': 0.053, 'Issuance After Transaction': 0.021},
+    'card_types': {'Classic': 0.739, 'Junior': 0.163, 'Gold': 0.098},
+    'loan_statuses': [['A', 'Finished - No Problems', 0.298], ['B', 'Finished - Pending Payments', 0.045],
+                      ['C', 'Active - OK', 0.591], ['D', 'Active - In Debt', 0.066]],
+    'finished_statuses': ['A', 'B'],
+    'loan_durations': {'12': 0.19, '24': 0.20, '36': 0.20, '48': 0.20, '60': 0.21},
+    'loan_amount': [11.6, 0.75],
+    'opening_balance': [6.9, 1.0],
+    'banks': ['AB', 'CD', 'EF', 'GH', 'IJ', 'KL', 'MN', 'OP', 'QR', 'ST', 'UV', 'WX', 'YZ'],
+    'trans_kinds': [
+        {'type': 'Credit', 'operation': None, 'k_symbol': 'Interest Credited', 'share': 0.173,
+         'log_amount': [4.6, 1.0], 'credit': True, 'partner': False, 'negative': False},
+        {'type': 'Credit', 'operation': 'Credit in Cash', 'k_symbol': '', 'share': 0.148,
+         'log_amount': [9.0, 1.0], 'credit': True, 'partner': False, 'negative': False},
+        {'type': 'Credit', 'operation': 'Collection from Another Bank', 'k_symbol': 'Old-age Pension',
+         'share': 0.029, 'log_amount': [8.8, 0.5], 'credit': True, 'partner': True, 'negative': False},
+        {'type': 'Credit', 'operation': 'Collection from Another Bank', 'k_symbol': '', 'share': 0.033,
+         'log_amount': [9.3, 0.6], 'credit': True, 'partner': True, 'negative': False},
+        {'type': 'Debit (Withdrawal)', 'operation': 'Withdrawal in Cash', 'k_symbol': 'Payment for Statement',
+         'share': 0.148, 'log_amount': [2.7, 0.05], 'credit': False, 'partner': False, 'negative': False},
+        {'type': 'Debit (Withdrawal)', 'operation': 'Withdrawal in Cash', 'k_symbol': '', 'share': 0.262,
+         'log_amount': [8.3, 1.0], 'credit': False, 'partner': False, 'negative': False},
+        {'type': 'Debit (Withdrawal)', 'operation': 'Withdrawal in Cash',
+         'k_symbol': 'Sanction Interest if Negative Balance', 'share': 0.0015, 'log_amount': [3.5, 0.5],
+         'credit': False, 'partner': False, 'negative': False},
+        {'type': 'Debit (Withdrawal)', 'operation': 'Remittance to Another Bank', 'k_symbol': 'Household',
+         'share': 0.112, 'log_amount': [8.0, 0.7], 'credit': False, 'partner': True, 'negative': False},
+        {'type': 'Debit (Withdrawal)', 'operation': 'Remittance to Another Bank', 'k_symbol': 'Insurance Payment',
+         'share': 0.0175, 'log_amount': [7.2, 0.8], 'credit': False, 'partner': True, 'negative': False},
+        {'type': 'Debit (Withdrawal)', 'operation': 'Remittance to Another Bank', 'k_symbol': 'Loan Payment',
+         'share': 0.013, 'log_amount': [8.3, 0.7], 'credit': False, 'partner': True, 'negative': False},
+        {'type': 'Debit (Withdrawal)', 'operation': 'Remittance to Another Bank', 'k_symbol': '', 'share': 0.054,
+         'log_amount': [8.0, 1.0], 'credit': False, 'partner': True, 'negative': False},
+        {'type': 'Debit (Withdrawal)', 'operation': 'Credit Card Withdrawal', 'k_symbol': '', 'share': 0.0076,
+         'log_amount': [7.8, 0.8], 'credit': False, 'partner': False, 'negative': False},
+    ],
+}
+
+
+def _as_date(value):
+    """date of a DATE value or a 'YYYYMMDD' / 'YYYY-MM-DD' string"""
+    if value is None or isinstance(value, date):
+        return value
+    text = str(value).strip().replace('-', '')
+    return datetime.strptime(text[:8], '%Y%m%d').date()
+
+
+def _plain(value):
+    """JSON-friendly scalar (DECIMAL -> float, bytes -> str)"""
+    if isinstance(value, bytes):
+        return value.decode('utf-8', 'replace')
+    if value is None or isinstance(value, (int, float, str)):
+        return value
+    return float(value)
+
+
+def _shares(rows):
+    """{value: share} of (value, count) rows"""
+    total = sum(count for _, count in rows) or 1
+    return {_plain(value): count / total for value, count in rows}
+
+
+def profile_source(source_conn):
+    """Fit a generator profile (DEFAULT_PROFILE layout) to a Berka-style source database"""
+    profile = dict(DEFAULT_PROFILE)
+    with source_conn.cursor() as cursor:
+        counts = {}
+        for table in DEFAULT_PROFILE['counts']:
+            cursor.execute(f"SELECT COUNT(*) FROM {table}")
+            counts[table] = cursor.fetchone()[0]
+        profile['counts'] = counts
+
+        cursor.execute("SELECT MIN(newdate), MAX(newdate) FROM trans")
+        first, last = cursor.fetchone()
+        cursor.execute("SELECT MAX(newdate) FROM account")
+        profile['first_date'] = str(_as_date(first))
+        profile['last_date'] = str(_as_date(last))
+        profile['last_account_date'] = str(_as_date(cursor.fetchone()[0]))
+
+        cursor.execute(f"SELECT {', '.join(SOURCE_COLUMNS['district'])} FROM district ORDER BY district_id")
+        profile['districts'] = [[_plain(value) for value in row] for row in cursor.fetchall()]
+        cursor.execute("SELECT district_id, COUNT(*) FROM account GROUP BY district_id")
+        profile['account_districts'] = {str(key): share for key, share in _shares(cursor.fetchall()).items()}
+        cursor.execute("""
+            SELECT AVG(c.district_id = a.district_id) FROM account a
+            JOIN disp d ON a.account_id = d.account_id AND d.type = 'OWNER'
+            JOIN client c ON d.client_id = c.client_id
+        """)
+        profile['same_district_share'] = _plain(cursor.fetchone()[0]) or 0.0
+
+        cursor.execute("SELECT frequency, COUNT(*) FROM account GROUP BY frequency")
+        profile['frequencies'] = _shares(cursor.fetchall())
+        cursor.execute("SELECT type, COUNT(*) FROM card GROUP BY type")
+        profile['card_types'] = _shares(cursor.fetchall())
+
+        cursor.execute("""
+            SELECT l.status, COALESCE(ls.description, 'Unknown'), COUNT(*)
+            FROM loan l LEFT JOIN ref_loanstatus ls ON l.status = ls.status
+            GROUP BY l.status, ls.description ORDER BY l.status
+        """)
+        rows = cursor.fetchall()
+        total = sum(row[2] for row in rows) or 1
+        profile['loan_statuses'] = [[status, description, count / total] for status, description, count in rows]
+        statuses = {row[0] for row in rows}
+        profile['finished_statuses'] = [status for status in DEFAULT_PROFILE['finished_statuses']
+                                        if status in statuses]
+        cursor.execute("SELECT duration, COUNT(*) FROM loan GROUP BY duration")
+        profile['loan_durations'] = {str(key): share for key, share in _shares(cursor.fetchall()).items()}
+        cursor.execute("SELECT AVG(LN(amount)), STDDEV_POP(LN(amount)) FROM loan WHERE amount > 0")
+        profile['loan_amount'] = [_plain(value) for value in cursor.fetchone()]
+
+        cursor.execute("SELECT DISTINCT bank FROM trans WHERE bank IS NOT NULL AND bank <> ''")
+        profile['banks'] = [_plain(row[0]) for row in cursor.fetchall()] or DEFAULT_PROFILE['banks']
+        cursor.execute("""
+            SELECT type, operation, k_symbol, COUNT(*), AVG(LN(ABS(amount))), STDDEV_POP(LN(ABS(amount))),
+                   AVG(account IS NOT NULL AND account <> 0), AVG(amount < 0)
+            FROM trans WHERE amount <> 0
+            GROUP BY type, operation, k_symbol
+        """)
+        rows = cursor.fetchall()
+    total = sum(row[3] for row in rows) or 1
+    profile['trans_kinds'] = [
+        {'type': _plain(kind), 'operation': _plain(operation), 'k_symbol': _plain(k_symbol),
+         'share': count / total, 'log_amount': [_plain(mu), _plain(sigma) or 0.0],
+         # Berka types are 'Credit' (PRIJEM) and withdrawals; only credits raise the balance
+         'credit': any(word in str(kind).lower() for word in ('credit', 'prijem')),
+         'partner': _plain(partner) > 0.5, 'negative': _plain(negative) > 0.5}
+        for kind, operation, k_symbol, count, mu, sigma, partner, negative in rows
+    ]
+    return profile
+
+
+def save_profile(profile, path):
+    with open(path, 'w') as file:
+        json.dump(profile, file, indent=2)
+    logger.info(f"Generator profile written to {path}")
+
+
+def load_profile(path=None):
+    """Profile JSON written by save_profile(), or DEFAULT_PROFILE"""
+    if not path:
+        return DEFAULT_PROFILE
+    with open(path, 'r') as file:
+        return json.load(file)
+
+
+def _choice(rng, values, shares, size):
+    """size draws from values (object array) weighted by shares"""
+    shares = np.asarray(shares, dtype=np.float64)
+    return np.asarray(values, dtype=object)[rng.choice(len(values), size=size, p=shares / shares.sum())]
+
+
+def _ordinal(value):
+    return date.fromisoformat(value).toordinal()
+
+
+def _group_starts(counts):
+    return np.cumsum(counts) - counts
+
+
+class SyntheticSource:
+    """
+    Sequential generator of a scaled Berka-style source. batches() yields
+    {table: {column: array}} per batch of accounts; dates are day ordinals.
+    """
+
+    def __init__(self, profile=None, scale=1.0, seed=0, batch_accounts=2000):
+        self.profile = profile or DEFAULT_PROFILE
+        self.scale = scale
+        self.seed = seed
+        self.batch_accounts = max(1, int(batch_accounts))
+        counts = self.profile['counts']
+        self.accounts = max(1, int(round(counts['account'] * scale)))
+        self.disponent_share = max(0, counts['disp'] - counts['account']) / counts['account']
+        self.card_share = counts['card'] / counts['account']
+        self.loan_share = counts['loan'] / counts['account']
+        self.trans_per_account = counts['trans'] / counts['account']
+
+        self.first = _ordinal(self.profile['first_date'])
+        self.last = _ordinal(self.profile['last_date'])
+        self.last_opening = min(self.last, _ordinal(self.profile['last_account_date']))
+        # Expected open days of an account, for transaction counts proportional to account age
+        self.mean_open_days = self.last - (self.first + self.last_opening) / 2 + 1
+
+        districts = self.profile['districts']
+        self.district_ids = np.array([row[0] for row in districts], dtype=np.int64)
+        if self.profile.get('account_districts'):
+            weights = [self.profile['account_districts'].get(str(row[0]), 0.0) for row in districts]
+        else:
+            weights = [row[3] or 0 for row in districts]
+        self.district_weights = np.asarray(weights, dtype=np.float64) / np.sum(weights)
+
+        kinds = self.profile['trans_kinds']
+        self.kind_shares = np.array([kind['share'] for kind in kinds], dtype=np.float64)
+        self.kind_shares /= self.kind_shares.sum()
+        self.kind_mu = np.array([kind['log_amount'][0] for kind in kinds], dtype=np.float64)
+        self.kind_sigma = np.array([kind['log_amount'][1] for kind in kinds], dtype=np.float64)
+        self.kind_credit = np.array([kind['credit'] for kind in kinds])
+        self.kind_partner = np.array([kind['partner'] for kind in kinds])
+        self.kind_negative = np.array([kind['negative'] for kind in kinds])
+        self.kind_text = {column: np.array([kind[column] for kind in kinds], dtype=object)
+                          for column in ('type', 'operation', 'k_symbol')}
+
+        self.statuses = self.profile['loan_statuses']
+        self.descriptions = {status: description for status, description, _ in self.statuses}
+        self.next_ids = {'client': 1, 'disp': 1, 'card': 1, 'loan': 1, 'trans': 1}
+        self.rows = {table: 0 for table in SOURCE_COLUMNS}
+        self.rows['district'] = len(districts)
+        self.rows['ref_loanstatus'] = len(self.statuses)
+        self.max_dates = {'account': None, 'card': None}
+        self.date_range = [None, None]
+
+    def reference_tables(self):
+        """Rows of the unscaled reference tables: {'district': [...], 'ref_loanstatus': [...]}"""
+        return {'district': [tuple(row) for row in self.profile['districts']],
+                'ref_loanstatus': [(status, description) for status, description, _ in self.statuses]}
+
+    def _ids(self, table, count):
+        start = self.next_ids[table]
+        self.next_ids[table] = start + count
+        self.rows[table] += count
+        return np.arange(start, start + count, dtype=np.int64)
+
+    def _districts(self, rng, size):
+        return rng.choice(self.district_ids, size=size, p=self.district_weights)
+
+    def _statuses(self, rng, finished):
+        """Loan statuses; finished loans draw from the profile's finished statuses only"""
+        codes = np.array([row[0] for row in self.statuses], dtype=object)
+        shares = np.array([row[2] for row in self.statuses], dtype=np.float64)
+        is_finished = np.isin(codes, self.profile.get('finished_statuses') or [])
+        result = np.empty(len(finished), dtype=object)
+        for mask, group in ((finished, is_finished), (~finished, ~is_finished)):
+            if not group.any() or shares[group].sum() <= 0:
+                group = np.ones(len(codes), dtype=bool)
+            result[mask] = _choice(rng, codes[group], shares[group], int(mask.sum()))
+        return result
+
+    def _track_dates(self, *ordinals):
+        for values in ordinals:
+            if len(values):
+                low, high = int(values.min()), int(values.max())
+                self.date_range[0] = low if self.date_range[0] is None else min(self.date_range[0], low)
+                self.date_range[1] = high if self.date_range[1] is None else max(self.date_range[1], high)
+
+    def _batch(self, index, size):
+        rng = np.random.default_rng([self.seed, index])
+        first_account = index * self.batch_accounts + 1
+        account_ids = np.arange(first_account, first_account + size, dtype=np.int64)
+        opened = rng.integers(self.first, self.last_opening + 1, size=size)
+        open_days = self.last - opened + 1
+        districts = self._districts(rng, size)
+        profile = self.profile
+
+        # One OWNER client per account, in the account's district most of the time
+        has_disponent = rng.random(size) < self.disponent_share
+        disponents = int(has_disponent.sum())
+        owner_clients = self._ids('client', size)
+        disponent_clients = self._ids('client', disponents)
+        owner_districts = np.where(rng.random(size) < profile['same_district_share'], districts,
+                                   self._districts(rng, size))
+        owner_disps = self._ids('disp', size)
+        disponent_disps = self._ids('disp', disponents)
+        disp_accounts = np.concatenate([account_ids, account_ids[has_disponent]])
+
+        # Cards on OWNER dispositions, issued while the account is open
+        has_card = rng.random(size) < self.card_share
+        card_count = int(has_card.sum())
+        issued = opened[has_card] + (rng.random(card_count) * open_days[has_card]).astype(np.int64)
+
+        # At most one loan per account; loans that ran their whole duration are finished
+        has_loan = rng.random(size) < self.loan_share
+        loan_count = int(has_loan.sum())
+        loan_dates = opened[has_loan] + (rng.random(loan_count) * open_days[has_loan]).astype(np.int64)
+        durations = _choice(rng, [int(value) for value in profile['loan_durations']],
+                            list(profile['loan_durations'].values()), loan_count).astype(np.int64)
+        amounts = np.round(rng.lognormal(*profile['loan_amount'], size=loan_count)).astype(np.int64)
+        statuses = self._statuses(rng, loan_dates + durations * 30.4375 <= self.last)
+
+        trans = self._transactions(rng, account_ids, opened, open_days)
+        self._track_dates(opened, issued, loan_dates, trans['newdate'])
+        self.rows['account'] += size
+        if size:
+            self.max_dates['account'] = max(self.max_dates['account'] or 0, int(opened.max()))
+        if card_count:
+            self.max_dates['card'] = max(self.max_dates['card'] or 0, int(issued.max()))
+
+        return {
+            'account': {'account_id': account_ids, 'district_id': districts,
+                        'frequency': _choice(rng, list(profile['frequencies']),
+                                             list(profile['frequencies'].values()), size),
+                        'newdate': opened, 'client_id': owner_clients, 'client_district_id': owner_districts},
+            'client': {'client_id': np.concatenate([owner_clients, disponent_clients]),
+                       'district_id': np.concatenate([owner_districts, owner_districts[has_disponent]])},
+            'disp': {'disp_id': np.concatenate([owner_disps, disponent_disps]),
+                     'client_id': np.concatenate([owner_clients, disponent_clients]),
+                     'account_id': disp_accounts,
+                     'type': np.array(['OWNER'] * size + ['DISPONENT'] * disponents, dtype=object)},
+            'card': {'card_id': self._ids('card', card_count), 'disp_id': owner_disps[has_card],
+                     'type': _choice(rng, list(profile['card_types']), list(profile['card_types'].values()),
+                                     card_count),
+                     'newissued': issued, 'account_id': account_ids[has_card]},
+            'loan': {'loan_id': self._ids('loan', loan_count), 'account_id': account_ids[has_loan],
+                     'newdate': loan_dates, 'amount': amounts, 'duration': durations,
+                     'payments': np.round(amounts / durations, 2), 'status': statuses,
+                     'description': np.array([self.descriptions[status] for status in statuses], dtype=object)},
+            'trans': trans,
+        }
+
+    def _transactions(self, rng, account_ids, opened, open_days):
+        """Transactions of a batch of accounts, ordered by account and date, with running balances"""
+        counts = rng.poisson(self.trans_per_account * open_days / self.mean_open_days)
+        total = int(counts.sum())
+        owner = np.repeat(np.arange(len(account_ids)), counts)
+        dates = opened[owner] + (rng.random(total) * open_days[owner]).astype(np.int64)
+        order = np.lexsort((dates, owner))
+        dates = dates[order]
+
+        kinds = rng.choice(len(self.kind_shares), size=total, p=self.kind_shares)
+        amounts = np.round(np.exp(rng.normal(self.kind_mu[kinds], self.kind_sigma[kinds])), 2)
+        running = np.cumsum(np.where(self.kind_credit[kinds], amounts, -amounts))
+        starts = _group_starts(counts)
+        before = np.concatenate([[0.0], running])[starts]
+        walk = running - np.repeat(before, counts)
+        # Opening deposits keep every account's balance from going below zero
+        lowest = np.zeros(len(account_ids))
+        nonempty = counts > 0
+        if total:
+            lowest[nonempty] = np.minimum.reduceat(walk, starts[nonempty])
+        opening = np.round(rng.lognormal(*self.profile['opening_balance'], size=len(account_ids)), 2)
+        opening += np.maximum(0.0, -lowest)
+
+        partner = self.kind_partner[kinds]
+        partner_accounts = np.where(partner, rng.integers(10 ** 7, 10 ** 8, size=total), 0)
+        return {
+            'trans_id': self._ids('trans', total),
+            'account_id': account_ids[owner],
+            'newdate': dates,
+            'type': self.kind_text['type'][kinds],
+            'operation': self.kind_text['operation'][kinds],
+            'amount': np.where(self.kind_negative[kinds], -amounts, amounts),
+            'balance': np.round(walk + np.repeat(opening, counts), 2),
+            'k_symbol': self.kind_text['k_symbol'][kinds],
+            'bank': np.where(partner, _choice(rng, self.profile['banks'], [1] * len(self.profile['banks']), total),
+                             None),
+            'account': np.where(partner, partner_accounts.astype(object), None),
+        }
+
+    def batches(self):
+        for index, start in enumerate(range(0, self.accounts, self.batch_accounts)):
+            yield self._batch(index, min(self.batch_accounts, self.accounts - start))
+
+    def high_water(self):
+        """High-water marks of the generated data, keyed like the ETL's etl_watermark entries"""
+        def day(ordinal):
+            return str(date.fromordinal(ordinal)) if ordinal else None
+        return {'trans.trans_id': self.next_ids['trans'] - 1 or None,
+                'loan.loan_id': self.next_ids['loan'] - 1 or None,
+                'account.newdate': day(self.max_dates['account']),
+                'card.newissued': day(self.max_dates['card'])}
+
+
+def _iso_dates(ordinals):
+    """'YYYY-MM-DD' strings of day ordinals (vectorized)"""
+    return (np.asarray(ordinals, dtype=np.int64) - EPOCH_ORDINAL).astype('datetime64[D]').astype(str)
+
+
+def _arrow_array(name, values):
+    """Arrow array of a generated column (day ordinals become date32)"""
+    values = np.asarray(values)
+    arrow_type = ARROW_TYPES.get(name, pa.int64() if name in _INTEGER_COLUMNS else pa.string())
+    if arrow_type == pa.date32():
+        return pa.array((values.astype(np.int64) - EPOCH_ORDINAL).astype(np.int32), type=arrow_type)
+    return pa.array(values.tolist() if values.dtype == object else values, type=arrow_type)
+
+
+class MySQLSink:
+    """Bulk inserts into a separate source schema (created from SOURCE_SCHEMA_SQL_PATH)"""
+
+    def __init__(self, conn, database, backend='multirow', batch_rows=5000):
+        self.conn = conn
+        self.database = database
+        self.loader = get_bulk_loader(backend, batch_rows=batch_rows)
+
+    def create_schema(self):
+        """(Re)create the source tables in the target schema"""
+        with open(SOURCE_SCHEMA_SQL_PATH, 'r') as file:
+            statements = [statement.strip() for statement in file.read().split(';') if statement.strip()]
+        with self.conn.cursor() as cursor:
+            cursor.execute(f"CREATE DATABASE IF NOT EXISTS `{self.database}`")
+            cursor.execute(f"USE `{self.database}`")
+            for table in reversed(list(SOURCE_COLUMNS)):
+                cursor.execute(f"DROP TABLE IF EXISTS {table}")
+            for statement in statements:
+                cursor.execute(statement)
+        self.conn.commit()
+
+    def _insert(self, table, rows):
+        self.loader.load(self.conn, table, SOURCE_COLUMNS[table], rows)
+
+    def write_reference(self, tables):
+        self.create_schema()
+        for table, rows in tables.items():
+            self._insert(table, rows)
+        self.conn.commit()
+
+    def write_batch(self, batch):
+        for table in ('account', 'client', 'disp', 'card', 'loan', 'trans'):
+            columns = batch[table]
+            values = [_iso_dates(columns[name]) if name in ('newdate', 'newissued') else columns[name]
+                      for name in SOURCE_COLUMNS[table]]
+            self._insert(table, zip(*[column.tolist() for column in values]))
+        self.conn.commit()
+
+    def finish(self, source):
+        logger.info(f"Synthetic source written to schema {self.database} "
+                    f"(run the ETL with --source-database {self.database})")
+        return self.database
+
+
+class SnapshotSink:
+    """The extracts of a full ETL run as a source snapshot directory (see snapshot.py)"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.writers = {}
+        self.started = time.perf_counter()
+
+    def _path(self, name):
+        return os.path.join(self.directory, f"{name}.parquet")
+
+    def _write(self, name, names, arrays):
+        if name not in self.writers:
+            schema = pa.schema([pa.field(column, array.type) for column, array in zip(names, arrays)])
+            self.writers[name] = pq.ParquetWriter(self._path(name) + '.tmp', schema, compression=COMPRESSION)
+        writer = self.writers[name]
+        writer.write_batch(pa.record_batch(arrays, schema=writer.schema))
+
+    def write_reference(self, tables):
+        os.makedirs(self.directory, exist_ok=True)
+        # A rewritten directory is incomplete until its new manifest exists
+        if os.path.exists(os.path.join(self.directory, MANIFEST_FILE)):
+            os.remove(os.path.join(self.directory, MANIFEST_FILE))
+        names = SOURCE_COLUMNS['district']
+        columns = zip(*tables['district'])
+        self._write('district', names, [_arrow_array(name, np.array(values, dtype=object))
+                                        for name, values in zip(names, columns)])
+
+    def write_batch(self, batch):
+        for name, columns in SNAPSHOT_COLUMNS.items():
+            names = [column for _, column in columns]
+            self._write(name, names, [_arrow_array(column, batch[table][column]) for table, column in columns])
+
+    def finish(self, source):
+        first, last = source.date_range
+        self._write('date_range', ('first_date', 'last_date'),
+                    [_arrow_array('first_date', [first or source.first]),
+                     _arrow_array('last_date', [last or source.last])])
+        files = {}
+        for name, writer in self.writers.items():
+            writer.close()
+            os.replace(self._path(name) + '.tmp', self._path(name))
+            files[name] = {'rows': pq.ParquetFile(self._path(name)).metadata.num_rows,
+                           'bytes': os.path.getsize(self._path(name)), 'seconds': 0.0}
+        manifest = {
+            'created_at': datetime.now().isoformat(timespec='seconds'),
+            'state': {'mode': 'full', 'low_water': None, 'high_water': source.high_water()},
+            'files': files,
+            'synthetic': {'scale': source.scale, 'seed': source.seed, 'rows': source.rows,
+                          'seconds': time.perf_counter() - self.started},
+        }
+        tmp_path = os.path.join(self.directory, MANIFEST_FILE + '.tmp')
+        with open(tmp_path, 'w') as file:
+            json.dump(manifest, file, indent=2, default=str)
+        os.replace(tmp_path, os.path.join(self.directory, MANIFEST_FILE))
+        logger.info(f"Synthetic source snapshot written to {self.directory} "
+                    f"(run the ETL with --from-snapshot {self.directory})")
+        return self.directory
+
+
+def generate_source(source, sink):
+    """Stream every table of a SyntheticSource into a sink; returns the generated row counts"""
+    start = time.perf_counter()
+    sink.write_reference(source.reference_tables())
+    for batch in source.batches():
+        sink.write_batch(batch)
+        logger.info(f"Generated {source.rows['account']:,}/{source.accounts:,} accounts, "
+                    f"{source.rows['trans']:,} transactions ({time.perf_counter() - start:.1f}s)")
+    sink.finish(source)
+    logger.info(f"Synthetic source x{source.scale:g}: " +
+                ", ".join(f"{table} {rows:,}" for table, rows in source.rows.items()) +
+                f" in {time.perf_counter() - start:.1f}s")
+    return dict(source.rows)
+
+
+if __name__ == "__main__":
+    """Generate a scaled synthetic source into MySQL or a Parquet snapshot"""
+    import argparse
+    import pymysql
+    from etl_pipeline_clean import SOURCE_DB_CONFIG
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Synthetic Berka-style source generator")
+    parser.add_argument('--scale', type=float, default=1.0,
+                        help="Size relative to the profile's row counts (default: %(default)s)")
+    parser.add_argument('--seed', type=int, default=0, help="Random seed (default: %(default)s)")
+    parser.add_argument('--target', choices=['mysql', 'parquet'], default='mysql',
+                        help="mysql: bulk inserts into --database on the source server; parquet: a source "
+                             "snapshot in --output for etl_pipeline_clean.py --from-snapshot (default: %(default)s)")
+    parser.add_argument('--database', default=DEFAULT_DATABASE,
+                        help="Schema on the source server to (re)create (default: %(default)s)")
+    parser.add_argument('--output', default=None, help="Snapshot directory for --target parquet")
+    parser.add_argument('--profile', default=None, help="Generator profile JSON (default: built-in Berka profile)")
+    parser.add_argument('--fit', metavar='PATH', default=None,
+                        help="Fit a profile to the real source database, write it to PATH and exit")
+    parser.add_argument('--batch-accounts', type=int, default=2000,
+                        help="Accounts generated and written per batch (default: %(default)s)")
+    parser.add_argument('--bulk-backend', choices=['executemany', 'multirow', 'load_data'], default='multirow',
+                        help="Insert backend for --target mysql (default: %(default)s)")
+    parser.add_argument('--summary', default=None, help="Also write the generated row counts as JSON here")
+    args = parser.parse_args()
+
+    config = SOURCE_DB_CONFIG.copy()
+    config['ssl_disabled'] = True
+    if args.fit:
+        conn = pymysql.connect(**config)
+        try:
+            save_profile(profile_source(conn), args.fit)
+        finally:
+            conn.close()
+        raise SystemExit(0)
+
+    source = SyntheticSource(load_profile(args.profile), args.scale, args.seed, args.batch_accounts)
+    conn = None
+    if args.target == 'parquet':
+        if not args.output:
+            parser.error("--target parquet needs --output")
+        sink = SnapshotSink(args.output)
+    else:
+        if args.database == SOURCE_DB_CONFIG['database']:
+            parser.error(f"Refusing to overwrite the real source schema {args.database}")
+        config.pop('database')
+        config['autocommit'] = False
+        config['local_infile'] = args.bulk_backend == 'load_data'
+        conn = pymysql.connect(**config)
+        sink = MySQLSink(conn, args.database, args.bulk_backend)
+
+    try:
+        rows = generate_source(source, sink)
+    finally:
+        if conn:
+            conn.close()
+    if args.summary:
+        with open(args.summary, 'w') as file:
+            json.dump({'scale': args.scale, 'seed': args.seed, 'target': args.target, 'rows': rows}, file, indent=2)
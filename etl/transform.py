@@ -0,0 +1,257 @@
+"""
+Vectorized Fact Transforms
+==========================
+Columnar versions of the per-row transform loops in etl_pipeline_clean.py. A whole
+extracted chunk is transposed into NumPy column arrays and null defaulting, type
+coercion, surrogate key mapping (through LookupCache arrays) and orphan filtering
+are applied column by column; pandas is only used to parse unusual date/number
+formats. The result is returned as plain Python tuples in
+warehouse column order, so it feeds the bulk loaders directly.
+
+The output matches _transform_trans_rows / _transform_loan_rows row for row. The
+pipeline only hands these columnar chunks (snapshot replays): transposing a list
+of row tuples costs more than the vectorized transform saves, so tuple chunks
+keep the per-row loops. Run this file directly for a rows/sec comparison.
+"""
+
+import time
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+# date(1970, 1, 1).toordinal(): converts datetime64[D] day numbers to Python ordinals
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+TRANS_SOURCE_COLUMNS = ['trans_id', 'account_id', 'newdate', 'type', 'operation',
+                        'amount', 'balance', 'k_symbol', 'account']
+LOAN_SOURCE_COLUMNS = ['loan_id', 'account_id', 'newdate', 'amount', 'duration',
+                       'payments', 'status', 'description']
+
+
+def to_ordinals(values):
+    """Day ordinals for a column of dates, datetime64 values or 'YYYY-MM-DD' / 'YYYYMMDD' strings (-1 if unparseable)"""
+    if np.issubdtype(values.dtype, np.datetime64):
+        days = values.astype('datetime64[D]')
+        return np.where(np.isnat(days), -1, days.astype(np.int64) + EPOCH_ORDINAL)
+    
+    try:
+        # Fast path: every value is a date object
+        return np.fromiter((value.toordinal() for value in values), dtype=np.int64, count=len(values))
+    except (AttributeError, TypeError):
+        pass
+    
+    series = pd.Series(values, dtype=object)
+    present = series.notna()
+    text = series[present].astype(str)
+    if text.str.fullmatch(r'\d{4}-\d{2}-\d{2}').all():
+        # Well-formed ISO strings (and None -> NaT) convert natively; numpy would read
+        # other text such as 'YYYYMMDD' as a year instead of rejecting it
+        days = np.array(values, dtype='datetime64[D]')
+        return np.where(np.isnat(days), -1, days.astype(np.int64) + EPOCH_ORDINAL)
+    
+    # Parsed like lookup_cache.to_ordinal: 8 digits are YYYYMMDD, anything else is
+    # read as YYYY-MM-DD from its first 10 characters
+    compact = text.str.fullmatch(r'\d{8}')
+    parsed = pd.Series(pd.NaT, index=series.index, dtype='datetime64[ns]')
+    parsed[compact[compact].index] = pd.to_datetime(text[compact], format='%Y%m%d', errors='coerce')
+    parsed[compact[~compact].index] = pd.to_datetime(text[~compact].str[:10], format='%Y-%m-%d', errors='coerce')
+    days = parsed.values.astype('datetime64[D]').astype(np.int64) + EPOCH_ORDINAL
+    return np.where(parsed.isna().values, -1, days)
+
+
+def _truthy(values):
+    """Python truthiness of each value (None, NaN, '', 0 and 0.0 are falsy)"""
+    if values.dtype.kind in 'iub':
+        return values != 0
+    if values.dtype.kind == 'f':
+        return (values != 0) & ~np.isnan(values)
+    return ~(pd.isna(values) | (values == '') | (values == 0))
+
+
+def _float_or_zero(values):
+    """float(x) if x else 0.0"""
+    try:
+        # None becomes NaN; falsy values are 0.0 either way
+        return np.nan_to_num(values.astype(np.float64), nan=0.0)
+    except (ValueError, TypeError):
+        floats = pd.to_numeric(pd.Series(values, dtype=object), errors='coerce').to_numpy(dtype=np.float64)
+        return np.where(_truthy(values), np.nan_to_num(floats, nan=0.0), 0.0)
+
+
+def _int_or_zero(values):
+    """int(x) if x else 0; values that int() rejects become 0"""
+    if values.dtype.kind in 'iub':
+        return values.astype(np.int64)
+    result = np.zeros(len(values), dtype=np.int64)
+    positions = np.flatnonzero(_truthy(values))
+    try:
+        result[positions] = values[positions].astype(np.float64 if values.dtype.kind == 'f' else np.int64)
+        return result
+    except (ValueError, TypeError, OverflowError):
+        pass
+    
+    # Mixed text: parse the values that are plain (optionally signed) integer text
+    text = np.char.strip(values[positions].astype(str))
+    digits = np.where(np.char.startswith(text, '-') | np.char.startswith(text, '+'),
+                      np.char.lstrip(text, '+-'), text)
+    is_integer = np.char.isdigit(digits) & (np.char.str_len(text) - np.char.str_len(digits) <= 1)
+    result[positions[is_integer]] = text[is_integer].astype(np.int64)
+    return result
+
+
+def _text_or_default(values, default):
+    """x if x else default"""
+    return np.where(_truthy(values), values, default).astype(object)
+
+
+def _columns(chunk, names):
+    """
+    One array per source column. Row tuples from the extractor become object arrays;
+    a DataFrame chunk (e.g. read from a columnar snapshot) keeps its typed columns.
+    """
+    if isinstance(chunk, pd.DataFrame):
+        return [chunk[name].to_numpy() for name in names]
+    table = pd.DataFrame(chunk, columns=names, dtype=object).to_numpy()
+    return [table[:, i] for i in range(len(names))]
+
+
+def _map_keys(account_ids, dates, lookup):
+    """Surrogate keys for a chunk; keep marks rows whose account is in DimClientAccount"""
+    try:
+        account_ids = account_ids.astype(np.int64)
+    except (ValueError, TypeError):
+        account_ids = pd.to_numeric(pd.Series(account_ids), errors='coerce').fillna(-1).to_numpy(dtype=np.int64)
+    client_account_ids = lookup.map_accounts(account_ids)
+    keep = client_account_ids > 0
+    date_ids = lookup.map_dates(to_ordinals(dates[keep]))
+    return keep, client_account_ids[keep], date_ids
+
+
+def _to_records(columns):
+    """Plain Python tuples (native int/float/str/None) in warehouse column order"""
+    return list(zip(*[column.tolist() for column in columns]))
+
+
+def transform_trans_chunk(transactions, lookup):
+    """Vectorized equivalent of _transform_trans_rows"""
+    if len(transactions) == 0:
+        return []
+    (trans_id, account_id, trans_date, trans_type, operation,
+     amount, balance, k_symbol, account) = _columns(transactions, TRANS_SOURCE_COLUMNS)
+    
+    keep, client_account_ids, date_ids = _map_keys(account_id, trans_date, lookup)
+    operation = operation[keep].astype(object)
+    
+    return _to_records([
+        trans_id[keep], client_account_ids, date_ids, lookup.map_years(date_ids),
+        _int_or_zero(account[keep]),
+        _text_or_default(trans_type[keep], 'UNKNOWN'),
+        np.where(_truthy(operation) & (operation != 'UNKNOWN'), operation, None),
+        _text_or_default(k_symbol[keep], ''),
+        _float_or_zero(amount[keep]),
+        _float_or_zero(balance[keep]),
+    ])
+
+
+def transform_loan_chunk(loans, lookup):
+    """Vectorized equivalent of _transform_loan_rows"""
+    if len(loans) == 0:
+        return []
+    (loan_id, account_id, loan_date, amount, duration,
+     payments, status, description) = _columns(loans, LOAN_SOURCE_COLUMNS)
+    
+    keep, client_account_ids, date_ids = _map_keys(account_id, loan_date, lookup)
+    
+    return _to_records([
+        loan_id[keep], client_account_ids, date_ids, lookup.map_years(date_ids),
+        _text_or_default(status[keep], 'U'),
+        _int_or_zero(amount[keep]),
+        _int_or_zero(duration[keep]),
+        _float_or_zero(payments[keep]),
+        description[keep],
+    ])
+
+
+def _synthetic_trans(row_count, account_count, first_day, day_count, seed):
+    """Trans-shaped source tuples with the nulls and messy values the loaders have to handle"""
+    from decimal import Decimal
+
+    rng = np.random.default_rng(seed)
+    operations = ['Credit in Cash', 'Withdrawal in Cash', 'Remittance to Another Bank', 'UNKNOWN', None, '']
+    rows = []
+    for i in range(row_count):
+        account_id = int(rng.integers(1, account_count + 200))
+        day = date.fromordinal(first_day + int(rng.integers(0, day_count)))
+        rows.append((
+            i + 1, account_id, day,
+            'Credit' if i % 3 else None,
+            operations[i % len(operations)],
+            Decimal(str(round(float(rng.uniform(0, 50000)), 2))) if i % 17 else None,
+            Decimal(str(round(float(rng.uniform(0, 200000)), 2))),
+            'Household' if i % 4 else '',
+            str(int(rng.integers(0, 99999999))) if i % 5 else ('' if i % 2 else 'n/a'),
+        ))
+    return rows
+
+
+def benchmark_transforms(row_count=500000, seed=7):
+    """
+    Rows/sec of the per-row transform loop vs the vectorized transform on the same
+    synthetic chunk, once as row tuples (what pymysql cursors return) and once as a
+    typed columnar chunk (what a columnar snapshot read returns).
+    """
+    from lookup_cache import LookupCache
+    from etl_pipeline_clean import _transform_trans_rows
+
+    account_count, day_count = 4500, 2191
+    first_day = date(1993, 1, 1).toordinal()
+
+    lookup = LookupCache()
+    lookup.account_keys = np.zeros(account_count + 1, dtype=np.int32)
+    lookup.account_keys[1:] = np.arange(1, account_count + 1)
+    lookup.date_first = first_day
+    lookup.date_last = first_day + day_count - 1
+
+    rows = _synthetic_trans(row_count, account_count, first_day, day_count, seed)
+    columnar = pd.DataFrame(rows, columns=TRANS_SOURCE_COLUMNS, dtype=object)
+    columnar = columnar.astype({'trans_id': np.int64, 'account_id': np.int64})
+    columnar['newdate'] = pd.to_datetime(columnar['newdate'])
+    columnar['amount'] = pd.to_numeric(columnar['amount']).astype(np.float64)
+    columnar['balance'] = pd.to_numeric(columnar['balance']).astype(np.float64)
+
+    def timed(func, chunk):
+        start = time.perf_counter()
+        output = func(chunk, lookup)
+        return output, time.perf_counter() - start
+
+    per_row, per_row_seconds = timed(_transform_trans_rows, rows)
+    vectorized_rows, vectorized_rows_seconds = timed(transform_trans_chunk, rows)
+    vectorized_columnar, vectorized_columnar_seconds = timed(transform_trans_chunk, columnar)
+
+    results = {
+        'rows': row_count,
+        'per_row_rows_per_sec': row_count / per_row_seconds,
+        'vectorized_tuples_rows_per_sec': row_count / vectorized_rows_seconds,
+        'vectorized_columnar_rows_per_sec': row_count / vectorized_columnar_seconds,
+        'outputs_identical': per_row == vectorized_rows == vectorized_columnar,
+    }
+
+    print(f"{'Transform':<26} {'Rows':>10} {'Seconds':>10} {'Rows/s':>14}")
+    print("-" * 64)
+    for label, seconds in [('per-row loop (tuples)', per_row_seconds),
+                           ('vectorized (tuples)', vectorized_rows_seconds),
+                           ('vectorized (columnar)', vectorized_columnar_seconds)]:
+        print(f"{label:<26} {row_count:>10,} {seconds:>10.2f} {row_count / seconds:>14,.0f}")
+    print(f"Outputs identical: {results['outputs_identical']} ({len(per_row):,} rows after orphan filtering)")
+    return results
+
+
+if __name__ == "__main__":
+    """Microbenchmark of the transform stage (no database needed)"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Per-row vs vectorized transform benchmark")
+    parser.add_argument('--rows', type=int, default=500000, help="Synthetic rows to transform")
+    args = parser.parse_args()
+    benchmark_transforms(row_count=args.rows)
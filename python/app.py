@@ -70,13 +70,12 @@ if report_category == "Loan Amount Trend":
     if filter_option == "All Years":
         # Show yearly average loan data
         query = """
-        SELECT d.year,
-               ROUND(AVG(fl.amount),2) AS avg_loan,
-               COUNT(*) AS loan_count
-        FROM FactLoan fl
-        JOIN DimDate d ON fl.date_id = d.date_id
-        GROUP BY d.year
-        ORDER BY d.year;
+        SELECT year,
+               ROUND(SUM(amount_sum) / SUM(loan_count), 2) AS avg_loan,
+               SUM(loan_count) AS loan_count
+        FROM AggLoanMonthly
+        GROUP BY year
+        ORDER BY year;
         """
         data = fetch_data(query)
         st.subheader("Average Loan Amount by Year")
@@ -109,14 +108,12 @@ if report_category == "Loan Amount Trend":
         # Drill down into specific year by month
         selected_year = int(filter_option)
         query = f"""
-        SELECT d.month,
-               ROUND(AVG(fl.amount), 2) AS avg_loan,
-               COUNT(*) AS loan_count
-        FROM FactLoan fl
-        JOIN DimDate d ON fl.date_id = d.date_id
-        WHERE d.year = {selected_year}
-        GROUP BY d.month
-        ORDER BY d.month;
+        SELECT month,
+               ROUND(amount_sum / loan_count, 2) AS avg_loan,
+               loan_count
+        FROM AggLoanMonthly
+        WHERE year = {selected_year}
+        ORDER BY month;
         """
         data = fetch_data(query)
         st.subheader(f"Average Loan Amount by Month for {selected_year}")
@@ -172,13 +169,11 @@ elif report_category == "Location Net Cash Flow":
     else:
         # Query to get net cash flow by district for selected region
         query = f"""
-        SELECT dist.district_name,
-               ROUND(SUM(ft.amount), 2) AS net_cash
-        FROM FactTrans ft
-        JOIN DimClientAccount ca ON ft.clientAcc_id = ca.clientAcc_id
-        JOIN DimDistrict dist ON ca.distAcc_id = dist.district_id
-        WHERE dist.region = '{filter_option}'
-        GROUP BY dist.district_name
+        SELECT district_name,
+               ROUND(SUM(amount_sum), 2) AS net_cash
+        FROM AggNetCashDistrict
+        WHERE region = '{filter_option}'
+        GROUP BY district_name
         ORDER BY net_cash DESC;
         """
         
@@ -225,20 +220,18 @@ elif report_category == "Number of Payments and Total Amount":
         # Build dynamic query based on filters
         query = """
         SELECT 
-            dd.year,
-            dc.type,
-            ROUND(SUM(fl.payments) / 1000, 2) AS total_payments_thousands
-        FROM DimDate dd
-        JOIN FactLoan fl ON dd.date_id = fl.date_id
-        JOIN DimCard dc ON dd.date_id = dc.date_id
+            year,
+            card_type AS type,
+            ROUND(SUM(payments_sum) / 1000, 2) AS total_payments_thousands
+        FROM AggPaymentsYearCard
         """
         
         # Add WHERE clause based on filters
         conditions = []
         if filter_option != "All Years":
-            conditions.append(f"dd.year = {filter_option}")
+            conditions.append(f"year = {filter_option}")
         if filter_option2 != "All Cards":
-            conditions.append(f"dc.type = '{filter_option2}'")
+            conditions.append(f"card_type = '{filter_option2}'")
         
         if conditions:
             query += " WHERE " + " AND ".join(conditions)
@@ -246,9 +239,9 @@ elif report_category == "Number of Payments and Total Amount":
         # Add GROUP BY based on what's being filtered
         group_by_fields = []
         if filter_option == "All Years":
-            group_by_fields.append("dd.year")
+            group_by_fields.append("year")
         if filter_option2 == "All Cards":
-            group_by_fields.append("dc.type")
+            group_by_fields.append("card_type")
         
         if group_by_fields:
             query += " GROUP BY " + ", ".join(group_by_fields)
@@ -318,18 +311,16 @@ elif report_category == "Loan Status and Loan Volume by Region":
     # Query to get loan status breakdown by region
     query = """
     SELECT 
-        dd.region,
-        SUM(CASE WHEN fl.status = 'A' THEN 1 ELSE 0 END) AS finished_no_problems,
-        SUM(CASE WHEN fl.status = 'B' THEN 1 ELSE 0 END) AS finished_pending_payments,
-        SUM(CASE WHEN fl.status = 'C' THEN 1 ELSE 0 END) AS active_ok,
-        SUM(CASE WHEN fl.status = 'D' THEN 1 ELSE 0 END) AS active_in_debt,
-        SUM(CASE WHEN fl.status IN ('A', 'B') THEN 1 ELSE 0 END) AS total_completed,
-        SUM(CASE WHEN fl.status IN ('C', 'D') THEN 1 ELSE 0 END) AS total_ongoing,
-        COUNT(fl.loan_id) AS total_loans
-    FROM FactLoan fl
-    JOIN DimClientAccount dca ON fl.clientAcc_id = dca.clientAcc_id
-    JOIN DimDistrict dd ON dca.distCli_id = dd.district_id
-    GROUP BY dd.region
+        region,
+        SUM(CASE WHEN status = 'A' THEN loan_count ELSE 0 END) AS finished_no_problems,
+        SUM(CASE WHEN status = 'B' THEN loan_count ELSE 0 END) AS finished_pending_payments,
+        SUM(CASE WHEN status = 'C' THEN loan_count ELSE 0 END) AS active_ok,
+        SUM(CASE WHEN status = 'D' THEN loan_count ELSE 0 END) AS active_in_debt,
+        SUM(CASE WHEN status IN ('A', 'B') THEN loan_count ELSE 0 END) AS total_completed,
+        SUM(CASE WHEN status IN ('C', 'D') THEN loan_count ELSE 0 END) AS total_ongoing,
+        SUM(loan_count) AS total_loans
+    FROM AggLoanStatusRegion
+    GROUP BY region
     ORDER BY total_loans DESC;
     """
     
@@ -407,25 +398,23 @@ elif report_category == "Transaction Types and Volume by District":
         st.markdown("### No District Selected")
         st.info("Please select a specific district to view transaction type distribution.")
     else:
-        # Direct aggregation query - works with connection pooling and cloud deployment
+        # Reads the ETL-built summary table (one row per district and operation)
         # Single statement compatible with st.connection() and Streamlit's caching
         query = f"""
         SELECT 
-            dd.district_name,
-            dd.region,
-            SUM(CASE WHEN ft.operation = 'Credit in Cash' THEN 1 ELSE 0 END) AS credit_in_cash,
-            SUM(CASE WHEN ft.operation = 'Collection from Another Bank' THEN 1 ELSE 0 END) AS collection_from_bank,
-            SUM(CASE WHEN ft.operation = 'Withdrawal in Cash' THEN 1 ELSE 0 END) AS withdrawal_in_cash,
-            SUM(CASE WHEN ft.operation = 'Remittance to Another Bank' THEN 1 ELSE 0 END) AS remittance_to_bank,
-            SUM(CASE WHEN ft.operation = 'Credit Card Withdrawal' THEN 1 ELSE 0 END) AS credit_card_withdrawal,
-            COUNT(ft.trans_id) AS total_transactions,
-            ROUND(AVG(ft.amount), 2) AS avg_transaction_amount,
-            ROUND(SUM(ft.amount), 2) AS total_money_transferred
-        FROM FactTrans ft
-        JOIN DimClientAccount dca ON ft.clientAcc_id = dca.clientAcc_id
-        JOIN DimDistrict dd ON dca.distCli_id = dd.district_id
-        WHERE dd.district_name = '{filter_option}'
-        GROUP BY dd.district_id, dd.district_name, dd.region;
+            district_name,
+            region,
+            SUM(CASE WHEN operation = 'Credit in Cash' THEN trans_count ELSE 0 END) AS credit_in_cash,
+            SUM(CASE WHEN operation = 'Collection from Another Bank' THEN trans_count ELSE 0 END) AS collection_from_bank,
+            SUM(CASE WHEN operation = 'Withdrawal in Cash' THEN trans_count ELSE 0 END) AS withdrawal_in_cash,
+            SUM(CASE WHEN operation = 'Remittance to Another Bank' THEN trans_count ELSE 0 END) AS remittance_to_bank,
+            SUM(CASE WHEN operation = 'Credit Card Withdrawal' THEN trans_count ELSE 0 END) AS credit_card_withdrawal,
+            SUM(trans_count) AS total_transactions,
+            ROUND(SUM(amount_sum) / SUM(trans_count), 2) AS avg_transaction_amount,
+            ROUND(SUM(amount_sum), 2) AS total_money_transferred
+        FROM AggTransOperationDistrict
+        WHERE district_name = '{filter_option}'
+        GROUP BY district_id, district_name, region;
         """
         
         # Use standard fetch_data - works with st.connection() and cloud deployment
@@ -0,0 +1,441 @@
+#!/usr/bin/env python3
+"""
+Index Advisor
+Runs EXPLAIN FORMAT=JSON on the benchmark query set of tester.py, finds full table
+scans, filesorts and temporary tables, proposes composite and covering index
+candidates for them, measures every candidate with QueryBenchmark and writes a
+ranked report plus a ready-to-apply SQL file.
+
+Candidates are created as INVISIBLE indexes: only the advisor's own session turns
+on the use_invisible_indexes optimizer switch, so the plans of every other session
+stay untouched while a candidate is measured, and each candidate is dropped again
+before the next one is tried.
+"""
+
+import re
+import json
+from typing import List, Dict, Tuple, Optional
+
+from tester import QueryBenchmark, OLAP_QUERIES, OLAP_QUERIES_V2
+
+# Name prefix of the trial indexes (leftovers of an interrupted run are dropped at start)
+CANDIDATE_PREFIX = 'idx_adv_'
+
+# TEXT / BLOB columns can only be indexed by a prefix, which never covers the column
+TEXT_TYPES = {'tinytext', 'text', 'mediumtext', 'longtext', 'tinyblob', 'blob', 'mediumblob', 'longblob'}
+TEXT_PREFIX_LENGTH = 64
+
+# Widest covering index proposed
+MAX_INDEX_COLUMNS = 5
+
+# Access types that read a whole table or index
+FULL_SCAN_ACCESS = {'ALL', 'index'}
+
+SQL_KEYWORDS = {'ON', 'JOIN', 'WHERE', 'GROUP', 'ORDER', 'LEFT', 'RIGHT', 'INNER', 'CROSS',
+                'LIMIT', 'HAVING', 'USING', 'PARTITION', 'STRAIGHT_JOIN'}
+
+
+def split_statements(query: str) -> List[str]:
+    return [statement.strip() for statement in query.split(';') if statement.strip()]
+
+
+def table_aliases(sql: str) -> Dict[str, str]:
+    """alias -> table of every table in the FROM / JOIN clauses of a statement"""
+    aliases = {}
+    for table, alias in re.findall(r'\b(?:FROM|JOIN)\s+(\w+)(?:\s+(?:AS\s+)?(\w+))?', sql, re.IGNORECASE):
+        if not alias or alias.upper() in SQL_KEYWORDS:
+            alias = table
+        aliases[alias] = table
+    return aliases
+
+
+def grouping_columns(sql: str) -> Dict[str, List[str]]:
+    """alias -> columns of the GROUP BY clause, then the ORDER BY clause, in clause order"""
+    columns = {}
+    for clause in ('GROUP BY', 'ORDER BY'):
+        match = re.search(clause + r'\s+(.*?)(?:\bHAVING\b|\bORDER BY\b|\bLIMIT\b|$)', sql,
+                          re.IGNORECASE | re.DOTALL)
+        if not match:
+            continue
+        for alias, column in re.findall(r'\b(\w+)\.(\w+)\b', match.group(1)):
+            if column not in columns.setdefault(alias, []):
+                columns[alias].append(column)
+    return columns
+
+
+def condition_columns(condition: str) -> Tuple[Dict[str, List[str]], Dict[str, List[str]]]:
+    """
+    (alias -> columns compared with a constant, alias -> columns compared with
+    another table's column) in an EXPLAIN attached_condition
+    """
+    # `db`.`alias`.`column` -> `alias`.`column`
+    condition = re.sub(r'`\w+`\.(`\w+`\.`\w+`)', r'\1', condition or '')
+    constants, joins = {}, {}
+    for alias, column in re.findall(r"`(\w+)`\.`(\w+)`\s*=\s*(?='|-?\d)", condition):
+        constants.setdefault(alias, []).append(column)
+    for left_alias, left, right_alias, right in re.findall(r'`(\w+)`\.`(\w+)`\s*=\s*`(\w+)`\.`(\w+)`', condition):
+        joins.setdefault(left_alias, []).append(left)
+        joins.setdefault(right_alias, []).append(right)
+    return constants, joins
+
+
+def walk_plan(node, tables: List[Dict], sorts: List[str]):
+    """Collect the table access nodes and filesort / temporary table steps of a JSON plan"""
+    if isinstance(node, list):
+        for item in node:
+            walk_plan(item, tables, sorts)
+        return
+    if not isinstance(node, dict):
+        return
+    for key, value in node.items():
+        if key == 'table' and isinstance(value, dict) and 'table_name' in value:
+            tables.append(value)
+        if key in ('ordering_operation', 'grouping_operation', 'duplicates_removal') and isinstance(value, dict):
+            if value.get('using_filesort'):
+                sorts.append(f"{key.split('_')[0]} filesort")
+            if value.get('using_temporary_table'):
+                sorts.append(f"{key.split('_')[0]} temporary table")
+        walk_plan(value, tables, sorts)
+
+
+def _unique(items: List[str]) -> List[str]:
+    return list(dict.fromkeys(items))
+
+
+class IndexAdvisor:
+    """Proposes and measures index candidates for the queries of a QueryBenchmark session"""
+
+    def __init__(self, benchmark: QueryBenchmark, queries: List[Tuple[str, str]], iterations: int = 3):
+        self.benchmark = benchmark
+        self.queries = queries
+        self.iterations = iterations
+        self._columns = {}
+        self._indexes = {}
+
+    @property
+    def connection(self):
+        return self.benchmark.connection
+
+    def set_invisible_indexes(self, enabled: bool):
+        """Let only this session's optimizer see the INVISIBLE trial indexes"""
+        with self.connection.cursor() as cursor:
+            cursor.execute(f"SET SESSION optimizer_switch = 'use_invisible_indexes={'on' if enabled else 'off'}'")
+
+    def drop_leftover_candidates(self):
+        """Drop trial indexes an interrupted run left behind"""
+        with self.connection.cursor() as cursor:
+            cursor.execute("""
+                SELECT DISTINCT TABLE_NAME, INDEX_NAME FROM information_schema.STATISTICS
+                WHERE TABLE_SCHEMA = DATABASE() AND INDEX_NAME LIKE %s
+            """, (CANDIDATE_PREFIX + '%',))
+            for table, index in cursor.fetchall():
+                cursor.execute(f"DROP INDEX {index} ON {table}")
+                print(f"Dropped leftover trial index {table}.{index}")
+
+    def column_types(self, table: str) -> Dict[str, str]:
+        if table not in self._columns:
+            with self.connection.cursor() as cursor:
+                cursor.execute("""
+                    SELECT COLUMN_NAME, DATA_TYPE FROM information_schema.COLUMNS
+                    WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s
+                """, (table,))
+                self._columns[table] = {name: data_type.lower() for name, data_type in cursor.fetchall()}
+        return self._columns[table]
+
+    def existing_indexes(self, table: str) -> Dict[str, List[str]]:
+        """index name -> key columns of the table's current indexes"""
+        if table not in self._indexes:
+            with self.connection.cursor() as cursor:
+                cursor.execute("""
+                    SELECT INDEX_NAME, COLUMN_NAME FROM information_schema.STATISTICS
+                    WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s
+                    ORDER BY INDEX_NAME, SEQ_IN_INDEX
+                """, (table,))
+                indexes = {}
+                for index, column in cursor.fetchall():
+                    indexes.setdefault(index, []).append(column)
+                self._indexes[table] = indexes
+        return self._indexes[table]
+
+    def explain_query(self, query: str) -> List[Tuple[str, Dict]]:
+        """
+        (SELECT, JSON plan) of every SELECT in a registered query; temporary tables
+        the query builds are created and dropped around them as in the benchmark
+        """
+        plans = []
+        with self.connection.cursor() as cursor:
+            for statement in split_statements(query):
+                match = re.match(r'CREATE\s+TEMPORARY\s+TABLE\s+\w+\s+AS\s+(SELECT.*)', statement,
+                                 re.IGNORECASE | re.DOTALL)
+                select = match.group(1) if match else statement if statement.upper().startswith('SELECT') else None
+                if select:
+                    cursor.execute(f"EXPLAIN FORMAT=JSON {select}")
+                    plans.append((select, json.loads(cursor.fetchone()[0])))
+                if not statement.upper().startswith('SELECT'):
+                    cursor.execute(statement)
+        return plans
+
+    def analyze(self) -> Tuple[List[Dict], List[Dict]]:
+        """
+        Findings (full scans, filesorts, temporary tables) of every query and the
+        index candidates proposed for them
+        """
+        findings, candidates = [], {}
+        for query_name, query_sql in self.queries:
+            for select, plan in self.explain_query(query_sql):
+                aliases = table_aliases(select)
+                grouping = grouping_columns(select)
+                tables, sorts = [], []
+                walk_plan(plan, tables, sorts)
+                for sort in sorts:
+                    findings.append({"query": query_name, "issue": sort, "table": None})
+
+                constants, joins = {}, {}
+                for node in tables:
+                    node_constants, node_joins = condition_columns(node.get('attached_condition'))
+                    for source, target in ((node_constants, constants), (node_joins, joins)):
+                        for alias, columns in source.items():
+                            target.setdefault(alias, []).extend(columns)
+
+                for node in tables:
+                    alias = node['table_name']
+                    table = aliases.get(alias)
+                    if table is None or node.get('access_type') not in FULL_SCAN_ACCESS:
+                        # Derived / temporary tables, or already read through an index
+                        continue
+                    if node.get('access_type') == 'index' and node.get('using_index'):
+                        continue
+                    findings.append({
+                        "query": query_name,
+                        "issue": "full index scan" if node['access_type'] == 'index' else "full table scan",
+                        "table": table,
+                        "rows": node.get('rows_examined_per_scan'),
+                    })
+                    for columns in self.propose(table, constants.get(alias, []), joins.get(alias, []),
+                                                grouping.get(alias, []), node.get('used_columns', [])):
+                        candidate = candidates.setdefault((table, tuple(columns)), {
+                            "table": table, "columns": columns, "queries": []})
+                        if query_name not in candidate["queries"]:
+                            candidate["queries"].append(query_name)
+        return findings, list(candidates.values())
+
+    def propose(self, table: str, constants: List[str], joins: List[str], grouping: List[str],
+                used: List[str]) -> List[List[str]]:
+        """
+        Key column lists for one scanned table: a composite index on its filter and
+        join columns, and a covering one that adds the grouping and the remaining
+        used columns so the table is never read
+        """
+        types = self.column_types(table)
+        # InnoDB secondary indexes carry the primary key anyway
+        primary = self.existing_indexes(table).get('PRIMARY', [])
+        filters = [column for column in _unique(constants + joins) if column in types]
+        grouped = _unique(filters + [column for column in grouping if column in types])
+        covering = _unique(grouped + [column for column in used if column in types and column not in primary])
+
+        proposals = []
+        if filters:
+            proposals.append(filters)
+        if len(covering) <= MAX_INDEX_COLUMNS and not any(types[column] in TEXT_TYPES for column in covering):
+            proposals.append(covering)
+        elif len(grouped) > len(filters) and not any(types[column] in TEXT_TYPES for column in grouped[len(filters):]):
+            # Too wide to cover: still give the grouping an index order
+            proposals.append(grouped)
+
+        existing = list(self.existing_indexes(table).values())
+        return [columns for columns in map(_unique, proposals)
+                if columns and not any(index[:len(columns)] == columns for index in existing)]
+
+    def index_name(self, table: str, columns: List[str]) -> str:
+        return (CANDIDATE_PREFIX + table.lower() + '_' + '_'.join(column.lower() for column in columns))[:64]
+
+    def key_parts(self, table: str, columns: List[str]) -> str:
+        types = self.column_types(table)
+        return ', '.join(f"{column}({TEXT_PREFIX_LENGTH})" if types[column] in TEXT_TYPES else column
+                         for column in columns)
+
+    def index_bytes(self, table: str, index: str) -> Optional[int]:
+        """On-disk size of an index from the persistent InnoDB statistics"""
+        try:
+            with self.connection.cursor() as cursor:
+                cursor.execute("""
+                    SELECT stat_value * @@innodb_page_size FROM mysql.innodb_index_stats
+                    WHERE database_name = DATABASE() AND table_name = %s AND index_name = %s
+                      AND stat_name = 'size'
+                """, (table, index))
+                row = cursor.fetchone()
+            return int(row[0]) if row else None
+        except Exception:
+            return None
+
+    def time_queries(self, query_names: List[str]) -> Dict[str, float]:
+        """Average EXPLAIN ANALYZE time of the named queries (ms)"""
+        times = {}
+        for query_name, query_sql in self.queries:
+            if query_name in query_names:
+                result = self.benchmark.benchmark_query(query_sql, self.iterations, query_name)
+                if "error" not in result:
+                    times[query_name] = result["avg_time_ms"]
+        return times
+
+    def plans_use(self, index: str, query_names: List[str]) -> List[str]:
+        """The named queries whose plan reads through index"""
+        using = []
+        for query_name, query_sql in self.queries:
+            if query_name not in query_names:
+                continue
+            tables = []
+            for _, plan in self.explain_query(query_sql):
+                walk_plan(plan, tables, [])
+            if any(node.get('key') == index for node in tables):
+                using.append(query_name)
+        return using
+
+    def evaluate(self, candidates: List[Dict], baseline: Dict[str, float]) -> List[Dict]:
+        """Create, measure and drop every candidate; returns the candidates ranked by time saved"""
+        for number, candidate in enumerate(candidates, 1):
+            table, columns = candidate["table"], candidate["columns"]
+            # Every query reading the table may profit, not only the one the candidate was proposed for
+            affected = [name for name, sql in self.queries
+                        if any(found == table for select in split_statements(sql)
+                               for found in table_aliases(select).values())]
+            index = self.index_name(table, columns)
+            candidate.update({"index_name": index, "key_parts": self.key_parts(table, columns)})
+            print(f"\n[{number}/{len(candidates)}] {table} ({candidate['key_parts']})")
+
+            with self.connection.cursor() as cursor:
+                cursor.execute(f"CREATE INDEX {index} ON {table} ({candidate['key_parts']}) INVISIBLE")
+            try:
+                self.set_invisible_indexes(True)
+                candidate["index_bytes"] = self.index_bytes(table, index)
+                candidate["used_by"] = self.plans_use(index, affected)
+                times = self.time_queries(candidate["used_by"])
+            finally:
+                self.set_invisible_indexes(False)
+                with self.connection.cursor() as cursor:
+                    cursor.execute(f"DROP INDEX {index} ON {table}")
+
+            candidate["query_times"] = {
+                name: {"before_ms": baseline[name], "after_ms": times[name],
+                       "gain_pct": (baseline[name] - times[name]) / baseline[name] * 100 if baseline[name] else 0.0}
+                for name in times if name in baseline
+            }
+            candidate["saved_ms"] = sum(result["before_ms"] - result["after_ms"]
+                                        for result in candidate["query_times"].values())
+        return sorted(candidates, key=lambda candidate: candidate["saved_ms"], reverse=True)
+
+    def run(self) -> Dict:
+        """Analyze the queries, measure every candidate and return the report"""
+        self.drop_leftover_candidates()
+        self.set_invisible_indexes(False)
+        findings, candidates = self.analyze()
+        print(f"\n{len(findings)} findings, {len(candidates)} index candidates")
+
+        print("\nBASELINE")
+        baseline = self.time_queries([name for name, _ in self.queries])
+        ranked = self.evaluate(candidates, baseline)
+        return {"findings": findings, "baseline_ms": baseline, "candidates": ranked}
+
+
+def recommended(report: Dict, min_gain_pct: float) -> List[Dict]:
+    """Candidates the optimizer used that sped some query up by at least min_gain_pct"""
+    return [candidate for candidate in report["candidates"]
+            if candidate["saved_ms"] > 0 and any(result["gain_pct"] >= min_gain_pct
+                                                 for result in candidate["query_times"].values())]
+
+
+def print_report(report: Dict, min_gain_pct: float):
+    """Findings and the ranked candidates"""
+    print("\n" + "=" * 100)
+    print("FINDINGS")
+    print("=" * 100)
+    for finding in report["findings"]:
+        rows = f"  (~{finding['rows']:,} rows)" if finding.get("rows") else ""
+        print(f"{finding['query']:<52} {finding['issue']:<24} {finding['table'] or '':<18}{rows}")
+
+    chosen = {id(candidate) for candidate in recommended(report, min_gain_pct)}
+    print("\n" + "=" * 100)
+    print("INDEX CANDIDATES (ranked by total query time saved)")
+    print("=" * 100)
+    print(f"{'#':>2}  {'Index':<58} {'Saved (ms)':>11} {'Size (MB)':>10}  Used by")
+    print("-" * 100)
+    for rank, candidate in enumerate(report["candidates"], 1):
+        size = f"{candidate['index_bytes'] / 1e6:.2f}" if candidate.get("index_bytes") else "-"
+        marker = "*" if id(candidate) in chosen else " "
+        print(f"{rank:>2}{marker} {candidate['table'] + ' (' + candidate['key_parts'] + ')':<58} "
+              f"{candidate['saved_ms']:>11.2f} {size:>10}  {', '.join(candidate['used_by']) or 'not used'}")
+        for name, result in candidate["query_times"].items():
+            print(f"      {name:<52} {result['before_ms']:>9.2f} -> {result['after_ms']:>9.2f} ms "
+                  f"({result['gain_pct']:+.1f}%)")
+    print(f"\n* recommended: used by the optimizer and at least {min_gain_pct:g}% faster on some query")
+
+
+def write_sql(report: Dict, path: str, min_gain_pct: float) -> int:
+    """
+    Write the recommended candidates as CREATE INDEX statements in indexes.sql format
+    (etl_pipeline_clean.py reads that format for deferred index builds). Each
+    candidate was measured on its own; apply them together and re-run the advisor
+    to confirm. Returns the number of statements written.
+    """
+    candidates = recommended(report, min_gain_pct)
+    lines = ["-- Generated by python/index_advisor.py", ""]
+    for candidate in candidates:
+        name = candidate["index_name"].replace(CANDIDATE_PREFIX, 'idx_', 1)
+        gains = ", ".join(f"{query.split(':')[0]} {result['gain_pct']:+.1f}%"
+                          for query, result in candidate["query_times"].items())
+        lines.append(f"-- {gains} ({candidate['saved_ms']:.2f} ms saved)")
+        lines.append(f"CREATE INDEX {name} ON {candidate['table']}({candidate['key_parts']});")
+        lines.append("")
+    with open(path, 'w') as f:
+        f.write("\n".join(lines))
+    return len(candidates)
+
+
+def main():
+    """Analyze the benchmark queries and measure index candidates on the warehouse"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Index advisor for the OLAP benchmark queries")
+    parser.add_argument('--schema', choices=['auto', '1', '2'], default='auto',
+                        help="Query set: setup_dw.sql (1) or setup_dw_v2.sql (2) (default: detected)")
+    parser.add_argument('--iterations', type=int, default=3, help="Runs per query and candidate (default: %(default)s)")
+    parser.add_argument('--min-gain', type=float, default=10.0,
+                        help="Percent a query must speed up for the candidate to be recommended (default: %(default)s)")
+    parser.add_argument('--report', default='index_advisor_report.json', help="Ranked JSON report (default: %(default)s)")
+    parser.add_argument('--sql', default='index_advisor.sql', help="CREATE INDEX file (default: %(default)s)")
+    parser.add_argument('--analyze-only', action='store_true',
+                        help="Only print the findings and candidates; create no indexes")
+    args = parser.parse_args()
+
+    benchmark = QueryBenchmark()
+    if not benchmark.connect():
+        return
+
+    try:
+        version = benchmark.schema_version() if args.schema == 'auto' else int(args.schema)
+        advisor = IndexAdvisor(benchmark, OLAP_QUERIES_V2 if version == 2 else OLAP_QUERIES, args.iterations)
+        print(f"Schema v{version}")
+
+        if args.analyze_only:
+            findings, candidates = advisor.analyze()
+            print_report({"findings": findings, "candidates": [
+                dict(candidate, key_parts=advisor.key_parts(candidate["table"], candidate["columns"]),
+                     saved_ms=0.0, used_by=[], query_times={}) for candidate in candidates]}, args.min_gain)
+            return
+
+        report = advisor.run()
+        print_report(report, args.min_gain)
+        with open(args.report, 'w') as f:
+            json.dump(report, f, indent=2)
+        written = write_sql(report, args.sql, args.min_gain)
+        print(f"\nReport saved to {args.report}; {written} recommended indexes written to {args.sql}")
+
+    except KeyboardInterrupt:
+        print("\nIndex advisor interrupted by user")
+    except Exception as e:
+        print(f"Index advisor error: {e}")
+    finally:
+        benchmark.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Scale-Out Benchmark
+Runs the ETL and the tester.py OLAP queries against synthetic sources of growing
+size (etl/synthetic_source.py) and reports how load time, throughput, memory and
+query latency scale:
+
+    python python/scale_benchmark.py --scales 1 10 100 --target parquet
+
+For every scale factor the driver generates the source (a separate MySQL schema,
+or a Parquet source snapshot the ETL replays), runs a full ETL load with a run
+report, benchmarks the query set on the loaded warehouse and records the results
+in <output>/scale_results.json. The scaling curves are plotted into
+<output>/scale_curves.png when matplotlib is installed.
+
+Every scale replaces the contents of the warehouse, like any full ETL run.
+"""
+
+import os
+import sys
+import json
+import glob
+import subprocess
+from typing import List, Dict, Optional
+
+from tester import QueryBenchmark, OLAP_QUERIES, OLAP_QUERIES_V2, SCHEMA_TABLES
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+GENERATOR = os.path.join('etl', 'synthetic_source.py')
+ETL_PIPELINE = os.path.join('etl', 'etl_pipeline_clean.py')
+SYNTHETIC_DATABASE = 'financedata_synthetic'
+
+
+def run_step(command: List[str]):
+    """Run one generator / ETL command from the repository root (its SQL paths are relative)"""
+    print(f"\n$ {' '.join(command)}")
+    subprocess.run([sys.executable] + command, cwd=REPO_ROOT, check=True)
+
+
+def newest_report(report_dir: str) -> Dict:
+    """Newest ETL run report (etl/profiler.py) in report_dir"""
+    reports = sorted(glob.glob(os.path.join(report_dir, 'etl_run_*.json')))
+    if not reports:
+        raise FileNotFoundError(f"The ETL wrote no run report into {report_dir}")
+    with open(reports[-1]) as f:
+        return json.load(f)
+
+
+def run_scale(scale: float, output: str, target: str, iterations: int,
+              profile: Optional[str] = None, etl_args: Optional[List[str]] = None) -> Dict:
+    """Generate, load and query one scale factor; returns its result record"""
+    run_dir = os.path.abspath(os.path.join(output, f"x{scale:g}"))
+    os.makedirs(run_dir, exist_ok=True)
+    summary_path = os.path.join(run_dir, 'source_rows.json')
+
+    generate = [GENERATOR, '--scale', str(scale), '--target', target, '--summary', summary_path]
+    if profile:
+        generate += ['--profile', os.path.abspath(profile)]
+    if target == 'parquet':
+        snapshot_dir = os.path.join(run_dir, 'snapshot')
+        generate += ['--output', snapshot_dir]
+        source_args = ['--from-snapshot', snapshot_dir]
+    else:
+        generate += ['--database', SYNTHETIC_DATABASE]
+        source_args = ['--source-database', SYNTHETIC_DATABASE]
+    run_step(generate)
+
+    report_dir = os.path.join(run_dir, 'etl_reports')
+    run_step([ETL_PIPELINE, '--mode', 'full', '--report-dir', report_dir] + source_args + (etl_args or []))
+    report = newest_report(report_dir)
+    with open(summary_path) as f:
+        source_rows = json.load(f)['rows']
+
+    benchmark = QueryBenchmark()
+    if not benchmark.connect():
+        raise ConnectionError("Cannot connect to the warehouse to run the query benchmark")
+    try:
+        queries = OLAP_QUERIES_V2 if benchmark.schema_version() == 2 else OLAP_QUERIES
+        query_results = benchmark.benchmark_multiple_queries(queries, iterations=iterations)
+        table_sizes = benchmark.table_sizes(SCHEMA_TABLES)
+    finally:
+        benchmark.close()
+
+    fact_rows = report['loaders'].get('FactTrans', {}).get('rows_loaded', 0)
+    return {
+        'scale': scale,
+        'source_rows': source_rows,
+        'etl_seconds': report['total_seconds'],
+        'etl_phases': report['phases'],
+        'fact_trans_rows_per_sec': fact_rows / report['total_seconds'] if report['total_seconds'] else 0.0,
+        'etl_peak_rss_bytes': report['peak_rss_bytes'],
+        'table_sizes': table_sizes,
+        'queries': {result['query_name']: result.get('avg_time_ms') for result in query_results},
+    }
+
+
+def print_scaling(results: List[Dict]):
+    """ETL and per-query latency table, one column per scale factor"""
+    scales = [f"x{result['scale']:g}" for result in results]
+    print("\n" + "=" * 80)
+    print("SCALING SUMMARY")
+    print("=" * 80)
+    print(f"{'':<44}" + "".join(f"{scale:>12}" for scale in scales))
+    print(f"{'Source trans rows':<44}" + "".join(f"{r['source_rows']['trans']:>12,}" for r in results))
+    print(f"{'ETL seconds':<44}" + "".join(f"{r['etl_seconds']:>12.1f}" for r in results))
+    print(f"{'FactTrans rows/s (whole run)':<44}" + "".join(f"{r['fact_trans_rows_per_sec']:>12,.0f}" for r in results))
+    print(f"{'ETL peak RSS (MB)':<44}" + "".join(f"{(r['etl_peak_rss_bytes'] or 0) / 1e6:>12.0f}" for r in results))
+    print("-" * 80)
+    for name in results[0]['queries']:
+        cells = [r['queries'].get(name) for r in results]
+        print(f"{name[:43]:<44}" + "".join(f"{cell:>12.1f}" if cell is not None else f"{'ERROR':>12}"
+                                           for cell in cells))
+
+
+def plot_scaling(results: List[Dict], path: str) -> bool:
+    """Log-log scaling curves of ETL time and query latency; False when matplotlib is missing"""
+    try:
+        import matplotlib
+        matplotlib.use('Agg')
+        import matplotlib.pyplot as plt
+    except ImportError:
+        print("matplotlib is not installed - skipping the scaling plot (pip install matplotlib)")
+        return False
+
+    scales = [result['scale'] for result in results]
+    figure, (etl_axis, query_axis) = plt.subplots(1, 2, figsize=(14, 6))
+    etl_axis.plot(scales, [r['etl_seconds'] for r in results], marker='o', label='ETL total')
+    for phase in results[0]['etl_phases']:
+        etl_axis.plot(scales, [r['etl_phases'].get(phase, 0) for r in results], marker='.', linestyle='--',
+                      label=phase)
+    etl_axis.set(title='ETL wall time', xlabel='Scale factor', ylabel='Seconds', xscale='log', yscale='log')
+    etl_axis.legend(fontsize='small')
+
+    for name in results[0]['queries']:
+        query_axis.plot(scales, [r['queries'].get(name) for r in results], marker='o', label=name.split(':')[0])
+    query_axis.set(title='Query latency (EXPLAIN ANALYZE average)', xlabel='Scale factor', ylabel='ms',
+                   xscale='log', yscale='log')
+    query_axis.legend(fontsize='small')
+
+    figure.tight_layout()
+    figure.savefig(path, dpi=120)
+    plt.close(figure)
+    print(f"Scaling curves saved to {path}")
+    return True
+
+
+def main():
+    """Run the scale-out benchmark, or re-plot saved results"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="ETL and OLAP query scaling benchmark on synthetic sources")
+    parser.add_argument('--scales', type=float, nargs='+', default=[1, 10, 100],
+                        help="Scale factors to run, relative to the Berka sizes (default: %(default)s)")
+    parser.add_argument('--target', choices=['mysql', 'parquet'], default='parquet',
+                        help="Load the ETL from a synthetic MySQL schema or a Parquet source snapshot "
+                             "(default: %(default)s)")
+    parser.add_argument('--iterations', type=int, default=3, help="Runs per query (default: %(default)s)")
+    parser.add_argument('--profile', default=None,
+                        help="Generator profile JSON (etl/synthetic_source.py --fit) instead of the built-in one")
+    parser.add_argument('--output', default='scale_runs', help="Results directory (default: %(default)s)")
+    parser.add_argument('--plot-only', action='store_true',
+                        help="Only print and plot the results saved in --output")
+    parser.add_argument('etl_args', nargs=argparse.REMAINDER,
+                        help="Extra etl_pipeline_clean.py options after --, e.g. -- --vectorized --pipelined")
+    args = parser.parse_args()
+    etl_args = [arg for arg in args.etl_args if arg != '--']
+
+    os.makedirs(args.output, exist_ok=True)
+    results_path = os.path.join(args.output, 'scale_results.json')
+    if args.plot_only:
+        with open(results_path) as f:
+            results = json.load(f)
+    else:
+        results = []
+        for scale in sorted(args.scales):
+            print("\n" + "=" * 80)
+            print(f"SCALE x{scale:g}")
+            print("=" * 80)
+            results.append(run_scale(scale, args.output, args.target, args.iterations, args.profile, etl_args))
+            # Saved after every scale, so a failure at a large scale keeps the smaller ones
+            with open(results_path, 'w') as f:
+                json.dump(results, f, indent=2)
+        print(f"\nScaling results saved to {results_path}")
+
+    if results:
+        print_scaling(results)
+        plot_scaling(results, os.path.join(args.output, 'scale_curves.png'))
+
+
+if __name__ == "__main__":
+    main()
@@ -191,6 +191,75 @@ class QueryBenchmark:
         
         return results
     
+    def explain_partitions(self, query: str) -> List[Tuple[str, str]]:
+        """
+        (table, partitions read) of every table in the EXPLAIN plan of a single SELECT;
+        partitions is None for tables that are not partitioned
+        """
+        with self.connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN {query}")
+            columns = [column[0] for column in cursor.description]
+            rows = cursor.fetchall()
+        table, partitions = columns.index('table'), columns.index('partitions')
+        return [(row[table], row[partitions]) for row in rows]
+    
+    def report_partition_pruning(self, queries: List[Tuple[str, str]]):
+        """Print the partitions each query reads from the year-partitioned fact tables"""
+        print("\n" + "=" * 80)
+        print("PARTITION PRUNING (EXPLAIN partitions column)")
+        print("=" * 80)
+        for query_name, query_sql in queries:
+            if 'CREATE TEMPORARY TABLE' in query_sql.upper():
+                continue
+            for table, partitions in self.explain_partitions(query_sql):
+                if partitions is not None:
+                    print(f"{query_name:<45} {table:<6} {partitions}")
+    
+    def schema_version(self) -> int:
+        """2 when the warehouse uses the compact schema (setup_dw_v2.sql), else 1"""
+        with self.connection.cursor() as cursor:
+            cursor.execute("""
+                SELECT COUNT(*) FROM information_schema.TABLES
+                WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'TransTypeJunk'
+            """)
+            return 2 if cursor.fetchone()[0] else 1
+    
+    def facts_denormalized(self) -> bool:
+        """True when the fact tables carry the denormalized dimension columns (--denormalize-facts)"""
+        with self.connection.cursor() as cursor:
+            cursor.execute("""
+                SELECT COUNT(*) FROM information_schema.COLUMNS
+                WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'FactTrans' AND COLUMN_NAME = 'date_month'
+            """)
+            return bool(cursor.fetchone()[0])
+    
+    def table_sizes(self, tables: List[str]) -> Dict[str, Dict]:
+        """
+        Rows, data and index bytes of the given tables (those that exist).
+        Statistics are refreshed first so the sizes reflect the current contents.
+        """
+        with self.connection.cursor() as cursor:
+            cursor.execute("""
+                SELECT TABLE_NAME FROM information_schema.TABLES
+                WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME IN %s
+            """, (tuple(tables),))
+            existing = [row[0] for row in cursor.fetchall()]
+            if not existing:
+                return {}
+            cursor.execute(f"ANALYZE TABLE {', '.join(existing)}")
+            cursor.fetchall()
+            cursor.execute("SET SESSION information_schema_stats_expiry = 0")
+            cursor.execute("""
+                SELECT TABLE_NAME, TABLE_ROWS, DATA_LENGTH, INDEX_LENGTH, AVG_ROW_LENGTH
+                FROM information_schema.TABLES
+                WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME IN %s
+            """, (tuple(existing),))
+            return {
+                name: {"rows": rows, "data_bytes": data, "index_bytes": index,
+                       "total_bytes": data + index, "avg_row_bytes": avg_row}
+                for name, rows, data, index, avg_row in cursor.fetchall()
+            }
+    
     def save_results(self, results: List[Dict], filename: str = "benchmark_results.json"):
         """Save benchmark results to JSON file"""
         try:
@@ -200,158 +269,489 @@ class QueryBenchmark:
         except Exception as e:
             print(f"Error saving results: {e}")
 
-def main():
-    """Example usage with your OLAP queries"""
-    
-    # Your complete OLAP queries for benchmarking
-    queries = [
-        ("Query 1: Loan Rollup by Year", """
-            SELECT d.year,
-                   ROUND(AVG(fl.amount),2) AS avg_loan,
-                   COUNT(*) AS loan_count
-            FROM FactLoan fl
-            JOIN DimDate d ON fl.date_id = d.date_id
-            GROUP BY d.year
-            ORDER BY d.year;
-        """),
-        
-        ("Query 2: Loan Drilldown by Month", """
-            SELECT d.month,
-                   ROUND(AVG(fl.amount),2) AS avg_loan,
-                   COUNT(*) AS loan_count
-            FROM FactLoan fl
-            JOIN DimDate d ON fl.date_id = d.date_id
-            WHERE d.year = 1995
-            GROUP BY d.month
-            ORDER BY d.month;
-        """),
-        
-        ("Query 3: Regional Cash Flow", """
-            SELECT dist.region AS region_name,
-                   ROUND(SUM(ft.amount),2) AS net_cash
-            FROM FactTrans ft
-            JOIN DimClientAccount ca ON ft.clientAcc_id = ca.clientAcc_id
-            JOIN DimDistrict dist ON ca.distAcc_id = dist.district_id
-            GROUP BY dist.region
-            ORDER BY net_cash DESC;
-        """),
-        
-        ("Query 4: Regional Drilldown - East Bohemia", """
-            SELECT dist.district_name,
-                   ROUND(SUM(ft.amount),2) AS net_cash
-            FROM FactTrans ft
-            JOIN DimClientAccount ca ON ft.clientAcc_id = ca.clientAcc_id
-            JOIN DimDistrict dist ON ca.distAcc_id = dist.district_id
-            WHERE dist.region = 'east Bohemia'
-            GROUP BY dist.district_name
-            ORDER BY net_cash DESC;
-        """),
-        
-        ("Query 5: Loan Status Pivot by Region", """
-            SELECT 
-                dd.region,
-                SUM(CASE WHEN fl.status = 'A' THEN 1 ELSE 0 END) AS finished_no_problems,
-                SUM(CASE WHEN fl.status = 'B' THEN 1 ELSE 0 END) AS finished_pending_payments,
-                SUM(CASE WHEN fl.status = 'C' THEN 1 ELSE 0 END) AS active_ok,
-                SUM(CASE WHEN fl.status = 'D' THEN 1 ELSE 0 END) AS active_in_debt,
-                SUM(CASE WHEN fl.status IN ('A', 'B') THEN 1 ELSE 0 END) AS total_completed,
-                SUM(CASE WHEN fl.status IN ('C', 'D') THEN 1 ELSE 0 END) AS total_ongoing,
-                COUNT(fl.loan_id) AS total_loans
-            FROM FactLoan fl
-            JOIN DimClientAccount dca ON fl.clientAcc_id = dca.clientAcc_id
-            JOIN DimDistrict dd ON dca.distCli_id = dd.district_id
-            GROUP BY dd.region
-            ORDER BY total_loans DESC;
-        """),
+# Your complete OLAP queries for benchmarking (schema v1: sql/warehouse_init/setup_dw.sql)
+# Year filters test the fact's own date_year, so year-partitioned facts only read that year's partition
+OLAP_QUERIES = [
+    ("Query 1: Loan Rollup by Year", """
+        SELECT d.year,
+               ROUND(AVG(fl.amount),2) AS avg_loan,
+               COUNT(*) AS loan_count
+        FROM FactLoan fl
+        JOIN DimDate d ON fl.date_id = d.date_id
+        GROUP BY d.year
+        ORDER BY d.year;
+    """),
+    
+    ("Query 2: Loan Drilldown by Month", """
+        SELECT d.month,
+               ROUND(AVG(fl.amount),2) AS avg_loan,
+               COUNT(*) AS loan_count
+        FROM FactLoan fl
+        JOIN DimDate d ON fl.date_id = d.date_id
+        WHERE fl.date_year = 1995
+        GROUP BY d.month
+        ORDER BY d.month;
+    """),
+    
+    ("Query 3: Regional Cash Flow", """
+        SELECT dist.region AS region_name,
+               ROUND(SUM(ft.amount),2) AS net_cash
+        FROM FactTrans ft
+        JOIN DimClientAccount ca ON ft.clientAcc_id = ca.clientAcc_id
+        JOIN DimDistrict dist ON ca.distAcc_id = dist.district_id
+        GROUP BY dist.region
+        ORDER BY net_cash DESC;
+    """),
+    
+    ("Query 4: Regional Drilldown - East Bohemia", """
+        SELECT dist.district_name,
+               ROUND(SUM(ft.amount),2) AS net_cash
+        FROM FactTrans ft
+        JOIN DimClientAccount ca ON ft.clientAcc_id = ca.clientAcc_id
+        JOIN DimDistrict dist ON ca.distAcc_id = dist.district_id
+        WHERE dist.region = 'east Bohemia'
+        GROUP BY dist.district_name
+        ORDER BY net_cash DESC;
+    """),
+    
+    ("Query 5: Loan Status Pivot by Region", """
+        SELECT 
+            dd.region,
+            SUM(CASE WHEN fl.status = 'A' THEN 1 ELSE 0 END) AS finished_no_problems,
+            SUM(CASE WHEN fl.status = 'B' THEN 1 ELSE 0 END) AS finished_pending_payments,
+            SUM(CASE WHEN fl.status = 'C' THEN 1 ELSE 0 END) AS active_ok,
+            SUM(CASE WHEN fl.status = 'D' THEN 1 ELSE 0 END) AS active_in_debt,
+            SUM(CASE WHEN fl.status IN ('A', 'B') THEN 1 ELSE 0 END) AS total_completed,
+            SUM(CASE WHEN fl.status IN ('C', 'D') THEN 1 ELSE 0 END) AS total_ongoing,
+            COUNT(fl.loan_id) AS total_loans
+        FROM FactLoan fl
+        JOIN DimClientAccount dca ON fl.clientAcc_id = dca.clientAcc_id
+        JOIN DimDistrict dd ON dca.distCli_id = dd.district_id
+        GROUP BY dd.region
+        ORDER BY total_loans DESC;
+    """),
+    
+    ("Query 6: Transaction Operations Pivot", """
+        SELECT 
+            dd.district_name,
+            dd.region,
+            SUM(CASE WHEN ft.operation = 'Credit in Cash' THEN 1 ELSE 0 END) AS credit_in_cash,
+            SUM(CASE WHEN ft.operation = 'Collection from Another Bank' THEN 1 ELSE 0 END) AS collection_from_bank,
+            SUM(CASE WHEN ft.operation = 'Withdrawal in Cash' THEN 1 ELSE 0 END) AS withdrawal_in_cash,
+            SUM(CASE WHEN ft.operation = 'Remittance to Another Bank' THEN 1 ELSE 0 END) AS remittance_to_bank,
+            SUM(CASE WHEN ft.operation = 'Credit Card Withdrawal' THEN 1 ELSE 0 END) AS credit_card_withdrawal,
+            COUNT(ft.trans_id) AS total_transactions,
+            ROUND(AVG(ft.amount), 2) AS avg_transaction_amount,
+            ROUND(SUM(ft.amount), 2) AS total_money_transferred
+        FROM FactTrans ft
+        JOIN DimClientAccount dca ON ft.clientAcc_id = dca.clientAcc_id
+        JOIN DimDistrict dd ON dca.distCli_id = dd.district_id
+        GROUP BY dd.district_id, dd.district_name, dd.region
+        ORDER BY total_transactions DESC;
+    """),
+    
+    ("Query 7: Card-Loan Analysis", """
+        SELECT 
+            dd.year,
+            dc.type AS card_type,
+            SUM(fl.payments) AS total_payments
+        FROM DimDate dd
+        JOIN FactLoan fl ON dd.date_id = fl.date_id
+        JOIN DimCard dc ON fl.clientAcc_id = dc.clientAcc_id
+        WHERE 
+            fl.date_year = 1997 
+            AND dc.type = 'Gold'
+        GROUP BY 
+            dd.year,
+            dc.type;
+    """),
+    
+    ("Query 8: Optimized Regional Cash Flow (Temp Table)", """
+        CREATE TEMPORARY TABLE PreAggregatedTrans AS
+        SELECT clientAcc_id,
+               SUM(amount) AS total_amount
+        FROM FactTrans
+        GROUP BY clientAcc_id;
+
+        SELECT dist.region AS region_name,
+               ROUND(SUM(pt.total_amount), 2) AS net_cash
+        FROM PreAggregatedTrans pt
+        JOIN DimClientAccount ca ON pt.clientAcc_id = ca.clientAcc_id
+        JOIN DimDistrict dist ON ca.distAcc_id = dist.district_id
+        GROUP BY dist.region
+        ORDER BY net_cash DESC;
         
-        ("Query 6: Transaction Operations Pivot", """
-            SELECT 
-                dd.district_name,
-                dd.region,
-                SUM(CASE WHEN ft.operation = 'Credit in Cash' THEN 1 ELSE 0 END) AS credit_in_cash,
-                SUM(CASE WHEN ft.operation = 'Collection from Another Bank' THEN 1 ELSE 0 END) AS collection_from_bank,
-                SUM(CASE WHEN ft.operation = 'Withdrawal in Cash' THEN 1 ELSE 0 END) AS withdrawal_in_cash,
-                SUM(CASE WHEN ft.operation = 'Remittance to Another Bank' THEN 1 ELSE 0 END) AS remittance_to_bank,
-                SUM(CASE WHEN ft.operation = 'Credit Card Withdrawal' THEN 1 ELSE 0 END) AS credit_card_withdrawal,
-                COUNT(ft.trans_id) AS total_transactions,
-                ROUND(AVG(ft.amount), 2) AS avg_transaction_amount,
-                ROUND(SUM(ft.amount), 2) AS total_money_transferred
-            FROM FactTrans ft
-            JOIN DimClientAccount dca ON ft.clientAcc_id = dca.clientAcc_id
-            JOIN DimDistrict dd ON dca.distCli_id = dd.district_id
-            GROUP BY dd.district_id, dd.district_name, dd.region
-            ORDER BY total_transactions DESC;
-        """),
+        DROP TEMPORARY TABLE PreAggregatedTrans;
+    """),
+    
+    ("Query 9: Optimized Operations Pivot (Temp Table)", """
+        CREATE TEMPORARY TABLE PreAggregatedFactTrans AS
+        SELECT 
+            clientAcc_id,
+            SUM(CASE WHEN operation = 'Credit in Cash' THEN 1 ELSE 0 END) AS credit_in_cash,
+            SUM(CASE WHEN operation = 'Collection from Another Bank' THEN 1 ELSE 0 END) AS collection_from_bank,
+            SUM(CASE WHEN operation = 'Withdrawal in Cash' THEN 1 ELSE 0 END) AS withdrawal_in_cash,
+            SUM(CASE WHEN operation = 'Remittance to Another Bank' THEN 1 ELSE 0 END) AS remittance_to_bank,
+            SUM(CASE WHEN operation = 'Credit Card Withdrawal' THEN 1 ELSE 0 END) AS credit_card_withdrawal,
+            COUNT(trans_id) AS total_transactions,
+            ROUND(AVG(amount), 2) AS avg_transaction_amount,
+            ROUND(SUM(amount), 2) AS total_money_transferred
+        FROM FactTrans
+        GROUP BY clientAcc_id;
+
+        SELECT 
+            dd.district_name,
+            dd.region,
+            SUM(pt.credit_in_cash) AS credit_in_cash,
+            SUM(pt.collection_from_bank) AS collection_from_bank,
+            SUM(pt.withdrawal_in_cash) AS withdrawal_in_cash,
+            SUM(pt.remittance_to_bank) AS remittance_to_bank,
+            SUM(pt.credit_card_withdrawal) AS credit_card_withdrawal,
+            SUM(pt.total_transactions) AS total_transactions,
+            ROUND(AVG(pt.avg_transaction_amount), 2) AS avg_transaction_amount,
+            ROUND(SUM(pt.total_money_transferred), 2) AS total_money_transferred
+        FROM PreAggregatedFactTrans pt
+        JOIN DimClientAccount dca ON pt.clientAcc_id = dca.clientAcc_id
+        JOIN DimDistrict dd ON dca.distCli_id = dd.district_id
+        GROUP BY dd.district_id, dd.district_name, dd.region
+        ORDER BY total_transactions DESC;
         
-        ("Query 7: Card-Loan Analysis", """
-            SELECT 
-                dd.year,
-                dc.type AS card_type,
-                SUM(fl.payments) AS total_payments
-            FROM DimDate dd
-            JOIN FactLoan fl ON dd.date_id = fl.date_id
-            JOIN DimCard dc ON fl.clientAcc_id = dc.clientAcc_id
-            WHERE 
-                dd.year = 1997 
-                AND dc.type = 'Gold'
-            GROUP BY 
-                dd.year,
-                dc.type;
-        """),
+        DROP TEMPORARY TABLE PreAggregatedFactTrans;
+    """)
+]
+
+# The same queries over the compact schema (sql/warehouse_variants/setup_dw_v2.sql): grouping
+# and filtering on the small integer codes, text decoded from the code tables
+OLAP_QUERIES_V2 = [
+    OLAP_QUERIES[0],
+    OLAP_QUERIES[1],
+    
+    ("Query 3: Regional Cash Flow", """
+        SELECT r.region AS region_name,
+               ROUND(SUM(ft.amount),2) AS net_cash
+        FROM FactTrans ft
+        JOIN DimClientAccount ca ON ft.clientAcc_id = ca.clientAcc_id
+        JOIN DimDistrict dist ON ca.distAcc_id = dist.district_id
+        JOIN DimRegion r ON dist.region_id = r.region_id
+        GROUP BY r.region_id, r.region
+        ORDER BY net_cash DESC;
+    """),
+    
+    ("Query 4: Regional Drilldown - East Bohemia", """
+        SELECT dist.district_name,
+               ROUND(SUM(ft.amount),2) AS net_cash
+        FROM FactTrans ft
+        JOIN DimClientAccount ca ON ft.clientAcc_id = ca.clientAcc_id
+        JOIN DimDistrict dist ON ca.distAcc_id = dist.district_id
+        JOIN DimRegion r ON dist.region_id = r.region_id
+        WHERE r.region = 'east Bohemia'
+        GROUP BY dist.district_name
+        ORDER BY net_cash DESC;
+    """),
+    
+    ("Query 5: Loan Status Pivot by Region", """
+        SELECT 
+            r.region,
+            SUM(CASE WHEN fl.status = 'A' THEN 1 ELSE 0 END) AS finished_no_problems,
+            SUM(CASE WHEN fl.status = 'B' THEN 1 ELSE 0 END) AS finished_pending_payments,
+            SUM(CASE WHEN fl.status = 'C' THEN 1 ELSE 0 END) AS active_ok,
+            SUM(CASE WHEN fl.status = 'D' THEN 1 ELSE 0 END) AS active_in_debt,
+            SUM(CASE WHEN fl.status IN ('A', 'B') THEN 1 ELSE 0 END) AS total_completed,
+            SUM(CASE WHEN fl.status IN ('C', 'D') THEN 1 ELSE 0 END) AS total_ongoing,
+            COUNT(fl.loan_id) AS total_loans
+        FROM FactLoan fl
+        JOIN DimClientAccount dca ON fl.clientAcc_id = dca.clientAcc_id
+        JOIN DimDistrict dd ON dca.distCli_id = dd.district_id
+        JOIN DimRegion r ON dd.region_id = r.region_id
+        GROUP BY r.region_id, r.region
+        ORDER BY total_loans DESC;
+    """),
+    
+    ("Query 6: Transaction Operations Pivot", """
+        SELECT 
+            dd.district_name,
+            r.region,
+            SUM(CASE WHEN tj.operation = 'Credit in Cash' THEN 1 ELSE 0 END) AS credit_in_cash,
+            SUM(CASE WHEN tj.operation = 'Collection from Another Bank' THEN 1 ELSE 0 END) AS collection_from_bank,
+            SUM(CASE WHEN tj.operation = 'Withdrawal in Cash' THEN 1 ELSE 0 END) AS withdrawal_in_cash,
+            SUM(CASE WHEN tj.operation = 'Remittance to Another Bank' THEN 1 ELSE 0 END) AS remittance_to_bank,
+            SUM(CASE WHEN tj.operation = 'Credit Card Withdrawal' THEN 1 ELSE 0 END) AS credit_card_withdrawal,
+            COUNT(ft.trans_id) AS total_transactions,
+            ROUND(AVG(ft.amount), 2) AS avg_transaction_amount,
+            ROUND(SUM(ft.amount), 2) AS total_money_transferred
+        FROM FactTrans ft
+        JOIN TransTypeJunk tj ON ft.trans_type_id = tj.trans_type_id
+        JOIN DimClientAccount dca ON ft.clientAcc_id = dca.clientAcc_id
+        JOIN DimDistrict dd ON dca.distCli_id = dd.district_id
+        JOIN DimRegion r ON dd.region_id = r.region_id
+        GROUP BY dd.district_id, dd.district_name, r.region
+        ORDER BY total_transactions DESC;
+    """),
+    
+    ("Query 7: Card-Loan Analysis", """
+        SELECT 
+            dd.year,
+            ct.card_type,
+            SUM(fl.payments) AS total_payments
+        FROM DimDate dd
+        JOIN FactLoan fl ON dd.date_id = fl.date_id
+        JOIN DimCard dc ON fl.clientAcc_id = dc.clientAcc_id
+        JOIN DimCardType ct ON dc.card_type_id = ct.card_type_id
+        WHERE 
+            fl.date_year = 1997 
+            AND ct.card_type = 'Gold'
+        GROUP BY 
+            dd.year,
+            ct.card_type;
+    """),
+    
+    ("Query 8: Optimized Regional Cash Flow (Temp Table)", """
+        CREATE TEMPORARY TABLE PreAggregatedTrans AS
+        SELECT clientAcc_id,
+               SUM(amount) AS total_amount
+        FROM FactTrans
+        GROUP BY clientAcc_id;
+
+        SELECT r.region AS region_name,
+               ROUND(SUM(pt.total_amount), 2) AS net_cash
+        FROM PreAggregatedTrans pt
+        JOIN DimClientAccount ca ON pt.clientAcc_id = ca.clientAcc_id
+        JOIN DimDistrict dist ON ca.distAcc_id = dist.district_id
+        JOIN DimRegion r ON dist.region_id = r.region_id
+        GROUP BY r.region_id, r.region
+        ORDER BY net_cash DESC;
         
-        ("Query 8: Optimized Regional Cash Flow (Temp Table)", """
-            CREATE TEMPORARY TABLE PreAggregatedTrans AS
-            SELECT clientAcc_id,
-                   SUM(amount) AS total_amount
-            FROM FactTrans
-            GROUP BY clientAcc_id;
+        DROP TEMPORARY TABLE PreAggregatedTrans;
+    """),
+    
+    ("Query 9: Optimized Operations Pivot (Temp Table)", """
+        CREATE TEMPORARY TABLE PreAggregatedFactTrans AS
+        SELECT 
+            ft.clientAcc_id,
+            SUM(CASE WHEN tj.operation = 'Credit in Cash' THEN 1 ELSE 0 END) AS credit_in_cash,
+            SUM(CASE WHEN tj.operation = 'Collection from Another Bank' THEN 1 ELSE 0 END) AS collection_from_bank,
+            SUM(CASE WHEN tj.operation = 'Withdrawal in Cash' THEN 1 ELSE 0 END) AS withdrawal_in_cash,
+            SUM(CASE WHEN tj.operation = 'Remittance to Another Bank' THEN 1 ELSE 0 END) AS remittance_to_bank,
+            SUM(CASE WHEN tj.operation = 'Credit Card Withdrawal' THEN 1 ELSE 0 END) AS credit_card_withdrawal,
+            COUNT(ft.trans_id) AS total_transactions,
+            ROUND(AVG(ft.amount), 2) AS avg_transaction_amount,
+            ROUND(SUM(ft.amount), 2) AS total_money_transferred
+        FROM FactTrans ft
+        JOIN TransTypeJunk tj ON ft.trans_type_id = tj.trans_type_id
+        GROUP BY ft.clientAcc_id;
 
-            SELECT dist.region AS region_name,
-                   ROUND(SUM(pt.total_amount), 2) AS net_cash
-            FROM PreAggregatedTrans pt
-            JOIN DimClientAccount ca ON pt.clientAcc_id = ca.clientAcc_id
-            JOIN DimDistrict dist ON ca.distAcc_id = dist.district_id
-            GROUP BY dist.region
-            ORDER BY net_cash DESC;
-            
-            DROP TEMPORARY TABLE PreAggregatedTrans;
-        """),
+        SELECT 
+            dd.district_name,
+            r.region,
+            SUM(pt.credit_in_cash) AS credit_in_cash,
+            SUM(pt.collection_from_bank) AS collection_from_bank,
+            SUM(pt.withdrawal_in_cash) AS withdrawal_in_cash,
+            SUM(pt.remittance_to_bank) AS remittance_to_bank,
+            SUM(pt.credit_card_withdrawal) AS credit_card_withdrawal,
+            SUM(pt.total_transactions) AS total_transactions,
+            ROUND(AVG(pt.avg_transaction_amount), 2) AS avg_transaction_amount,
+            ROUND(SUM(pt.total_money_transferred), 2) AS total_money_transferred
+        FROM PreAggregatedFactTrans pt
+        JOIN DimClientAccount dca ON pt.clientAcc_id = dca.clientAcc_id
+        JOIN DimDistrict dd ON dca.distCli_id = dd.district_id
+        JOIN DimRegion r ON dd.region_id = r.region_id
+        GROUP BY dd.district_id, dd.district_name, r.region
+        ORDER BY total_transactions DESC;
         
-        ("Query 9: Optimized Operations Pivot (Temp Table)", """
-            CREATE TEMPORARY TABLE PreAggregatedFactTrans AS
-            SELECT 
-                clientAcc_id,
-                SUM(CASE WHEN operation = 'Credit in Cash' THEN 1 ELSE 0 END) AS credit_in_cash,
-                SUM(CASE WHEN operation = 'Collection from Another Bank' THEN 1 ELSE 0 END) AS collection_from_bank,
-                SUM(CASE WHEN operation = 'Withdrawal in Cash' THEN 1 ELSE 0 END) AS withdrawal_in_cash,
-                SUM(CASE WHEN operation = 'Remittance to Another Bank' THEN 1 ELSE 0 END) AS remittance_to_bank,
-                SUM(CASE WHEN operation = 'Credit Card Withdrawal' THEN 1 ELSE 0 END) AS credit_card_withdrawal,
-                COUNT(trans_id) AS total_transactions,
-                ROUND(AVG(amount), 2) AS avg_transaction_amount,
-                ROUND(SUM(amount), 2) AS total_money_transferred
-            FROM FactTrans
-            GROUP BY clientAcc_id;
+        DROP TEMPORARY TABLE PreAggregatedFactTrans;
+    """)
+]
 
-            SELECT 
-                dd.district_name,
-                dd.region,
-                SUM(pt.credit_in_cash) AS credit_in_cash,
-                SUM(pt.collection_from_bank) AS collection_from_bank,
-                SUM(pt.withdrawal_in_cash) AS withdrawal_in_cash,
-                SUM(pt.remittance_to_bank) AS remittance_to_bank,
-                SUM(pt.credit_card_withdrawal) AS credit_card_withdrawal,
-                SUM(pt.total_transactions) AS total_transactions,
-                ROUND(AVG(pt.avg_transaction_amount), 2) AS avg_transaction_amount,
-                ROUND(SUM(pt.total_money_transferred), 2) AS total_money_transferred
-            FROM PreAggregatedFactTrans pt
-            JOIN DimClientAccount dca ON pt.clientAcc_id = dca.clientAcc_id
-            JOIN DimDistrict dd ON dca.distCli_id = dd.district_id
-            GROUP BY dd.district_id, dd.district_name, dd.region
-            ORDER BY total_transactions DESC;
-            
-            DROP TEMPORARY TABLE PreAggregatedFactTrans;
-        """)
-    ]
+# Join-free variants of Queries 1-6 over facts loaded with --denormalize-facts
+# (sql/warehouse_variants/denormalize.sql): the fact table is grouped by its copied district,
+# region code, date_year and date_month columns, and only the grouped rows are joined to
+# the district and region names. DimRegion holds the region codes in both schema versions.
+JOIN_FREE_QUERIES = [
+    ("Query 1: Loan Rollup by Year", """
+        SELECT fl.date_year AS year,
+               ROUND(AVG(fl.amount),2) AS avg_loan,
+               COUNT(*) AS loan_count
+        FROM FactLoan fl
+        GROUP BY fl.date_year
+        ORDER BY fl.date_year;
+    """),
+    
+    ("Query 2: Loan Drilldown by Month", """
+        SELECT fl.date_month AS month,
+               ROUND(AVG(fl.amount),2) AS avg_loan,
+               COUNT(*) AS loan_count
+        FROM FactLoan fl
+        WHERE fl.date_year = 1995
+        GROUP BY fl.date_month
+        ORDER BY fl.date_month;
+    """),
+    
+    ("Query 3: Regional Cash Flow", """
+        SELECT r.region AS region_name,
+               ROUND(g.net_cash,2) AS net_cash
+        FROM (SELECT regionAcc_id, SUM(amount) AS net_cash
+              FROM FactTrans
+              GROUP BY regionAcc_id) g
+        JOIN DimRegion r ON g.regionAcc_id = r.region_id
+        ORDER BY net_cash DESC;
+    """),
+    
+    ("Query 4: Regional Drilldown - East Bohemia", """
+        SELECT dist.district_name,
+               ROUND(g.net_cash,2) AS net_cash
+        FROM (SELECT distAcc_id, SUM(amount) AS net_cash
+              FROM FactTrans
+              WHERE regionAcc_id = (SELECT region_id FROM DimRegion WHERE region = 'east Bohemia')
+              GROUP BY distAcc_id) g
+        JOIN DimDistrict dist ON g.distAcc_id = dist.district_id
+        ORDER BY net_cash DESC;
+    """),
+    
+    ("Query 5: Loan Status Pivot by Region", """
+        SELECT 
+            r.region,
+            g.finished_no_problems,
+            g.finished_pending_payments,
+            g.active_ok,
+            g.active_in_debt,
+            g.total_completed,
+            g.total_ongoing,
+            g.total_loans
+        FROM (SELECT 
+                  regionCli_id,
+                  SUM(CASE WHEN status = 'A' THEN 1 ELSE 0 END) AS finished_no_problems,
+                  SUM(CASE WHEN status = 'B' THEN 1 ELSE 0 END) AS finished_pending_payments,
+                  SUM(CASE WHEN status = 'C' THEN 1 ELSE 0 END) AS active_ok,
+                  SUM(CASE WHEN status = 'D' THEN 1 ELSE 0 END) AS active_in_debt,
+                  SUM(CASE WHEN status IN ('A', 'B') THEN 1 ELSE 0 END) AS total_completed,
+                  SUM(CASE WHEN status IN ('C', 'D') THEN 1 ELSE 0 END) AS total_ongoing,
+                  COUNT(loan_id) AS total_loans
+              FROM FactLoan
+              GROUP BY regionCli_id) g
+        JOIN DimRegion r ON g.regionCli_id = r.region_id
+        ORDER BY g.total_loans DESC;
+    """),
+    
+    ("Query 6: Transaction Operations Pivot", """
+        SELECT 
+            dd.district_name,
+            dd.region,
+            g.credit_in_cash,
+            g.collection_from_bank,
+            g.withdrawal_in_cash,
+            g.remittance_to_bank,
+            g.credit_card_withdrawal,
+            g.total_transactions,
+            ROUND(g.total_amount / g.total_transactions, 2) AS avg_transaction_amount,
+            ROUND(g.total_amount, 2) AS total_money_transferred
+        FROM (SELECT 
+                  distCli_id,
+                  SUM(CASE WHEN operation = 'Credit in Cash' THEN 1 ELSE 0 END) AS credit_in_cash,
+                  SUM(CASE WHEN operation = 'Collection from Another Bank' THEN 1 ELSE 0 END) AS collection_from_bank,
+                  SUM(CASE WHEN operation = 'Withdrawal in Cash' THEN 1 ELSE 0 END) AS withdrawal_in_cash,
+                  SUM(CASE WHEN operation = 'Remittance to Another Bank' THEN 1 ELSE 0 END) AS remittance_to_bank,
+                  SUM(CASE WHEN operation = 'Credit Card Withdrawal' THEN 1 ELSE 0 END) AS credit_card_withdrawal,
+                  COUNT(trans_id) AS total_transactions,
+                  SUM(amount) AS total_amount
+              FROM FactTrans
+              GROUP BY distCli_id) g
+        JOIN DimDistrict dd ON g.distCli_id = dd.district_id
+        ORDER BY g.total_transactions DESC;
+    """),
+]
+
+# Schema v2: the operation is decoded from TransTypeJunk after grouping by its code
+JOIN_FREE_QUERIES_V2 = JOIN_FREE_QUERIES[:5] + [
+    ("Query 6: Transaction Operations Pivot", """
+        SELECT 
+            dd.district_name,
+            r.region,
+            SUM(CASE WHEN tj.operation = 'Credit in Cash' THEN g.transactions ELSE 0 END) AS credit_in_cash,
+            SUM(CASE WHEN tj.operation = 'Collection from Another Bank' THEN g.transactions ELSE 0 END) AS collection_from_bank,
+            SUM(CASE WHEN tj.operation = 'Withdrawal in Cash' THEN g.transactions ELSE 0 END) AS withdrawal_in_cash,
+            SUM(CASE WHEN tj.operation = 'Remittance to Another Bank' THEN g.transactions ELSE 0 END) AS remittance_to_bank,
+            SUM(CASE WHEN tj.operation = 'Credit Card Withdrawal' THEN g.transactions ELSE 0 END) AS credit_card_withdrawal,
+            SUM(g.transactions) AS total_transactions,
+            ROUND(SUM(g.total_amount) / SUM(g.transactions), 2) AS avg_transaction_amount,
+            ROUND(SUM(g.total_amount), 2) AS total_money_transferred
+        FROM (SELECT distCli_id, trans_type_id, COUNT(trans_id) AS transactions, SUM(amount) AS total_amount
+              FROM FactTrans
+              GROUP BY distCli_id, trans_type_id) g
+        JOIN DimDistrict dd ON g.distCli_id = dd.district_id
+        JOIN TransTypeJunk tj ON g.trans_type_id = tj.trans_type_id
+        JOIN DimRegion r ON dd.region_id = r.region_id
+        GROUP BY dd.district_id, dd.district_name, r.region
+        ORDER BY total_transactions DESC;
+    """),
+]
+
+# Star schema tables measured by the schema report (the code tables only exist in v2)
+SCHEMA_TABLES = ['DimDate', 'DimDistrict', 'DimClientAccount', 'DimCard', 'FactTrans', 'FactLoan',
+                 'TransTypeJunk', 'DimRegion', 'DimFrequency', 'DimCardType']
+
+
+def compare_reports(before: Dict, after: Dict):
+    """Print table sizes and average query latencies of two schema reports side by side"""
+    print("\n" + "=" * 80)
+    print(f"SCHEMA COMPARISON - v{before['schema_version']} (before) vs v{after['schema_version']} (after)")
+    print("=" * 80)
+    print(f"{'Table':<20} {'Before (MB)':>12} {'After (MB)':>12} {'Change':>9}")
+    print("-" * 56)
+    totals = [0, 0]
+    for table in SCHEMA_TABLES:
+        sizes = [report['table_sizes'].get(table, {}).get('total_bytes', 0) for report in (before, after)]
+        if not any(sizes):
+            continue
+        totals = [total + size for total, size in zip(totals, sizes)]
+        change = f"{(sizes[1] - sizes[0]) / sizes[0] * 100:+.1f}%" if sizes[0] else "new"
+        print(f"{table:<20} {sizes[0] / 1e6:>12.2f} {sizes[1] / 1e6:>12.2f} {change:>9}")
+    change = f"{(totals[1] - totals[0]) / totals[0] * 100:+.1f}%" if totals[0] else "-"
+    print(f"{'Total':<20} {totals[0] / 1e6:>12.2f} {totals[1] / 1e6:>12.2f} {change:>9}")
+    
+    compare_latencies(before['queries'], after['queries'])
+
+
+def compare_latencies(before: List[Dict], after: List[Dict], labels: Tuple[str, str] = ('Before', 'After')):
+    """Print the average latency of each query in two benchmark runs side by side, matched by name"""
+    headers = [f"{label} (ms)" for label in labels]
+    print(f"\n{'Query Name':<52} {headers[0]:>12} {headers[1]:>12} {'Change':>9}")
+    print("-" * 88)
+    after_queries = {result['query_name']: result for result in after if 'error' not in result}
+    for result in before:
+        if 'error' in result or result['query_name'] not in after_queries:
+            continue
+        old, new = result['avg_time_ms'], after_queries[result['query_name']]['avg_time_ms']
+        change = f"{(new - old) / old * 100:+.1f}%" if old else "-"
+        print(f"{result['query_name']:<52} {old:>12.2f} {new:>12.2f} {change:>9}")
+
+
+def main():
+    """Benchmark the OLAP queries, or compare two saved schema reports"""
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="OLAP query benchmark and schema size report")
+    parser.add_argument('--schema', choices=['auto', '1', '2'], default='auto',
+                        help="Query set to run: setup_dw.sql (1) or the compact setup_dw_v2.sql (2) "
+                             "(default: detected from the warehouse)")
+    parser.add_argument('--iterations', type=int, default=10, help="Runs per query (default: %(default)s)")
+    parser.add_argument('--report', default=None,
+                        help="Also save table sizes and latencies as a schema report JSON file")
+    parser.add_argument('--compare', nargs=2, metavar=('BEFORE', 'AFTER'),
+                        help="Compare two schema reports instead of benchmarking")
+    parser.add_argument('--explain-partitions', action='store_true',
+                        help="Only print which fact partitions each query reads (--partition-facts loads)")
+    parser.add_argument('--join-free', action='store_true',
+                        help="Also run the join-free variants of Queries 1-6 and compare their latency with "
+                             "the star joins (--denormalize-facts loads)")
+    args = parser.parse_args()
+    
+    if args.compare:
+        with open(args.compare[0]) as f:
+            before = json.load(f)
+        with open(args.compare[1]) as f:
+            after = json.load(f)
+        compare_reports(before, after)
+        return
     
     # Initialize benchmarker
     benchmark = QueryBenchmark()
@@ -360,11 +760,43 @@ def main():
         return
     
     try:
+        version = benchmark.schema_version() if args.schema == 'auto' else int(args.schema)
+        queries = OLAP_QUERIES_V2 if version == 2 else OLAP_QUERIES
+        print(f"Schema v{version}")
+        
+        if args.explain_partitions:
+            benchmark.report_partition_pruning(queries)
+            return
+        
         # Run benchmarks
-        results = benchmark.benchmark_multiple_queries(queries, iterations=10)
+        results = benchmark.benchmark_multiple_queries(queries, iterations=args.iterations)
+        
+        join_free_results = None
+        if args.join_free and not benchmark.facts_denormalized():
+            print("\nThe fact tables carry no denormalized columns (load with --denormalize-facts)")
+        elif args.join_free:
+            join_free_queries = JOIN_FREE_QUERIES_V2 if version == 2 else JOIN_FREE_QUERIES
+            join_free_results = benchmark.benchmark_multiple_queries(join_free_queries, iterations=args.iterations)
+            print("\n" + "=" * 80)
+            print("STAR JOINS vs JOIN-FREE (denormalized facts)")
+            print("=" * 80)
+            compare_latencies(results, join_free_results, labels=('Star', 'Join-free'))
         
         # Save results
         benchmark.save_results(results)
+        if join_free_results:
+            benchmark.save_results(join_free_results, "benchmark_results_join_free.json")
+        if args.report:
+            report = {
+                "schema_version": version,
+                "table_sizes": benchmark.table_sizes(SCHEMA_TABLES),
+                "queries": results,
+            }
+            if join_free_results:
+                report["join_free_queries"] = join_free_results
+            with open(args.report, 'w') as f:
+                json.dump(report, f, indent=2)
+            print(f"Schema report saved to {args.report}")
         
     except KeyboardInterrupt:
         print("\nBenchmark interrupted by user")
@@ -374,4 +806,4 @@ def main():
         benchmark.close()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
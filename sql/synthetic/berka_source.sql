@@ -0,0 +1,80 @@
+-- Berka-style source schema for synthetic scale-out data (etl/synthetic_source.py)
+-- Created in the database the generator writes to (financedata_synthetic by default),
+-- never in the real financedata source. Only the columns the ETL extracts are kept,
+-- with the types the extracts expect: DATE columns named newdate / newissued, DOUBLE
+-- amounts and balances, INT loan amounts.
+
+CREATE TABLE IF NOT EXISTS district (
+    district_id INT NOT NULL PRIMARY KEY,
+    district_name VARCHAR(64),
+    region VARCHAR(32),
+    inhabitants INT,
+    noCities INT,
+    ratio_urbaninhabitants DOUBLE,
+    average_salary INT,
+    unemployment DOUBLE,
+    noEntrepreneur INT,
+    noCrimes INT
+);
+
+CREATE TABLE IF NOT EXISTS ref_loanstatus (
+    status CHAR(1) NOT NULL PRIMARY KEY,
+    description VARCHAR(64)
+);
+
+CREATE TABLE IF NOT EXISTS account (
+    account_id INT NOT NULL PRIMARY KEY,
+    district_id INT NOT NULL,
+    frequency VARCHAR(32),
+    newdate DATE,
+    FOREIGN KEY (district_id) REFERENCES district(district_id)
+);
+
+CREATE TABLE IF NOT EXISTS client (
+    client_id INT NOT NULL PRIMARY KEY,
+    district_id INT NOT NULL,
+    FOREIGN KEY (district_id) REFERENCES district(district_id)
+);
+
+CREATE TABLE IF NOT EXISTS disp (
+    disp_id INT NOT NULL PRIMARY KEY,
+    client_id INT NOT NULL,
+    account_id INT NOT NULL,
+    type VARCHAR(16),
+    KEY idx_disp_account (account_id, type),
+    FOREIGN KEY (client_id) REFERENCES client(client_id),
+    FOREIGN KEY (account_id) REFERENCES account(account_id)
+);
+
+CREATE TABLE IF NOT EXISTS card (
+    card_id INT NOT NULL PRIMARY KEY,
+    disp_id INT NOT NULL,
+    type VARCHAR(16),
+    newissued DATE,
+    FOREIGN KEY (disp_id) REFERENCES disp(disp_id)
+);
+
+CREATE TABLE IF NOT EXISTS loan (
+    loan_id INT NOT NULL PRIMARY KEY,
+    account_id INT NOT NULL,
+    newdate DATE,
+    amount INT,
+    duration INT,
+    payments DOUBLE,
+    status CHAR(1),
+    FOREIGN KEY (account_id) REFERENCES account(account_id)
+);
+
+CREATE TABLE IF NOT EXISTS trans (
+    trans_id INT NOT NULL PRIMARY KEY,
+    account_id INT NOT NULL,
+    newdate DATE,
+    type VARCHAR(32),
+    operation VARCHAR(64),
+    amount DOUBLE,
+    balance DOUBLE,
+    k_symbol VARCHAR(64),
+    bank CHAR(2),
+    account INT,
+    FOREIGN KEY (account_id) REFERENCES account(account_id)
+);
@@ -0,0 +1,68 @@
+USE warehouse_db;
+
+-- Summary Tables
+-- Built by the ETL (etl/aggregates.py) after the facts are loaded, at the grains the
+-- dashboard reports use. AVG is not stored: it is derived as amount_sum / count.
+
+-- AggLoanMonthly - Report 1 (Loan Amount Trend)
+CREATE TABLE IF NOT EXISTS AggLoanMonthly (
+    year INT NOT NULL,
+    month INT NOT NULL,
+    loan_count INT NOT NULL,
+    amount_sum BIGINT NOT NULL,
+    PRIMARY KEY (year, month)
+);
+
+-- AggNetCashDistrict - Report 2 (Location Net Cash Flow), by the account's district
+CREATE TABLE IF NOT EXISTS AggNetCashDistrict (
+    district_id INT NOT NULL,
+    district_name VARCHAR(100),
+    region VARCHAR(100),
+    trans_count INT NOT NULL,
+    amount_sum DOUBLE NOT NULL,
+    PRIMARY KEY (district_id)
+);
+
+-- AggPaymentsYearCard - Report 3 (Number of Payments and Total Amount)
+-- Loans are paired with the cards issued on the same date, as in the report query
+CREATE TABLE IF NOT EXISTS AggPaymentsYearCard (
+    year INT NOT NULL,
+    card_type VARCHAR(50) NOT NULL,
+    loan_card_pairs INT NOT NULL,
+    payments_sum DOUBLE NOT NULL,
+    PRIMARY KEY (year, card_type)
+);
+
+-- AggLoanStatusRegion - Report 4 (Loan Status by Region), by the client's district
+CREATE TABLE IF NOT EXISTS AggLoanStatusRegion (
+    region VARCHAR(100) NOT NULL,
+    status CHAR(1) NOT NULL,
+    loan_count INT NOT NULL,
+    amount_sum BIGINT NOT NULL,
+    PRIMARY KEY (region, status)
+);
+
+-- AggTransOperationDistrict - Report 5 (Transaction Types by District), by the client's district
+-- Transactions without an operation are kept under operation ''
+CREATE TABLE IF NOT EXISTS AggTransOperationDistrict (
+    district_id INT NOT NULL,
+    district_name VARCHAR(100),
+    region VARCHAR(100),
+    operation VARCHAR(100) NOT NULL,
+    trans_count INT NOT NULL,
+    amount_sum DOUBLE NOT NULL,
+    PRIMARY KEY (district_id, operation)
+);
+
+-- AggWatermark - Highest fact key folded into the summary tables
+-- Updated in the same transaction as the summary rows, so a delta is never applied twice
+CREATE TABLE IF NOT EXISTS AggWatermark (
+    fact_table VARCHAR(64) NOT NULL,
+    high_key BIGINT NOT NULL,
+    updated_at DATETIME NOT NULL,
+    PRIMARY KEY (fact_table)
+);
+
+-- SUCCESS MESSAGE
+
+SELECT 'Summary tables created successfully!' as STATUS;
@@ -1,15 +1,21 @@
 USE warehouse_db;
 
 -- Dimesional Tables
+-- DimDistrict, DimClientAccount and DimCard keep a content hash of every row in row_hash,
+-- so incremental runs only upsert the rows that changed (etl/change_detection.py)
 
--- DimDate - Time dimension
+-- DimDate - Time dimension, one row per calendar day (etl/date_keys.py)
 CREATE TABLE DimDate(
-    date_id INT PRIMARY KEY,
+    date_id INT PRIMARY KEY,             -- YYYYMMDD
     date DATE,
     quarter INT,
     year INT,
     month INT,
-    day INT
+    day INT,
+    week INT,
+    week_year INT,
+    day_of_week INT,
+    yearmonth INT
 );
 
 -- DimDistrict - Geographic dimension
@@ -23,7 +29,8 @@ CREATE TABLE DimDistrict(
     average_salary DOUBLE,
     unemployment DOUBLE,
     noEntrepreneur INT,
-    noCrimes INT
+    noCrimes INT,
+    row_hash BIGINT UNSIGNED NOT NULL DEFAULT 0
 );
 
 -- DimClientAccount - Central dimension
@@ -35,6 +42,7 @@ CREATE TABLE DimClientAccount (
     distAcc_id INT,
     date_id INT,
     frequency TEXT,
+    row_hash BIGINT UNSIGNED NOT NULL DEFAULT 0,
     FOREIGN KEY (distCli_id) REFERENCES DimDistrict(district_id),
     FOREIGN KEY (distAcc_id) REFERENCES DimDistrict(district_id),
     FOREIGN KEY (date_id) REFERENCES DimDate(date_id)
@@ -46,6 +54,7 @@ CREATE TABLE DimCard(
     clientAcc_id INT,
     date_id INT,
     type TEXT,
+    row_hash BIGINT UNSIGNED NOT NULL DEFAULT 0,
     FOREIGN KEY (clientAcc_id) REFERENCES DimClientAccount(clientAcc_id),
     FOREIGN KEY (date_id) REFERENCES DimDate(date_id)
 );
@@ -57,6 +66,7 @@ CREATE TABLE FactTrans (
     trans_id INT PRIMARY KEY,
     clientAcc_id INT,
     date_id INT,
+    date_year SMALLINT NOT NULL,
     account INT,
     type TEXT,
     operation TEXT,
@@ -72,6 +82,7 @@ CREATE TABLE FactLoan (
     loan_id INT PRIMARY KEY,
     clientAcc_id INT,
     date_id INT,
+    date_year SMALLINT NOT NULL,
     status CHAR(1),
     amount INT,
     duration INT,
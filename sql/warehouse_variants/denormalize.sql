@@ -0,0 +1,34 @@
+USE warehouse_db;
+
+-- Denormalized fact columns (etl_pipeline_clean.py --denormalize-facts)
+-- Applied after setup_dw.sql / setup_dw_v2.sql (and partitions.sql). The loaders copy the
+-- districts of each fact row's DimClientAccount row, the DimRegion code of the district
+-- the dashboard groups the fact by and the month of its DimDate row onto the row (the year
+-- is date_year), so the dashboard grains aggregate the facts without joining the dimensions.
+-- The values are copied at load time; 0 marks a key missing from the dimensions.
+
+-- Region codes of DimDistrict.region (setup_dw_v2.sql already creates the table;
+-- in schema v1 the ETL fills it from DimDistrict, see etl/denormalize.py)
+CREATE TABLE IF NOT EXISTS DimRegion (
+    region_id TINYINT UNSIGNED NOT NULL AUTO_INCREMENT PRIMARY KEY,
+    region VARCHAR(32) NOT NULL DEFAULT '',
+    value_hash BINARY(16) AS (UNHEX(MD5(CONCAT_WS(CHAR(0), region)))) STORED,
+    UNIQUE KEY uq_dimregion (value_hash)
+);
+
+-- Net cash and regional cash flow group by the account's district,
+-- operation counts by the client's district
+ALTER TABLE FactTrans
+    ADD COLUMN distAcc_id SMALLINT UNSIGNED NOT NULL DEFAULT 0,
+    ADD COLUMN distCli_id SMALLINT UNSIGNED NOT NULL DEFAULT 0,
+    ADD COLUMN regionAcc_id TINYINT UNSIGNED NOT NULL DEFAULT 0,
+    ADD COLUMN date_month TINYINT UNSIGNED NOT NULL DEFAULT 0;
+
+-- Loan status groups by the client's region
+ALTER TABLE FactLoan
+    ADD COLUMN distCli_id SMALLINT UNSIGNED NOT NULL DEFAULT 0,
+    ADD COLUMN regionCli_id TINYINT UNSIGNED NOT NULL DEFAULT 0,
+    ADD COLUMN date_month TINYINT UNSIGNED NOT NULL DEFAULT 0;
+
+-- SUCCESS MESSAGE
+SELECT 'Fact tables denormalized!' as STATUS;
@@ -0,0 +1,25 @@
+USE warehouse_db;
+
+-- Year partitioning of the fact tables (etl_pipeline_clean.py --partition-facts)
+-- Applied right after setup_dw.sql / setup_dw_v2.sql, which the pipeline runs without
+-- the FactTrans and FactLoan foreign keys: MySQL does not support foreign keys on
+-- partitioned tables, and every unique key has to contain the partitioning column.
+-- The ETL splits p_future into one partition per DimDate year (etl/partitions.py).
+
+-- p_none holds rows without a date year, p_future everything past the last year partition
+ALTER TABLE FactTrans
+    DROP PRIMARY KEY, ADD PRIMARY KEY (trans_id, date_year)
+    PARTITION BY RANGE (date_year) (
+        PARTITION p_none VALUES LESS THAN (1),
+        PARTITION p_future VALUES LESS THAN MAXVALUE
+    );
+
+ALTER TABLE FactLoan
+    DROP PRIMARY KEY, ADD PRIMARY KEY (loan_id, date_year)
+    PARTITION BY RANGE (date_year) (
+        PARTITION p_none VALUES LESS THAN (1),
+        PARTITION p_future VALUES LESS THAN MAXVALUE
+    );
+
+-- SUCCESS MESSAGE
+SELECT 'Fact tables partitioned by date year!' as STATUS;
@@ -0,0 +1,144 @@
+USE warehouse_db;
+
+-- Compact Schema (v2)
+-- Same star as setup_dw.sql with fixed-width column types and the low-cardinality
+-- text attributes dictionary-encoded: the ETL (etl/encoding.py) stores a small
+-- integer code in the dimension / fact row and the text once in a code table.
+-- Code table attributes are NOT NULL (a missing value is stored as ''). Codes are unique
+-- on a hash of the exact value bytes, so values differing only in case or accents get
+-- their own codes (as distinct values did in the TEXT columns) while queries still
+-- compare the attributes with the default case-insensitive collation.
+
+-- Code Tables
+
+-- TransTypeJunk - Junk dimension of the FactTrans type / operation / k_symbol combinations
+CREATE TABLE TransTypeJunk (
+    trans_type_id SMALLINT UNSIGNED NOT NULL AUTO_INCREMENT PRIMARY KEY,
+    type VARCHAR(64) NOT NULL DEFAULT '',
+    operation VARCHAR(64) NOT NULL DEFAULT '',
+    k_symbol VARCHAR(64) NOT NULL DEFAULT '',
+    value_hash BINARY(16) AS (UNHEX(MD5(CONCAT_WS(CHAR(0), type, operation, k_symbol)))) STORED,
+    UNIQUE KEY uq_transtypejunk (value_hash)
+);
+
+-- DimRegion - Region names of DimDistrict
+CREATE TABLE DimRegion (
+    region_id TINYINT UNSIGNED NOT NULL AUTO_INCREMENT PRIMARY KEY,
+    region VARCHAR(32) NOT NULL DEFAULT '',
+    value_hash BINARY(16) AS (UNHEX(MD5(CONCAT_WS(CHAR(0), region)))) STORED,
+    UNIQUE KEY uq_dimregion (value_hash)
+);
+
+-- DimFrequency - Statement frequencies of DimClientAccount
+CREATE TABLE DimFrequency (
+    frequency_id TINYINT UNSIGNED NOT NULL AUTO_INCREMENT PRIMARY KEY,
+    frequency VARCHAR(64) NOT NULL DEFAULT '',
+    value_hash BINARY(16) AS (UNHEX(MD5(CONCAT_WS(CHAR(0), frequency)))) STORED,
+    UNIQUE KEY uq_dimfrequency (value_hash)
+);
+
+-- DimCardType - Card types of DimCard
+CREATE TABLE DimCardType (
+    card_type_id TINYINT UNSIGNED NOT NULL AUTO_INCREMENT PRIMARY KEY,
+    card_type VARCHAR(16) NOT NULL DEFAULT '',
+    value_hash BINARY(16) AS (UNHEX(MD5(CONCAT_WS(CHAR(0), card_type)))) STORED,
+    UNIQUE KEY uq_dimcardtype (value_hash)
+);
+
+-- Dimesional Tables
+-- DimDistrict, DimClientAccount and DimCard keep a content hash of every row in row_hash,
+-- so incremental runs only upsert the rows that changed (etl/change_detection.py)
+
+-- DimDate - Time dimension, one row per calendar day (etl/date_keys.py)
+CREATE TABLE DimDate(
+    date_id INT PRIMARY KEY,             -- YYYYMMDD
+    date DATE,
+    quarter TINYINT UNSIGNED,
+    year SMALLINT UNSIGNED,
+    month TINYINT UNSIGNED,
+    day TINYINT UNSIGNED,
+    week TINYINT UNSIGNED,
+    week_year SMALLINT UNSIGNED,
+    day_of_week TINYINT UNSIGNED,
+    yearmonth MEDIUMINT UNSIGNED
+);
+
+-- DimDistrict - Geographic dimension
+CREATE TABLE DimDistrict(
+    district_id INT PRIMARY KEY,
+    district_name VARCHAR(64),
+    region_id TINYINT UNSIGNED,
+    inhabitants INT,
+    noCities INT,
+    ratio_urbaninhabitants DOUBLE,
+    average_salary DOUBLE,
+    unemployment DOUBLE,
+    noEntrepreneur INT,
+    noCrimes INT,
+    row_hash BIGINT UNSIGNED NOT NULL DEFAULT 0,
+    FOREIGN KEY (region_id) REFERENCES DimRegion(region_id)
+);
+
+-- DimClientAccount - Central dimension
+CREATE TABLE DimClientAccount (
+    clientAcc_id INT PRIMARY KEY,
+    client_id INT,
+    account_id INT,
+    distCli_id INT,
+    distAcc_id INT,
+    date_id INT,
+    frequency_id TINYINT UNSIGNED,
+    row_hash BIGINT UNSIGNED NOT NULL DEFAULT 0,
+    FOREIGN KEY (distCli_id) REFERENCES DimDistrict(district_id),
+    FOREIGN KEY (distAcc_id) REFERENCES DimDistrict(district_id),
+    FOREIGN KEY (date_id) REFERENCES DimDate(date_id),
+    FOREIGN KEY (frequency_id) REFERENCES DimFrequency(frequency_id)
+);
+
+-- DimCard - Card dimension
+CREATE TABLE DimCard(
+    card_id INT PRIMARY KEY,
+    clientAcc_id INT,
+    date_id INT,
+    card_type_id TINYINT UNSIGNED,
+    row_hash BIGINT UNSIGNED NOT NULL DEFAULT 0,
+    FOREIGN KEY (clientAcc_id) REFERENCES DimClientAccount(clientAcc_id),
+    FOREIGN KEY (date_id) REFERENCES DimDate(date_id),
+    FOREIGN KEY (card_type_id) REFERENCES DimCardType(card_type_id)
+);
+
+-- Fact Tables
+
+-- FactTrans - Main transaction fact table
+CREATE TABLE FactTrans (
+    trans_id INT PRIMARY KEY,
+    clientAcc_id INT,
+    date_id INT,
+    date_year SMALLINT UNSIGNED NOT NULL,
+    account INT,
+    trans_type_id SMALLINT UNSIGNED,
+    amount DOUBLE,
+    balance DOUBLE,
+    FOREIGN KEY (clientAcc_id) REFERENCES DimClientAccount(clientAcc_id),
+    FOREIGN KEY (date_id) REFERENCES DimDate(date_id),
+    FOREIGN KEY (trans_type_id) REFERENCES TransTypeJunk(trans_type_id)
+);
+
+-- FactLoan - Loan transactions fact table
+CREATE TABLE FactLoan (
+    loan_id INT PRIMARY KEY,
+    clientAcc_id INT,
+    date_id INT,
+    date_year SMALLINT UNSIGNED NOT NULL,
+    status CHAR(1),
+    amount INT,
+    duration SMALLINT,
+    payments DOUBLE,
+    description VARCHAR(45),
+    FOREIGN KEY (clientAcc_id) REFERENCES DimClientAccount(clientAcc_id),
+    FOREIGN KEY (date_id) REFERENCES DimDate(date_id)
+);
+
+-- SUCCESS MESSAGE
+
+SELECT 'Compact Data Warehouse Schema (v2) Created Successfully!' as STATUS;
@@ -0,0 +1,84 @@
+"""
+Shared fixtures. The ETL modules import each other as flat siblings (they run
+from etl/), so etl/ is put on the import path; SQL file paths are resolved from
+the repository root.
+"""
+
+import os
+import sys
+
+import pytest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(REPO_ROOT, 'etl'))
+
+
+class RecordingCursor:
+    """DB-API cursor stand-in that records executed statements and replays queued results"""
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.rowcount = 0
+        self._rows = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, statement, params=None):
+        self.connection.executed.append((statement, params))
+        self.rowcount = 0
+        if self.connection.respond:
+            self._rows = self.connection.respond(statement, params)
+
+    def executemany(self, statement, rows):
+        self.connection.executed.append((statement, list(rows)))
+
+    def fetchall(self):
+        if self._rows is not None:
+            rows, self._rows = self._rows, None
+            return rows
+        return self.connection.results.pop(0) if self.connection.results else []
+
+    def fetchone(self):
+        rows = self.fetchall()
+        return rows[0] if rows else None
+
+
+class RecordingConnection:
+    """
+    Connection stand-in handing out RecordingCursors. Fetches return the rows
+    respond(statement, params) gives for the last statement, or else the next
+    queued result.
+    """
+
+    def __init__(self, results=None, respond=None):
+        self.executed = []
+        self.results = list(results or [])
+        self.respond = respond
+        self.commits = 0
+        self.begins = 0
+
+    def cursor(self, *args):
+        return RecordingCursor(self)
+
+    def begin(self):
+        self.begins += 1
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        pass
+
+
+@pytest.fixture(scope='session')
+def repo_root():
+    return REPO_ROOT
+
+
+@pytest.fixture
+def recording_connection():
+    return RecordingConnection()
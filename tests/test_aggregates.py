@@ -0,0 +1,75 @@
+import os
+import re
+
+import numpy as np
+
+import aggregates
+from change_detection import DimensionChanges, hash_records, row_hash
+from conftest import RecordingConnection
+from etl_pipeline_clean import changed_dimensions, record_dimension_changes, release_dimension_changes
+
+
+def test_create_aggregate_tables_runs_every_create_statement(repo_root, recording_connection):
+    sql_path = os.path.join(repo_root, aggregates.AGGREGATES_SQL_PATH)
+    aggregates.create_aggregate_tables(recording_connection, sql_path)
+
+    created = [re.search(r'CREATE TABLE IF NOT EXISTS (\w+)', statement).group(1)
+               for statement, _ in recording_connection.executed]
+    assert created == list(aggregates.AGGREGATE_TABLES)
+    assert all(not statement.startswith('--') for statement, _ in recording_connection.executed)
+    assert recording_connection.commits == 1
+
+
+def _warehouse_responses(statement, params):
+    """Rows of a schema v1 warehouse whose summary tables are maintained up to FactTrans 10 / FactLoan 5"""
+    if 'FOR UPDATE' in statement:
+        return [('FactTrans', 10), ('FactLoan', 5)]
+    if statement.startswith('SELECT fact_table'):
+        return [('FactTrans',), ('FactLoan',)]
+    if 'COALESCE(MAX(' in statement:
+        return [(12,)]
+    if 'information_schema' in statement:
+        return [(0,)]
+    return []
+
+
+def _recomputed_tables(connection):
+    return [re.match(r'DELETE FROM (\w+)', statement).group(1)
+            for statement, _ in connection.executed if statement.startswith('DELETE FROM')]
+
+
+def test_district_region_change_recomputes_district_aggregates(repo_root, monkeypatch):
+    monkeypatch.chdir(repo_root)
+    options = {'checkpoint_run': 'test-run'}
+    stored = (7, 'Hl.m. Praha', 'Prague', 1204953, 1, 100.0, 12541.0, 0.2, 167, 85677)
+    moved = stored[:2] + ('central Bohemia',) + stored[3:]
+    changes = DimensionChanges('DimDistrict', np.zeros(8, dtype=np.uint64))
+    changes.stored[7] = row_hash(stored)
+
+    try:
+        assert changes.filter(hash_records([moved])) == hash_records([moved])
+        record_dimension_changes(options, changes)
+        assert changed_dimensions(options) == ('DimDistrict',)
+
+        connection = RecordingConnection(respond=_warehouse_responses)
+        aggregates.maintain_aggregates(connection, changed_dimensions=changed_dimensions(options))
+    finally:
+        release_dimension_changes(options)
+
+    assert _recomputed_tables(connection) == ['AggNetCashDistrict', 'AggPaymentsYearCard',
+                                              'AggLoanStatusRegion', 'AggTransOperationDistrict']
+    assert connection.commits == 2
+
+
+def test_unchanged_dimensions_only_merge_fact_deltas(repo_root, monkeypatch):
+    monkeypatch.chdir(repo_root)
+    connection = RecordingConnection(respond=_warehouse_responses)
+    aggregates.maintain_aggregates(connection)
+    assert _recomputed_tables(connection) == ['AggPaymentsYearCard']
+
+
+def test_region_keys_are_coalesced_in_every_query_variant():
+    spec = aggregates.AGGREGATES['AggLoanStatusRegion']
+    for variant in [name for name in spec if name.startswith('query')]:
+        select = spec[variant].split('FROM')[0]
+        assert re.search(r"SELECT COALESCE\(\w+\.region, ''\)", select), variant
@@ -0,0 +1,40 @@
+import pytest
+
+pymysql = pytest.importorskip('pymysql')
+
+from bulk_loader import BULK_LOADERS, create_benchmark_table, get_bulk_loader
+from etl_pipeline_clean import WAREHOUSE_DB_CONFIG
+
+
+@pytest.fixture
+def warehouse_conn():
+    config = dict(WAREHOUSE_DB_CONFIG, ssl_disabled=True, local_infile=True, connect_timeout=3)
+    try:
+        conn = pymysql.connect(**config)
+    except pymysql.err.OperationalError as e:
+        pytest.skip(f"warehouse MySQL unreachable: {e}")
+    try:
+        yield conn
+    finally:
+        with conn.cursor() as cursor:
+            cursor.execute("DROP TABLE IF EXISTS bulk_load_benchmark")
+        conn.close()
+
+
+def test_backends_load_identical_rows(warehouse_conn):
+    columns, rows = create_benchmark_table(warehouse_conn, 2500)
+    loaded = {}
+    for backend in BULK_LOADERS:
+        with warehouse_conn.cursor() as cursor:
+            cursor.execute("TRUNCATE TABLE bulk_load_benchmark")
+        count = get_bulk_loader(backend, batch_rows=1000).load(warehouse_conn, 'bulk_load_benchmark',
+                                                               columns, rows)
+        warehouse_conn.commit()
+        with warehouse_conn.cursor() as cursor:
+            cursor.execute(f"SELECT {', '.join(columns)} FROM bulk_load_benchmark ORDER BY trans_id")
+            loaded[backend] = cursor.fetchall()
+        assert count == len(loaded[backend]) == len(rows), backend
+
+    first, *others = BULK_LOADERS
+    for backend in others:
+        assert loaded[backend] == loaded[first], backend
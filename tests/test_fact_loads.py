@@ -0,0 +1,49 @@
+import pytest
+
+import etl_pipeline_clean
+from conftest import RecordingConnection
+from etl_pipeline_clean import _load_fact_chunks, get_etl_options
+
+
+class TransactionLog(RecordingConnection):
+    """Records begin/commit in order, as a connection whose begin() commits the open transaction would see them"""
+
+    def __init__(self):
+        super().__init__()
+        self.events = []
+
+    def begin(self):
+        super().begin()
+        self.events.append('begin')
+
+    def commit(self):
+        super().commit()
+        self.events.append('commit')
+
+
+@pytest.fixture
+def recorded_inserts(monkeypatch):
+    def insert_rows(warehouse_conn, table, rows, options=None):
+        warehouse_conn.events.append(f"insert {len(rows)}")
+        return len(rows)
+    monkeypatch.setattr(etl_pipeline_clean, 'insert_rows', insert_rows)
+    monkeypatch.setattr(etl_pipeline_clean, 'commit_rows', lambda conn, table, options=None: conn.commit())
+
+
+def _load(connection, commit_each_chunk):
+    chunks = [[(1,), (2,)], [(3,)], [(4,), (5,)]]
+    return _load_fact_chunks(connection, 'FactTrans', chunks, lambda chunk, lookup: list(chunk), None,
+                             get_etl_options(), commit_each_chunk=commit_each_chunk)
+
+
+def test_chunks_share_one_transaction(recorded_inserts):
+    connection = TransactionLog()
+    assert _load(connection, commit_each_chunk=False) == 5
+    assert connection.events == ['begin', 'insert 2', 'insert 1', 'insert 2', 'commit']
+
+
+def test_each_chunk_commits_its_own_transaction(recorded_inserts):
+    connection = TransactionLog()
+    assert _load(connection, commit_each_chunk=True) == 5
+    assert connection.events == ['begin', 'insert 2', 'commit', 'begin', 'insert 1', 'commit',
+                                 'begin', 'insert 2', 'commit', 'commit']
@@ -0,0 +1,20 @@
+from datetime import date
+
+import pytest
+
+from conftest import RecordingConnection
+from lookup_cache import LookupCache
+
+
+def test_ensure_dates_reads_the_dimdate_range():
+    lookup = LookupCache().ensure_dates(RecordingConnection([[(date(1993, 1, 1), date(1998, 12, 31))]]))
+    assert lookup.default_date_key() == 19930101
+    assert lookup.date_key('19950307') == 19950307
+    assert lookup.date_key(None) == lookup.date_key('2001-01-01') == 19930101
+
+
+def test_ensure_dates_rejects_an_empty_dimdate():
+    lookup = LookupCache()
+    with pytest.raises(RuntimeError, match="DimDate is empty"):
+        lookup.ensure_dates(RecordingConnection([[(None, None)]]))
+    assert lookup.date_first is None
@@ -0,0 +1,24 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from memory_budget import check_fact_trans_budget, parse_size
+
+
+@pytest.fixture(scope='module')
+def synthetic_snapshot(repo_root, tmp_path_factory):
+    # Generated in a separate process, as memory_budget.py does, so the generator's memory is not counted
+    snapshot_dir = str(tmp_path_factory.mktemp('budget') / 'snapshot')
+    subprocess.run([sys.executable, os.path.join(repo_root, 'etl', 'synthetic_source.py'), '--target', 'parquet',
+                    '--scale', '0.1', '--output', snapshot_dir], check=True, capture_output=True)
+    return snapshot_dir
+
+
+@pytest.mark.parametrize('vectorized, pipelined', [(False, False), (True, True)])
+def test_fact_trans_replay_stays_within_budget(synthetic_snapshot, vectorized, pipelined):
+    result = check_fact_trans_budget(synthetic_snapshot, parse_size('256MB'), chunk_size=2000,
+                                     vectorized=vectorized, pipelined=pipelined)
+    assert result['extracted'] == result['transformed'] > 0
+    assert result['within_budget']
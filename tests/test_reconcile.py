@@ -0,0 +1,23 @@
+from datetime import date
+
+from conftest import RecordingConnection
+from reconcile import RECONCILE_TABLES, SourceReconciler
+
+
+def _warehouse_responses(statement, params):
+    if 'FROM DimDate' in statement:
+        return [(date(1993, 1, 1), date(1998, 12, 31))]
+    return [(0,)]
+
+
+def test_source_dates_fall_back_like_the_loaders():
+    reconciler = SourceReconciler(RecordingConnection(), RecordingConnection(respond=_warehouse_responses))
+    try:
+        for table, specs in RECONCILE_TABLES.items():
+            row = reconciler._spec(table, 'source')['row']
+            column = specs['source']['date']
+            assert '{date}' not in row
+            assert (f"IF(DATE({column}) BETWEEN '1993-01-01' AND '1998-12-31', DATE({column}), '1993-01-01')"
+                    in row)
+    finally:
+        reconciler.close()
@@ -0,0 +1,27 @@
+import pytest
+
+from scheduler import ETLTask, validate_dag
+
+
+def _task(name, *depends_on):
+    return ETLTask(name, lambda source_conn, warehouse_conn, options: None, depends_on)
+
+
+def test_validate_dag_orders_dependencies_first():
+    tasks = [_task('FactTrans', 'DimClientAccount', 'DimDate'), _task('DimCard', 'DimClientAccount'),
+             _task('DimClientAccount', 'DimDistrict', 'DimDate'), _task('DimDistrict'), _task('DimDate')]
+    ordered = [task.name for task in validate_dag(tasks)]
+
+    assert sorted(ordered) == sorted(task.name for task in tasks)
+    for task in tasks:
+        assert all(ordered.index(dependency) < ordered.index(task.name) for dependency in task.depends_on)
+
+
+def test_validate_dag_rejects_unknown_dependencies():
+    with pytest.raises(ValueError, match="depends on unknown task 'DimDate'"):
+        validate_dag([_task('FactLoan', 'DimDate')])
+
+
+def test_validate_dag_rejects_cycles():
+    with pytest.raises(ValueError, match="Dependency cycle"):
+        validate_dag([_task('A', 'C'), _task('B', 'A'), _task('C', 'B')])
@@ -0,0 +1,71 @@
+from datetime import date, datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import etl_pipeline_clean
+import transform
+from etl_pipeline_clean import _fact_transforms, _transform_loan_rows, _transform_trans_rows
+from lookup_cache import LookupCache, to_ordinal
+
+DATES = ['19950307', '1995-03-07', None, 'garbage', '1995-03-07 10:11:12', '',
+         date(1994, 1, 2), datetime(1996, 12, 31, 8, 0), '19991301', '18000101']
+
+
+@pytest.fixture
+def lookup():
+    lookup = LookupCache()
+    lookup.account_keys = np.arange(0, 11, dtype=np.int32)
+    lookup.date_first = date(1993, 1, 1).toordinal()
+    lookup.date_last = date(1998, 12, 31).toordinal()
+    return lookup
+
+
+def _columnar(rows, columns):
+    return pd.DataFrame(rows, columns=columns, dtype=object)
+
+
+def test_to_ordinals_matches_to_ordinal():
+    ordinals = transform.to_ordinals(np.array(DATES, dtype=object))
+    assert [None if ordinal == -1 else ordinal for ordinal in ordinals.tolist()] == [to_ordinal(value) for value in DATES]
+
+
+def test_to_ordinals_native_iso_path():
+    ordinals = transform.to_ordinals(np.array(['1995-03-07', None], dtype=object))
+    assert ordinals.tolist() == [date(1995, 3, 7).toordinal(), -1]
+
+
+def test_vectorized_trans_matches_per_row(lookup):
+    rows = [(i, i % 11, value, 'PRIJEM', 'VKLAD', '100.5', None, '', str(i))
+            for i, value in enumerate(DATES)]
+    expected = _transform_trans_rows(rows, lookup)
+    assert transform.transform_trans_chunk(_columnar(rows, transform.TRANS_SOURCE_COLUMNS), lookup) == expected
+    assert transform.transform_trans_chunk(rows, lookup) == expected
+
+
+def test_vectorized_loan_matches_per_row(lookup):
+    rows = [(i, i % 11, value, 1000, 12, '83.3', 'A', None) for i, value in enumerate(DATES)]
+    expected = _transform_loan_rows(rows, lookup)
+    assert transform.transform_loan_chunk(_columnar(rows, transform.LOAN_SOURCE_COLUMNS), lookup) == expected
+    assert transform.transform_loan_chunk(rows, lookup) == expected
+
+
+def test_only_columnar_chunks_take_the_vectorized_path(lookup, monkeypatch):
+    vectorized_chunks = []
+    monkeypatch.setattr(etl_pipeline_clean, 'transform_trans_chunk',
+                        lambda chunk, lookup: vectorized_chunks.append(chunk) or [])
+    transform_trans, _ = _fact_transforms({'vectorized': True})
+    rows = [(1, 1, '1995-03-07', 'PRIJEM', 'VKLAD', 1.0, 2.0, '', '7')]
+
+    assert transform_trans(rows, lookup) == _transform_trans_rows(rows, lookup)
+    assert vectorized_chunks == []
+    transform_trans(_columnar(rows, transform.TRANS_SOURCE_COLUMNS), lookup)
+    assert len(vectorized_chunks) == 1
+
+
+def test_vectorized_requires_a_snapshot_replay(capsys):
+    with pytest.raises(SystemExit):
+        etl_pipeline_clean.parse_args(['--vectorized'])
+    assert '--vectorized only applies to --from-snapshot replays' in capsys.readouterr().err
+    assert etl_pipeline_clean.parse_args(['--vectorized', '--from-snapshot', 'snapshots']).vectorized